@@ -0,0 +1,141 @@
+"""
+Cold-start benchmark: how long a fresh process takes to import the app and to
+answer its first request.
+
+Each run starts a new interpreter, so nothing is cached in memory:
+    - import: time to `import src.main`
+    - first request: from spawning uvicorn to the first 200 from /health
+      (import, lifespan startup, warm-up, first request)
+
+    python -m benchmarks.cold_start --runs 5 --json cold.json
+    python -m benchmarks.cold_start --importtime   # slowest imports of one run
+
+Run from the backend folder with the database from .env reachable.
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+
+from benchmarks.stats import summarize
+
+
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import src.main; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.update(RATE_LIMIT_ENABLED="false", MAIL_BACKEND="memory")
+    return env
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_first_request(timeout: float) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "src.main:app",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+        ],
+        env=_env(),
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/health"
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"server exited with code {process.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                time.sleep(0.01)
+        raise TimeoutError(f"no response from {url} within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def print_importtime(limit: int) -> None:
+    """Print the slowest imports (cumulative) of a single `import src.main`."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.main"],
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    for cumulative, module in sorted(rows, reverse=True)[:limit]:
+        print(f"{cumulative / 1000:>9.1f} ms  {module}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure process cold start.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per measurement")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for a server")
+    parser.add_argument("--skip-server", action="store_true", help="only measure the import")
+    parser.add_argument("--importtime", action="store_true", help="show the slowest imports")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    if args.importtime:
+        print_importtime(25)
+        return
+
+    results = {"import": summarize([measure_import() for _ in range(args.runs)])}
+    if not args.skip_server:
+        results["first_request"] = summarize(
+            [measure_first_request(args.timeout) for _ in range(args.runs)]
+        )
+
+    for name, latency in results.items():
+        print(
+            f"{name:<14} p50={latency['p50_ms']:>8.1f}ms  "
+            f"p95={latency['p95_ms']:>8.1f}ms  max={latency['max_ms']:>8.1f}ms"
+        )
+    if args.json:
+        report = {
+            "benchmark": "cold_start",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "results": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Email load test: drive signup and forgot-password at fixed rates and measure
+end-to-end delivery latency (request sent -> message handed to the mail transport).
+
+Two modes:
+    In-process (default): the app runs over ASGI with the "memory" mail backend.
+        python -m benchmarks.email_load --signup-rate 20 --forgot-rate 20 --duration 30
+
+    Real HTTP: point at a running server started with MAIL_BACKEND=local; the
+    script runs the local SMTP stand-in server the app delivers to.
+        python -m benchmarks.email_load --base-url http://127.0.0.1:8000 --smtp-port 1025
+
+Run from the backend folder. Needs the database configured in .env.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+
+from httpx import AsyncClient, ASGITransport
+
+from benchmarks.stats import summarize
+
+
+EMAIL_PREFIX = "loadtest-"
+PASSWORD = "LoadTestPass123"
+
+SUBJECT_TO_KIND = {
+    "Your Verification Code": "signup",
+    "Password Reset Code": "forgot-password",
+}
+
+
+@dataclass
+class SentRequest:
+    kind: str
+    email: str
+    sent_at: float
+    status_code: int = 0
+    request_latency: float = 0.0
+
+
+@dataclass
+class Delivery:
+    recipient: str
+    subject: str
+    delivered_at: float
+
+
+def _new_email() -> str:
+    return f"{EMAIL_PREFIX}{uuid.uuid4().hex[:16]}@example.com"
+
+
+async def _send(client: AsyncClient, kind: str, email: str, sent: list[SentRequest]) -> None:
+    record = SentRequest(kind=kind, email=email, sent_at=time.time())
+    sent.append(record)
+    start = time.perf_counter()
+    try:
+        if kind == "signup":
+            response = await client.post(
+                "/auth/signup",
+                json={"name": "Load Test", "email": email, "password": PASSWORD},
+            )
+        else:
+            response = await client.post("/auth/forgot-password", json={"email": email})
+        record.status_code = response.status_code
+    except Exception:
+        record.status_code = -1
+    record.request_latency = time.perf_counter() - start
+
+
+async def _drive(
+    client: AsyncClient,
+    kind: str,
+    rate: float,
+    duration: float,
+    targets: list[str],
+    sent: list[SentRequest],
+) -> None:
+    """Open-loop generator: fire requests at a fixed rate regardless of latency."""
+    if rate <= 0:
+        return
+    interval = 1.0 / rate
+    tasks = []
+    start = time.perf_counter()
+    n = 0
+    while (scheduled := start + n * interval) < start + duration:
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        email = _new_email() if kind == "signup" else targets[n % len(targets)]
+        tasks.append(asyncio.create_task(_send(client, kind, email, sent)))
+        n += 1
+    await asyncio.gather(*tasks)
+
+
+def _match_deliveries(sent: list[SentRequest], deliveries: list[Delivery]) -> dict:
+    """Pair each delivery with the oldest unmatched request for that recipient and kind."""
+    pending: dict[tuple[str, str], deque[SentRequest]] = defaultdict(deque)
+    for record in sorted(sent, key=lambda r: r.sent_at):
+        if 200 <= record.status_code < 300:
+            pending[(record.kind, record.email)].append(record)
+
+    latencies: dict[str, list[float]] = defaultdict(list)
+    for delivery in sorted(deliveries, key=lambda d: d.delivered_at):
+        kind = SUBJECT_TO_KIND.get(delivery.subject)
+        queue = pending.get((kind, delivery.recipient))
+        if queue:
+            latencies[kind].append(delivery.delivered_at - queue.popleft().sent_at)
+
+    report = {}
+    for kind in ("signup", "forgot-password"):
+        records = [r for r in sent if r.kind == kind]
+        if not records:
+            continue
+        ok = [r for r in records if 200 <= r.status_code < 300]
+        report[kind] = {
+            "requests": len(records),
+            "errors": len(records) - len(ok),
+            "delivered": len(latencies[kind]),
+            "undelivered": len(ok) - len(latencies[kind]),
+            "request_latency": summarize([r.request_latency for r in records]),
+            "delivery_latency": summarize(latencies[kind]),
+        }
+    return report
+
+
+async def run(args: argparse.Namespace) -> dict:
+    async with AsyncExitStack() as stack:
+        if args.base_url:
+            from src.helpers.local_smtp import LocalSMTPServer
+
+            smtp_server = await stack.enter_async_context(
+                LocalSMTPServer(args.smtp_host, args.smtp_port, max_messages=1_000_000)
+            )
+            client = await stack.enter_async_context(
+                AsyncClient(base_url=args.base_url, timeout=60)
+            )
+
+            def collect() -> list[Delivery]:
+                return [
+                    Delivery(rcpt, m.subject, m.received_at)
+                    for m in smtp_server.messages
+                    for rcpt in m.rcpt_tos
+                ]
+
+            def reset() -> None:
+                smtp_server.messages.clear()
+
+        else:
+            os.environ["MAIL_BACKEND"] = "memory"
+            os.environ["MAIL_CAPTURE_MAX_MESSAGES"] = "1000000"
+            from src.main import app
+            from src.helpers.mail_backends import get_mail_backend
+
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            stack.push_async_callback(_cleanup_users)
+            client = await stack.enter_async_context(
+                AsyncClient(transport=ASGITransport(app=app), base_url="http://load", timeout=60)
+            )
+            backend = get_mail_backend()
+
+            def collect() -> list[Delivery]:
+                return [
+                    Delivery(rcpt, m.subject, m.sent_at)
+                    for m in backend.outbox
+                    for rcpt in m.recipients
+                ]
+
+            def reset() -> None:
+                backend.clear()
+
+        # Seed the accounts that forgot-password will target
+        targets = []
+        if args.forgot_rate > 0:
+            seed: list[SentRequest] = []
+            await asyncio.gather(
+                *(_send(client, "signup", _new_email(), seed) for _ in range(args.users))
+            )
+            targets = [r.email for r in seed if r.status_code == 201]
+            if not targets:
+                raise SystemExit("Could not create any target users for forgot-password")
+        await asyncio.sleep(args.drain)
+        reset()
+
+        sent: list[SentRequest] = []
+        started = time.perf_counter()
+        await asyncio.gather(
+            _drive(client, "signup", args.signup_rate, args.duration, targets, sent),
+            _drive(client, "forgot-password", args.forgot_rate, args.duration, targets, sent),
+        )
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(args.drain)
+
+        report = _match_deliveries(sent, collect())
+        return {
+            "mode": "http" if args.base_url else "asgi",
+            "duration_s": round(elapsed, 3),
+            "signup_rate": args.signup_rate,
+            "forgot_rate": args.forgot_rate,
+            "results": report,
+        }
+
+
+async def _cleanup_users() -> None:
+    from sqlalchemy import delete
+    from src.helpers.db import get_engine
+    from src.models.db_scheams.user import User
+
+    async with get_engine().begin() as conn:
+        await conn.execute(delete(User).where(User.email.like(f"{EMAIL_PREFIX}%")))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Email delivery load test.")
+    parser.add_argument("--signup-rate", type=float, default=5.0, help="signups per second")
+    parser.add_argument("--forgot-rate", type=float, default=5.0, help="forgot-password requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to generate load")
+    parser.add_argument("--users", type=int, default=20, help="accounts seeded for forgot-password")
+    parser.add_argument("--drain", type=float, default=1.0, help="seconds to wait for late deliveries")
+    parser.add_argument("--base-url", help="target a running server instead of in-process ASGI")
+    parser.add_argument("--smtp-host", default="127.0.0.1")
+    parser.add_argument("--smtp-port", type=int, default=1025)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Endpoint benchmark: throughput and latency percentiles for every auth route.
+
+Drives the routes in src/routes/auth_routes.py at one or more concurrency levels
+and writes a JSON report, so numbers can be compared from one commit to the next.
+
+In-process over ASGI against the database configured in .env:
+    python -m benchmarks.endpoints --concurrency 1,8,32 --requests 200 --json out.json
+
+In-process against an in-memory SQLite database (needs aiosqlite):
+    python -m benchmarks.endpoints --memory-db
+
+Against a running server over real HTTP (start it with RATE_LIMIT_ENABLED=false,
+and MAIL_BACKEND=memory so nothing is sent):
+    python -m benchmarks.endpoints --base-url http://127.0.0.1:8000
+
+Compare per-request CPU with and without fast JSON responses:
+    FAST_JSON_RESPONSES=false python -m benchmarks.endpoints --memory-db --routes login,refresh --concurrency 1
+    FAST_JSON_RESPONSES=true python -m benchmarks.endpoints --memory-db --routes login,refresh --concurrency 1
+
+Run from the backend folder. Users created by the run are prefixed with "bench-".
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import time
+import uuid
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+from httpx import AsyncClient, ASGITransport
+
+from benchmarks.stats import summarize
+
+
+EMAIL_PREFIX = "bench-"
+PASSWORD = "BenchPass123"
+MEMORY_DATABASE_URL = "sqlite+aiosqlite:///file:authbench?mode=memory&cache=shared&uri=true"
+
+
+@dataclass
+class Fixtures:
+    """Accounts and cookies prepared before timing starts."""
+
+    verified: list[str] = field(default_factory=list)
+    unverified: list[str] = field(default_factory=list)
+    refresh_cookies: list[str] = field(default_factory=list)
+
+
+RequestFn = Callable[[AsyncClient, int], Awaitable[int]]
+
+
+def _email() -> str:
+    return f"{EMAIL_PREFIX}{uuid.uuid4().hex[:16]}@example.com"
+
+
+def _scenarios(fixtures: Fixtures) -> dict[str, tuple[RequestFn, int]]:
+    """Route name -> (request function, expected status code)."""
+
+    def pick(pool: list[str], i: int) -> str:
+        return pool[i % len(pool)]
+
+    async def signup(c: AsyncClient, i: int) -> int:
+        body = {"name": "Bench", "email": _email(), "password": PASSWORD}
+        return (await c.post("/auth/signup", json=body)).status_code
+
+    async def login(c: AsyncClient, i: int) -> int:
+        body = {"email": pick(fixtures.verified, i), "password": PASSWORD}
+        return (await c.post("/auth/login", json=body)).status_code
+
+    async def refresh(c: AsyncClient, i: int) -> int:
+        cookie = f"refresh_token={pick(fixtures.refresh_cookies, i)}"
+        return (await c.post("/auth/refresh", headers={"cookie": cookie})).status_code
+
+    async def logout(c: AsyncClient, i: int) -> int:
+        return (await c.post("/auth/logout")).status_code
+
+    async def verify_code(c: AsyncClient, i: int) -> int:
+        # Wrong code: repeatable, exercises the lookup and comparison path
+        body = {"email": pick(fixtures.unverified, i), "code": "000000"}
+        return (await c.post("/auth/verify-code", json=body)).status_code
+
+    async def resend_code(c: AsyncClient, i: int) -> int:
+        body = {"email": pick(fixtures.unverified, i)}
+        return (await c.post("/auth/resend-code", json=body)).status_code
+
+    async def forgot_password(c: AsyncClient, i: int) -> int:
+        body = {"email": pick(fixtures.verified, i)}
+        return (await c.post("/auth/forgot-password", json=body)).status_code
+
+    async def reset_password(c: AsyncClient, i: int) -> int:
+        # Wrong code: repeatable without consuming reset codes
+        body = {"email": pick(fixtures.verified, i), "code": "000000", "new_password": PASSWORD}
+        return (await c.post("/auth/reset-password", json=body)).status_code
+
+    async def health(c: AsyncClient, i: int) -> int:
+        return (await c.get("/health")).status_code
+
+    return {
+        "signup": (signup, 201),
+        "login": (login, 200),
+        "refresh": (refresh, 200),
+        "logout": (logout, 200),
+        "verify-code": (verify_code, 400),
+        "resend-code": (resend_code, 200),
+        "forgot-password": (forgot_password, 200),
+        "reset-password": (reset_password, 400),
+        "health": (health, 200),
+    }
+
+
+async def _prepare(client: AsyncClient, users: int, session_factory) -> Fixtures:
+    """Create verified and unverified accounts and log the verified ones in."""
+    fixtures = Fixtures()
+
+    async def create(pool: list[str]) -> None:
+        email = _email()
+        body = {"name": "Bench", "email": email, "password": PASSWORD}
+        response = await client.post("/auth/signup", json=body)
+        response.raise_for_status()
+        pool.append(email)
+
+    await asyncio.gather(*(create(fixtures.verified) for _ in range(users)))
+    await asyncio.gather(*(create(fixtures.unverified) for _ in range(users)))
+
+    # Verify through the API using the codes stored in the database
+    from sqlalchemy import select
+    from src.models.db_scheams.user import User
+
+    async with session_factory() as session:
+        result = await session.execute(
+            select(User.email, User.verification_token).where(
+                User.email.in_(fixtures.verified)
+            )
+        )
+        codes = dict(result.all())
+    for email in fixtures.verified:
+        response = await client.post(
+            "/auth/verify-code", json={"email": email, "code": codes[email]}
+        )
+        response.raise_for_status()
+        response = await client.post(
+            "/auth/login", json={"email": email, "password": PASSWORD}
+        )
+        response.raise_for_status()
+        fixtures.refresh_cookies.append(response.cookies["refresh_token"])
+        client.cookies.clear()
+    return fixtures
+
+
+async def _run_level(
+    client: AsyncClient, request: RequestFn, expected: int, concurrency: int, total: int
+) -> dict:
+    """Run `total` requests with `concurrency` workers pulling from a shared counter."""
+    latencies: list[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal errors, next_index
+        while next_index < total:
+            i = next_index
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                status_code = await request(client, i)
+            except Exception:
+                status_code = -1
+            latencies.append(time.perf_counter() - start)
+            if status_code != expected:
+                errors += 1
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    cpu = time.process_time() - cpu_started
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        # Whole process, all threads (includes the bcrypt pool and, in-process, the client)
+        "cpu_ms_per_request": round(cpu / total * 1000, 3),
+        "latency": summarize(latencies),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> dict:
+    if not args.base_url:
+        # In-process runs must not be throttled or send real mail
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+        os.environ["MAIL_BACKEND"] = "memory"
+        os.environ["MAIL_CAPTURE_MAX_MESSAGES"] = "100"
+        if args.memory_db:
+            os.environ["DATABASE_URL"] = MEMORY_DATABASE_URL
+            os.environ["CACHE_NOTIFY_ENABLED"] = "false"
+
+    from src.helpers.db import get_engine, get_session_factory
+
+    engine = get_engine()
+    session_factory = get_session_factory()
+    engine.echo = False
+    async with AsyncExitStack() as stack:
+        stack.push_async_callback(engine.dispose)
+        if args.base_url:
+            client = await stack.enter_async_context(
+                AsyncClient(base_url=args.base_url, timeout=60)
+            )
+        else:
+            from src.main import app
+
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            client = await stack.enter_async_context(
+                AsyncClient(transport=ASGITransport(app=app), base_url="http://bench", timeout=60)
+            )
+        stack.push_async_callback(_cleanup_users, session_factory)
+
+        fixtures = await _prepare(client, args.users, session_factory)
+        scenarios = _scenarios(fixtures)
+        routes = args.routes.split(",") if args.routes else list(scenarios)
+        levels = [int(level) for level in args.concurrency.split(",")]
+
+        results = {}
+        for route in routes:
+            request, expected = scenarios[route]
+            # Warm up connections, caches and code paths before timing
+            await _run_level(client, request, expected, 1, args.warmup)
+            results[route] = [
+                await _run_level(client, request, expected, level, args.requests)
+                for level in levels
+            ]
+            client.cookies.clear()
+
+    return {
+        "benchmark": "endpoints",
+        "mode": "http" if args.base_url else "asgi",
+        "database": "memory" if args.memory_db else "postgres",
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+
+async def _cleanup_users(session_factory) -> None:
+    from sqlalchemy import delete
+    from src.models.db_scheams.user import User
+
+    async with session_factory() as session:
+        await session.execute(delete(User).where(User.email.like(f"{EMAIL_PREFIX}%")))
+        await session.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the auth API endpoints.")
+    parser.add_argument("--routes", help="comma-separated routes (default: all)")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route and level")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests per route")
+    parser.add_argument("--users", type=int, default=20, help="accounts created per pool")
+    parser.add_argument("--base-url", help="benchmark a running server over HTTP")
+    parser.add_argument("--memory-db", action="store_true", help="use in-memory SQLite")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    for route, levels in report["results"].items():
+        for level in levels:
+            latency = level["latency"]
+            print(
+                f"{route:<16} c={level['concurrency']:<4} {level['throughput_rps']:>9.1f} req/s  "
+                f"p50={latency.get('p50_ms', 0):>8.2f}ms  p95={latency.get('p95_ms', 0):>8.2f}ms  "
+                f"p99={latency.get('p99_ms', 0):>8.2f}ms  cpu={level['cpu_ms_per_request']:>7.3f}ms  "
+                f"errors={level['errors']}"
+            )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
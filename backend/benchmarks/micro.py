@@ -0,0 +1,208 @@
+"""
+Microbenchmarks for the security helpers and the Pydantic request schemas.
+
+Every benchmark has a fixed iteration count and runs warmup iterations first,
+then several timed rounds with the garbage collector paused; the median round
+is reported per call.
+
+    python -m benchmarks.micro                          # print results
+    python -m benchmarks.micro --save baseline.json     # record a baseline
+    python -m benchmarks.micro --compare baseline.json  # exit 1 on regressions
+
+Run from the backend folder.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    name: str
+    func: Callable[[], object]
+    iterations: int
+    warmup: int
+
+
+def _benchmarks() -> list[Benchmark]:
+    from src.helpers.security import (
+        hash_password,
+        verify_password,
+        generate_access_token,
+        verify_access_token,
+        generate_refresh_token,
+        verify_refresh_token,
+        generate_verification_code,
+    )
+    from src.models.schemas.user_schema import (
+        UserCreate,
+        LoginRequest,
+        VerifyCodeRequest,
+        ResetPasswordRequest,
+        UserResponse,
+        LoginResponse,
+    )
+
+    password = "BenchPass123"
+    hashed = hash_password(password)
+    access_token = generate_access_token("6f1c2a54-8f7e-4d8b-9a34-0c1f7e2b9d11")
+    refresh_token = generate_refresh_token("6f1c2a54-8f7e-4d8b-9a34-0c1f7e2b9d11")
+    signup_body = {"name": "Bench User", "email": "bench@example.com", "password": password}
+    login_body = {"email": "bench@example.com", "password": password}
+    verify_body = {"email": "bench@example.com", "code": "123456"}
+    reset_body = {"email": "bench@example.com", "code": "123456", "new_password": password}
+    user_response = UserResponse(
+        id="6f1c2a54-8f7e-4d8b-9a34-0c1f7e2b9d11",
+        name="Bench User",
+        email="bench@example.com",
+        is_verified=True,
+        created_at=datetime(2025, 1, 1),
+    )
+    login_response = LoginResponse(access_token=access_token, token_type="bearer")
+
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+    from src.helpers.responses import FastJSONResponse
+
+    login_adapter = TypeAdapter(LoginResponse)
+
+    def render_fastapi() -> bytes:
+        # FastAPI's generic path: re-validate, dump to Python, encode with json
+        validated = login_adapter.validate_python(login_response)
+        return JSONResponse(login_adapter.dump_python(validated, mode="json")).body
+
+    def render_fast() -> bytes:
+        return FastJSONResponse(login_response).body
+
+    return [
+        Benchmark("hash_password", lambda: hash_password(password), 5, 1),
+        Benchmark("verify_password", lambda: verify_password(password, hashed), 5, 1),
+        Benchmark("generate_access_token", lambda: generate_access_token("42"), 2_000, 200),
+        Benchmark("verify_access_token", lambda: verify_access_token(access_token), 2_000, 200),
+        Benchmark("generate_refresh_token", lambda: generate_refresh_token("42"), 2_000, 200),
+        Benchmark("verify_refresh_token", lambda: verify_refresh_token(refresh_token), 2_000, 200),
+        Benchmark("generate_verification_code", generate_verification_code, 20_000, 2_000),
+        Benchmark("UserCreate.validate", lambda: UserCreate.model_validate(signup_body), 5_000, 500),
+        Benchmark("LoginRequest.validate", lambda: LoginRequest.model_validate(login_body), 5_000, 500),
+        Benchmark(
+            "VerifyCodeRequest.validate",
+            lambda: VerifyCodeRequest.model_validate(verify_body),
+            5_000,
+            500,
+        ),
+        Benchmark(
+            "ResetPasswordRequest.validate",
+            lambda: ResetPasswordRequest.model_validate(reset_body),
+            5_000,
+            500,
+        ),
+        Benchmark("UserResponse.dump_json", user_response.model_dump_json, 10_000, 1_000),
+        Benchmark("LoginResponse.dump_json", login_response.model_dump_json, 10_000, 1_000),
+        Benchmark("LoginResponse.render_fastapi", render_fastapi, 10_000, 1_000),
+        Benchmark("LoginResponse.render_fast", render_fast, 10_000, 1_000),
+    ]
+
+
+def _time_round(func: Callable[[], object], iterations: int) -> float:
+    """Seconds per call over one round of `iterations` calls."""
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter_ns() - start) / iterations / 1e9
+
+
+def run_benchmark(bench: Benchmark, rounds: int, scale: float) -> dict:
+    iterations = max(1, round(bench.iterations * scale))
+    for _ in range(bench.warmup):
+        bench.func()
+
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        samples = [_time_round(bench.func, iterations) for _ in range(rounds)]
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return {
+        "iterations": iterations,
+        "rounds": rounds,
+        "median_us": round(statistics.median(samples) * 1e6, 3),
+        "min_us": round(min(samples) * 1e6, 3),
+        "stdev_us": round(statistics.stdev(samples) * 1e6, 3) if rounds > 1 else 0.0,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Compare median timings against a baseline.
+
+    Returns:
+        One message per benchmark slower than baseline * (1 + threshold)
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        ratio = result["median_us"] / base["median_us"] if base["median_us"] else 1.0
+        result["baseline_median_us"] = base["median_us"]
+        result["change"] = round(ratio - 1, 4)
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {base['median_us']}us -> {result['median_us']}us ({ratio - 1:+.1%})"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmarks for security helpers and schemas.")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--rounds", type=int, default=5, help="timed rounds per benchmark")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply iteration counts")
+    parser.add_argument("--save", help="write results as a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=0.10, help="allowed slowdown before failing (0.10 = 10%%)"
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for bench in _benchmarks():
+        if args.filter and args.filter not in bench.name:
+            continue
+        results[bench.name] = run_benchmark(bench, args.rounds, args.scale)
+        print(f"{bench.name:<32} {results[bench.name]['median_us']:>14.3f} us/call")
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+    if args.save:
+        report = {
+            "benchmark": "micro",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "results": results,
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if regressions:
+        print(f"\nRegressions over {args.threshold:.0%}:")
+        for message in regressions:
+            print(f"  {message}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Small statistics helpers shared by the benchmark scripts.
+"""
+
+import math
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of a list of samples.
+
+    Args:
+        samples: Measured values (any order)
+        pct: Percentile between 0 and 100
+
+    Returns:
+        The percentile value, or 0.0 for an empty list
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: list[float]) -> dict:
+    """
+    Summarize latency samples given in seconds.
+
+    Returns:
+        Count plus mean/p50/p95/p99/max in milliseconds
+    """
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
@@ -2,10 +2,14 @@
 Authentication controller - business logic for auth operations.
 """
 
-from fastapi import HTTPException, status, BackgroundTasks, Response, Cookie
+import secrets
+from typing import Dict
+
+from fastapi import HTTPException, status, BackgroundTasks, Request, Response, Cookie
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
 from src.helpers.config import settings
 
 
@@ -19,21 +23,78 @@ from src.models.schemas.user_schema import (
     LoginResponse,
     ForgotPasswordRequest,
     ResetPasswordRequest,
+    SessionResponse,
+    SessionListResponse,
 )
 from src.helpers.security import (
     hash_password,
     generate_verification_code,
+    generate_stateless_code,
+    verify_stateless_code,
     generate_access_token,
     verify_password,
     generate_refresh_token,
     verify_refresh_token,
     verify_access_token,
+    verify_access_token_cached,
+    run_hashing,
 )
+from src.helpers import audit
+from src.helpers.audit import audit_log
 from src.helpers.email_service import send_verification_email, send_password_reset_email
+from src.helpers.login_guard import login_guard
+from src.helpers.metrics import refresh_grace_hits
+from src.helpers.refresh_grace import refresh_grace
+from src.helpers.request_utils import get_client_ip
+from src.helpers.session_registry import session_registry
+from src.helpers.tracing import span
+from src.helpers.user_cache import (
+    UserSnapshot,
+    get_user_by_email,
+    cache_new_user,
+    invalidate_user,
+    drop_cached_user,
+)
+
+
+async def _update_user(db: AsyncSession, user: UserSnapshot, **values) -> None:
+    """Write `values` to the user's row and invalidate every cached copy."""
+    with span("db.update"):
+        await db.execute(update(User).where(User.id == user.id).values(**values))
+        await invalidate_user(db, user)
+        await db.commit()
+    drop_cached_user(user)
+
+
+def _client_ip(request: Request | None) -> str:
+    return get_client_ip(request.scope) if request else ""
+
+
+async def _issue_code(db: AsyncSession, user: UserSnapshot, purpose: str) -> str:
+    """Create a verification or reset code; only stored codes cost a write."""
+    if settings.STATELESS_CODES_ENABLED:
+        return generate_stateless_code(user.id, purpose, user.hashed_password)
+    code = generate_verification_code()
+    await _update_user(db, user, verification_token=code)
+    return code
+
+
+def _code_matches(user: UserSnapshot, purpose: str, code: str) -> bool:
+    """Check a code against the stored one and, in stateless mode, the derived one."""
+    if user.verification_token is not None and secrets.compare_digest(
+        user.verification_token, code
+    ):
+        return True
+    return settings.STATELESS_CODES_ENABLED and verify_stateless_code(
+        code, user.id, purpose, user.hashed_password
+    )
 
 
 async def signup(
-    user_data: UserCreate, db: AsyncSession, background_tasks: BackgroundTasks
+    user_data: UserCreate,
+    db: AsyncSession,
+    background_tasks: BackgroundTasks,
+    request: Request | None = None,
 ) -> UserResponse:
     """
     Register a new user.
@@ -42,6 +103,7 @@ async def signup(
         user_data: User registration data
         db: Database session
         background_tasks: FastAPI background tasks for async email
+        request: Incoming request (used for the client IP in the audit trail)
 
     Returns:
         Created user response
@@ -50,8 +112,8 @@ async def signup(
         HTTPException: If email already exists
     """
     # Check if email already exists
-    result = await db.execute(select(User).where(User.email == user_data.email))
-    existing_user = result.scalar_one_or_none()
+    with span("user_lookup"):
+        existing_user = await get_user_by_email(db, user_data.email)
 
     if existing_user:
         raise HTTPException(
@@ -59,8 +121,8 @@ async def signup(
         )
 
     # Create new user with verification code
-    verification_code = generate_verification_code()
-    hashed_pwd = hash_password(user_data.password)
+    hashed_pwd = await run_hashing(hash_password, user_data.password)
+    verification_code = None if settings.STATELESS_CODES_ENABLED else generate_verification_code()
 
     new_user = User(
         name=user_data.name,
@@ -71,9 +133,25 @@ async def signup(
         is_verified=False,
     )
 
-    db.add(new_user)
-    await db.commit()
-    await db.refresh(new_user)
+    with span("db.insert"):
+        db.add(new_user)
+        try:
+            await db.flush()
+            await invalidate_user(db, new_user)
+            await db.commit()
+        except IntegrityError:
+            # Registered concurrently (or our caches were stale)
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered"
+            )
+        await db.refresh(new_user)
+    cache_new_user(new_user)
+    audit_log.record(
+        audit.SIGNUP, user_id=new_user.id, email=new_user.email, ip=_client_ip(request)
+    )
+    if verification_code is None:
+        verification_code = generate_stateless_code(new_user.id, "verify", hashed_pwd)
 
     # Send verification code email in background
     background_tasks.add_task(
@@ -92,13 +170,16 @@ async def signup(
     )
 
 
-async def verify_email(verify_data: VerifyCodeRequest, db: AsyncSession) -> dict:
+async def verify_email(
+    verify_data: VerifyCodeRequest, db: AsyncSession, request: Request | None = None
+) -> dict:
     """
     Verify user email with the 6-digit code.
 
     Args:
         verify_data: Email and verification code
         db: Database session
+        request: Incoming request (used for the client IP in the audit trail)
 
     Returns:
         Success message
@@ -107,8 +188,8 @@ async def verify_email(verify_data: VerifyCodeRequest, db: AsyncSession) -> dict
         HTTPException: If code is invalid or email not found
     """
     # Find user by email
-    result = await db.execute(select(User).where(User.email == verify_data.email))
-    user = result.scalar_one_or_none()
+    with span("user_lookup"):
+        user = await get_user_by_email(db, verify_data.email)
 
     if not user:
         raise HTTPException(
@@ -121,17 +202,26 @@ async def verify_email(verify_data: VerifyCodeRequest, db: AsyncSession) -> dict
         )
 
     # Check verification code
-    if user.verification_token != verify_data.code:
+    if not _code_matches(user, "verify", verify_data.code):
+        audit_log.record(
+            audit.VERIFY_EMAIL,
+            success=False,
+            user_id=user.id,
+            email=user.email,
+            ip=_client_ip(request),
+            detail="invalid_code",
+        )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid verification code"
         )
 
-    # Verify user
-    user.is_verified = True
-    user.is_active = True
-    user.verification_token = None  # Clear the code after use
-
-    await db.commit()
+    # Verify user and clear the code after use
+    await _update_user(
+        db, user, is_verified=True, is_active=True, verification_token=None
+    )
+    audit_log.record(
+        audit.VERIFY_EMAIL, user_id=user.id, email=user.email, ip=_client_ip(request)
+    )
 
     return {"message": "Email verified successfully"}
 
@@ -154,8 +244,8 @@ async def resend_verification_code(
         HTTPException: If user not found or already verified
     """
     # Find user by email
-    result = await db.execute(select(User).where(User.email == resend_data.email))
-    user = result.scalar_one_or_none()
+    with span("user_lookup"):
+        user = await get_user_by_email(db, resend_data.email)
 
     if not user:
         raise HTTPException(
@@ -167,12 +257,8 @@ async def resend_verification_code(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Email already verified"
         )
 
-    # Generate new verification code
-    new_code = generate_verification_code()
-
-    # Update user
-    user.verification_token = new_code
-    await db.commit()
+    # Generate new verification code (stateless codes need no write)
+    new_code = await _issue_code(db, user, "verify")
 
     # Send new code email in background
     background_tasks.add_task(
@@ -186,29 +272,64 @@ async def resend_verification_code(
 
 
 async def login(
-    login_data: LoginRequest, response: Response, db: AsyncSession
+    login_data: LoginRequest, request: Request, response: Response, db: AsyncSession
 ) -> LoginResponse:
     """
     Login user with email and password.
 
     Args:
         login_data: Email and password
+        request: Incoming request (used for the client IP)
         db: Database session
 
     Returns:
         Access token and token type
 
     Raises:
-        HTTPException: If user not found or invalid credentials
+        HTTPException: If user not found, invalid credentials or locked out
     """
+    # Reject locked-out accounts/IPs before any DB or bcrypt work
+    client_ip = get_client_ip(request.scope)
+    retry_after = login_guard.retry_after(login_data.email, client_ip)
+    if retry_after:
+        audit_log.record(
+            audit.LOGIN, success=False, email=login_data.email, ip=client_ip, detail="locked_out"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts, please try again later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
     # Find user by email
-    result = await db.execute(select(User).where(User.email == login_data.email))
-    user = result.scalar_one_or_none()
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    with span("user_lookup"):
+        user = await get_user_by_email(db, login_data.email)
+    if not user or not await run_hashing(
+        verify_password, login_data.password, user.hashed_password
+    ):
+        login_guard.record_failure(login_data.email, client_ip)
+        audit_log.record(
+            audit.LOGIN,
+            success=False,
+            user_id=user.id if user else None,
+            email=login_data.email,
+            ip=client_ip,
+            detail="bad_password" if user else "unknown_email",
+        )
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    login_guard.record_success(login_data.email, client_ip)
+
+    # Register the session; its id goes into both tokens as the sid claim
+    with span("db.insert"):
+        sid = await session_registry.create(
+            db, user.id, request.headers.get("user-agent", ""), client_ip
+        )
+        await db.commit()
+    audit_log.record(audit.LOGIN, user_id=user.id, email=user.email, ip=client_ip)
+
     # Generate access token
-    access_token = generate_access_token(user.id)
-    refresh_token = generate_refresh_token(user.id)
+    access_token = generate_access_token(user.id, sid)
+    refresh_token = generate_refresh_token(user.id, sid)
 
     # Set refresh token in httpOnly cookie
     response.set_cookie(
@@ -220,21 +341,27 @@ async def login(
         max_age=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
     )
 
-    return LoginResponse(access_token=access_token, token_type="bearer")
+    with span("response"):
+        return LoginResponse(access_token=access_token, token_type="bearer")
 
 
 async def refresh_access_token(
     response: Response,
     refresh_token: str = Cookie(None),  # قراءة الكوكيز
     db: AsyncSession = None,
+    request: Request | None = None,
 ) -> LoginResponse:
     """
     Refresh access token using refresh token from cookie.
 
+    Callers presenting the same refresh token within REFRESH_GRACE_SECONDS
+    (e.g. several browser tabs at once) receive the same new token pair.
+
     Args:
         response: FastAPI Response object
         refresh_token: Refresh token from cookie
-        db: Database session
+        db: Database session (unused; the session check goes through its hot index)
+        request: Incoming request (used for the client IP)
 
     Returns:
         New access token
@@ -248,10 +375,24 @@ async def refresh_access_token(
     # Verify refresh token
     payload = verify_refresh_token(refresh_token)
     user_id = payload.get("user_id")
-
-    # Generate new tokens
-    new_access_token = generate_access_token(user_id)
-    new_refresh_token = generate_refresh_token(user_id)
+    sid = payload.get("sid")
+
+    # Reject sessions ended by "log out everywhere"
+    if not await session_registry.is_live(sid, user_id):
+        raise HTTPException(status_code=401, detail="Session has been revoked")
+    session_registry.touch(sid, _client_ip(request))
+
+    # Other tabs refreshing with the same cookie get the pair already minted for it
+    jti = payload.get("jti")
+    pair = refresh_grace.get(jti) if jti else None
+    if pair is not None:
+        refresh_grace_hits.inc()
+        new_access_token, new_refresh_token = pair
+    else:
+        new_access_token = generate_access_token(user_id, sid)
+        new_refresh_token = generate_refresh_token(user_id, sid)
+        if jti:
+            refresh_grace.put(jti, (new_access_token, new_refresh_token))
 
     # Update refresh token in cookie
     response.set_cookie(
@@ -286,20 +427,16 @@ async def forgot_password(
         HTTPException: If user not found
     """
     # Find user by email
-    result = await db.execute(select(User).where(User.email == forgot_data.email))
-    user = result.scalar_one_or_none()
+    with span("user_lookup"):
+        user = await get_user_by_email(db, forgot_data.email)
 
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
 
-    # Generate reset code
-    reset_code = generate_verification_code()
-
-    # Store reset code in verification_token
-    user.verification_token = reset_code
-    await db.commit()
+    # Generate reset code (stored in verification_token unless stateless)
+    reset_code = await _issue_code(db, user, "reset")
 
     # Send reset code email in background
     background_tasks.add_task(
@@ -315,6 +452,7 @@ async def forgot_password(
 async def reset_password(
     reset_data: ResetPasswordRequest,
     db: AsyncSession,
+    request: Request | None = None,
 ) -> dict:
     """
     Reset user's password with verification code.
@@ -322,6 +460,7 @@ async def reset_password(
     Args:
         reset_data: Email, code, and new password
         db: Database session
+        request: Incoming request (used for the client IP in the audit trail)
 
     Returns:
         Success message
@@ -330,8 +469,8 @@ async def reset_password(
         HTTPException: If user not found or code is invalid
     """
     # Find user by email
-    result = await db.execute(select(User).where(User.email == reset_data.email))
-    user = result.scalar_one_or_none()
+    with span("user_lookup"):
+        user = await get_user_by_email(db, reset_data.email)
 
     if not user:
         raise HTTPException(
@@ -339,14 +478,166 @@ async def reset_password(
         )
 
     # Check reset code
-    if user.verification_token is None or user.verification_token != reset_data.code:
+    if not _code_matches(user, "reset", reset_data.code):
+        audit_log.record(
+            audit.PASSWORD_RESET,
+            success=False,
+            user_id=user.id,
+            email=user.email,
+            ip=_client_ip(request),
+            detail="invalid_code",
+        )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid reset code"
         )
 
-    # Hash new password and update
-    user.hashed_password = hash_password(reset_data.new_password)
-    user.verification_token = None  # Clear the code after use
-    await db.commit()
+    # Hash new password and update, clearing the code after use
+    await _update_user(
+        db,
+        user,
+        hashed_password=await run_hashing(hash_password, reset_data.new_password),
+        verification_token=None,
+    )
+    audit_log.record(
+        audit.PASSWORD_RESET, user_id=user.id, email=user.email, ip=_client_ip(request)
+    )
 
     return {"message": "Password reset successfully"}
+
+
+async def _require_live_session(claims: Dict) -> None:
+    if not await session_registry.is_live(claims.get("sid"), claims.get("user_id")):
+        raise HTTPException(status_code=401, detail="Session has been revoked")
+
+
+async def list_sessions(claims: Dict, db: AsyncSession) -> SessionListResponse:
+    """
+    List the current user's live sessions.
+
+    Args:
+        claims: Verified access token claims
+        db: Database session
+
+    Returns:
+        Sessions, most recently used first, with the caller's own marked current
+
+    Raises:
+        HTTPException: If the caller's session was revoked
+    """
+    await _require_live_session(claims)
+    current = claims.get("sid")
+    sessions = await session_registry.list_live(db, claims["user_id"])
+    return SessionListResponse(
+        sessions=[
+            SessionResponse(
+                id=session.id,
+                device=session.device,
+                ip=session.ip,
+                created_at=session.created_at,
+                last_used_at=session.last_used_at,
+                current=str(session.id) == current,
+            )
+            for session in sessions
+        ]
+    )
+
+
+async def logout(response: Response, refresh_token: str | None) -> dict:
+    """
+    Log out of the current session.
+
+    The cookie is always cleared. The refresh cookie's session is revoked
+    (best effort, see SessionRegistry.revoke), so neither the cookie nor a
+    copy of it can be refreshed again, and the session's access tokens stop
+    passing session checks and introspection. Only a cookie carrying a sid
+    touches the database.
+
+    Args:
+        response: FastAPI Response object (the refresh cookie is cleared)
+        refresh_token: Refresh token from cookie, if any
+
+    Returns:
+        Confirmation message
+    """
+    response.delete_cookie(key="refresh_token")
+    if refresh_token:
+        try:
+            payload = verify_refresh_token(refresh_token)
+        except HTTPException:
+            # Invalid or expired: there is no session left to end
+            payload = {}
+        if payload.get("sid"):
+            await session_registry.revoke(payload["sid"], payload.get("user_id"))
+    return {"message": "Logged out successfully"}
+
+
+async def revoke_all_sessions(claims: Dict, response: Response, db: AsyncSession) -> dict:
+    """
+    Log the current user out everywhere.
+
+    Every session is revoked in one statement; their refresh tokens stop
+    working at once, access tokens at their (short) expiry.
+
+    Args:
+        claims: Verified access token claims
+        response: FastAPI Response object (the refresh cookie is cleared)
+        db: Database session
+
+    Returns:
+        Number of sessions revoked
+
+    Raises:
+        HTTPException: If the caller's session was already revoked
+    """
+    await _require_live_session(claims)
+    revoked = await session_registry.revoke_all(db, claims["user_id"])
+    response.delete_cookie(key="refresh_token")
+    return {"message": "Logged out of all sessions", "revoked": revoked}
+
+
+async def introspect_tokens(tokens: list[str]) -> list[dict]:
+    """
+    Introspect access tokens for the API gateway (RFC 7662).
+
+    Signatures are checked through the verified-token cache, and revocation
+    of all tokens' sessions is resolved with at most one query. While the
+    database circuit is open, tokens whose session is not in the hot index are
+    reported inactive unless INTROSPECTION_FAIL_OPEN is set.
+
+    Args:
+        tokens: Access tokens, possibly repeated
+
+    Returns:
+        One result per token, in order: the token's claims with `active: true`,
+        or just `active: false` for invalid, expired or revoked tokens
+    """
+    claims_by_token: dict[str, Dict | None] = {}
+    for token in tokens:
+        if token in claims_by_token:
+            continue
+        try:
+            claims_by_token[token] = verify_access_token_cached(token)
+        except HTTPException:
+            claims_by_token[token] = None
+
+    verified = [(token, claims) for token, claims in claims_by_token.items() if claims]
+    live = await session_registry.live_many(
+        [(claims.get("sid"), claims.get("user_id")) for _, claims in verified],
+        fail_open=settings.INTROSPECTION_FAIL_OPEN,
+    )
+
+    results: dict[str, dict] = {token: {"active": False} for token in claims_by_token}
+    for (token, claims), is_live in zip(verified, live):
+        if not is_live:
+            continue
+        result = {
+            "active": True,
+            "sub": claims["user_id"],
+            "exp": claims["exp"],
+            "iat": claims.get("iat"),
+            "token_type": "access",
+        }
+        if "sid" in claims:
+            result["sid"] = claims["sid"]
+        results[token] = result
+    return [results[token] for token in tokens]
@@ -0,0 +1,210 @@
+"""
+Asynchronous auth audit trail.
+
+Controllers call audit_log.record(...), which only appends to a bounded
+in-memory ring buffer: no query, no await. A background task (run()) drains
+the buffer every AUDIT_FLUSH_SECONDS, or as soon as a full batch is waiting,
+and writes it to the sink in batches of AUDIT_BATCH_SIZE:
+
+- "database": one executemany INSERT per batch into auth_audit_events
+  (monthly partitions on PostgreSQL, see models/db_scheams/audit_event.py)
+- "file": one JSON object per line appended to AUDIT_FILE_PATH
+
+Backpressure is explicit: when the buffer is full the oldest event is
+overwritten and counted in audit_events_dropped_total{reason="overflow"}.
+A database outage puts the batch back at the front of the buffer and it is
+retried on the next flush (events it pushes out are counted as overflow);
+any other failed write drops the batch (reason="sink_error"), so one bad
+batch can't block the trail. Text fields are cut to their column lengths
+when recorded. A flush cancelled
+mid-write (shutdown) requeues its batch for the final flush.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from src.helpers.circuit_breaker import CircuitOpenError, db_circuit, is_outage
+from src.helpers.config import settings
+from src.helpers.db import get_engine, get_session_factory
+from src.helpers.metrics import audit_events_dropped, audit_events_written, audit_queue_depth
+from src.models.db_scheams.audit_event import AuditEvent, ensure_audit_partitions
+
+
+logger = logging.getLogger(__name__)
+
+# Audited events
+LOGIN = "login"
+SIGNUP = "signup"
+VERIFY_EMAIL = "verify_email"
+PASSWORD_RESET = "password_reset"
+
+# Column lengths, so an over-long value can't fail the whole batch
+_EVENT_LENGTH = AuditEvent.event.type.length
+_EMAIL_LENGTH = AuditEvent.email.type.length
+_IP_LENGTH = AuditEvent.ip.type.length
+_DETAIL_LENGTH = AuditEvent.detail.type.length
+
+
+class AuditLog:
+    """Ring buffer of audit events, flushed in batches by a background task."""
+
+    def __init__(
+        self,
+        sink: str = "database",
+        path: str = "",
+        max_events: int = 10_000,
+        batch_size: int = 500,
+    ):
+        self.sink = sink
+        self.path = path
+        self.max_events = max_events
+        self.batch_size = batch_size
+        self.buffer: deque[dict] = deque(maxlen=max_events)
+        self._batch_ready = asyncio.Event()
+
+    def record(
+        self,
+        event: str,
+        *,
+        success: bool = True,
+        user_id: uuid.UUID | str | None = None,
+        email: str | None = None,
+        ip: str = "",
+        detail: str | None = None,
+    ) -> None:
+        """Queue an event (never blocks; overwrites the oldest one if the buffer is full)."""
+        if not settings.AUDIT_ENABLED:
+            return
+        if isinstance(user_id, str):
+            try:
+                user_id = uuid.UUID(user_id)
+            except ValueError:
+                user_id = None
+        if len(self.buffer) == self.max_events:
+            audit_events_dropped.inc("overflow")
+        self.buffer.append(
+            {
+                "id": uuid.uuid4(),
+                "occurred_at": datetime.utcnow(),
+                "event": event[:_EVENT_LENGTH],
+                "success": success,
+                "user_id": user_id,
+                "email": email[:_EMAIL_LENGTH] if email else email,
+                "ip": ip[:_IP_LENGTH],
+                "detail": detail[:_DETAIL_LENGTH] if detail else detail,
+            }
+        )
+        if len(self.buffer) >= self.batch_size:
+            self._batch_ready.set()
+
+    async def flush(self) -> int:
+        """
+        Write everything buffered so far.
+
+        Returns:
+            Number of events written
+        """
+        written = 0
+        while self.buffer:
+            batch = [self.buffer.popleft() for _ in range(min(self.batch_size, len(self.buffer)))]
+            try:
+                if self.sink == "file":
+                    await asyncio.to_thread(self._append_lines, batch)
+                else:
+                    await self._insert(batch)
+            except Exception as exc:
+                if self.sink == "database" and (
+                    isinstance(exc, CircuitOpenError) or is_outage(exc)
+                ):
+                    logger.warning("Audit insert failed, retrying later: %r", exc)
+                    self._requeue(batch)
+                    break
+                logger.warning("Dropped %d audit events, write failed: %r", len(batch), exc)
+                audit_events_dropped.inc("sink_error", amount=len(batch))
+                continue
+            except BaseException:
+                # Cancelled mid-write (shutdown): keep the batch for the final flush
+                self._requeue(batch)
+                raise
+            written += len(batch)
+            audit_events_written.inc(self.sink, amount=len(batch))
+        audit_queue_depth.set(len(self.buffer))
+        return written
+
+    async def _insert(self, batch: list[dict]) -> None:
+        probe = db_circuit.acquire()
+        with db_circuit.record(probe):
+            async with get_session_factory()() as db:
+                # Core insert with a list of rows: one executemany per batch (the
+                # ORM bulk path would split rows by which columns are None)
+                await db.execute(insert(AuditEvent.__table__), batch)
+                await db.commit()
+
+    def _append_lines(self, batch: list[dict]) -> None:
+        lines = "".join(
+            json.dumps(
+                {
+                    **event,
+                    "id": str(event["id"]),
+                    "occurred_at": event["occurred_at"].isoformat(),
+                    "user_id": str(event["user_id"]) if event["user_id"] else None,
+                },
+                separators=(",", ":"),
+            )
+            + "\n"
+            for event in batch
+        )
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def _requeue(self, batch: list[dict]) -> None:
+        room = self.max_events - len(self.buffer)
+        if room < len(batch):
+            # Newer events stay; the oldest of the failed batch go
+            audit_events_dropped.inc("overflow", amount=len(batch) - room)
+            batch = batch[len(batch) - room:]
+        self.buffer.extendleft(reversed(batch))
+
+    def clear(self) -> None:
+        self.buffer.clear()
+        self._batch_ready.clear()
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    async def run(self, interval: float, partition_check_every: float = 86400.0) -> None:
+        """
+        Flush every `interval` seconds, or as soon as a batch is full, until cancelled.
+
+        With the database sink, next month's partition is also created once a day.
+        """
+        next_partition_check = time.monotonic() + partition_check_every
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            try:
+                await self.flush()
+                if self.sink == "database" and time.monotonic() >= next_partition_check:
+                    next_partition_check = time.monotonic() + partition_check_every
+                    async with get_engine().begin() as conn:
+                        await ensure_audit_partitions(conn)
+            except Exception as exc:
+                logger.warning("Audit flush failed: %r", exc)
+
+
+audit_log = AuditLog(
+    sink=settings.AUDIT_SINK,
+    path=settings.AUDIT_FILE_PATH,
+    max_events=settings.AUDIT_BUFFER_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+)
@@ -0,0 +1,95 @@
+"""
+Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+Writers publish an event inside their transaction (pg_notify is delivered on
+commit, and dropped on rollback). Every worker keeps one dedicated asyncpg
+connection listening on the channel and hands events to its cache handlers.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.helpers.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process so it can skip its own notifications
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+async def publish(db: AsyncSession, event: dict) -> None:
+    """
+    Queue an invalidation event on the current transaction.
+
+    Args:
+        db: Session whose transaction carries the write being announced
+        event: JSON-serializable event payload
+    """
+    if not settings.CACHE_NOTIFY_ENABLED:
+        return
+    payload = json.dumps({**event, "origin": WORKER_ID})
+    await db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": settings.CACHE_NOTIFY_CHANNEL, "payload": payload},
+    )
+
+
+class InvalidationListener:
+    """Keep a LISTEN connection open and dispatch events from other workers."""
+
+    def __init__(
+        self,
+        on_event: Callable[[dict], None],
+        on_reconnect: Callable[[], None],
+        retry_seconds: float = 5.0,
+        dsn: str | None = None,
+    ):
+        self.on_event = on_event
+        self.on_reconnect = on_reconnect
+        self.retry_seconds = retry_seconds
+        self.dsn = (dsn or settings.get_database_url()).replace(
+            "postgresql+asyncpg://", "postgresql://"
+        )
+
+    def _handle(self, connection, pid, channel, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed invalidation payload: %r", payload)
+            return
+        if event.get("origin") != WORKER_ID:
+            self.on_event(event)
+
+    async def run(self) -> None:
+        """Listen until cancelled, reconnecting after connection loss."""
+        import asyncpg
+
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(settings.CACHE_NOTIFY_CHANNEL, self._handle)
+                # Events may have been missed while disconnected
+                self.on_reconnect()
+                await closed.wait()
+                logger.warning("Cache invalidation listener lost its connection")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Cache invalidation listener failed: %s", exc)
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            # Nothing tells us about writes while we're down; don't trust the cache
+            self.on_reconnect()
+            await asyncio.sleep(self.retry_seconds)
@@ -0,0 +1,140 @@
+"""
+Circuit breaker for the database.
+
+After DB_CIRCUIT_FAILURE_THRESHOLD consecutive outage errors (refused or
+dropped connections, pool or connect timeouts) the circuit opens: get_db
+answers 503 immediately for DB_CIRCUIT_OPEN_SECONDS instead of letting every
+request wait for its own timeout. Then one request at a time is let through as
+a probe (half-open); it runs SELECT 1 first, and the circuit closes when that
+succeeds or opens again when it fails.
+
+Errors that only mean the query was wrong (integrity, data errors) and
+HTTPExceptions raised by handlers count as successes: the database answered.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from sqlalchemy import exc as sa_exc
+
+from src.helpers.config import settings
+from src.helpers.metrics import db_circuit_rejections, db_circuit_state
+
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of using the database while the circuit is open."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"circuit open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+def is_outage(error: BaseException) -> bool:
+    """Whether an error means the database could not be reached in time."""
+    if isinstance(error, sa_exc.DBAPIError):
+        return error.connection_invalidated or isinstance(
+            error, (sa_exc.OperationalError, sa_exc.InterfaceError)
+        )
+    # Pool checkout timeouts, connect timeouts and refused connections
+    return isinstance(error, (sa_exc.TimeoutError, asyncio.TimeoutError, OSError))
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe."""
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        open_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        db_circuit_state.set(_STATE_VALUES[state])
+
+    def acquire(self) -> bool:
+        """
+        Let a call through or reject it.
+
+        Returns:
+            True if the call is the half-open probe
+
+        Raises:
+            CircuitOpenError: If the circuit is open (or a probe is already running)
+        """
+        if self.state == CLOSED:
+            return False
+        remaining = self._opened_at + self.open_seconds - self.clock()
+        if self.state == OPEN and remaining <= 0:
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        db_circuit_rejections.inc()
+        raise CircuitOpenError(max(remaining, 0.0))
+
+    def record_success(self, probe: bool = False) -> None:
+        if probe:
+            self._probing = False
+            self._set_state(CLOSED)
+        if self.state == CLOSED:
+            self.failures = 0
+
+    def record_failure(self, probe: bool = False) -> None:
+        if probe:
+            self._probing = False
+        self.failures += 1
+        if probe or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self._opened_at = self.clock()
+            self._set_state(OPEN)
+
+    def reset(self) -> None:
+        self.failures = 0
+        self._probing = False
+        self._set_state(CLOSED)
+
+    @contextmanager
+    def record(self, probe: bool) -> Iterator[None]:
+        """
+        Record the outcome of a block of database work let through by acquire().
+
+        Args:
+            probe: What acquire() returned for this call
+        """
+        try:
+            yield
+        except asyncio.CancelledError:
+            # The client went away; that says nothing about the database
+            if probe:
+                self._probing = False
+            raise
+        except BaseException as error:
+            if is_outage(error):
+                self.record_failure(probe)
+            else:
+                self.record_success(probe)
+            raise
+        self.record_success(probe)
+
+
+db_circuit = CircuitBreaker(
+    failure_threshold=settings.DB_CIRCUIT_FAILURE_THRESHOLD,
+    open_seconds=settings.DB_CIRCUIT_OPEN_SECONDS,
+)
@@ -25,6 +25,16 @@ class Settings(BaseSettings):
     REFRESH_SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_DAYS: int
+    # Repeat refreshes of one token within this window get the same new pair (0 disables)
+    REFRESH_GRACE_SECONDS: float = 10.0
+    REFRESH_GRACE_MAX_ENTRIES: int = 10_000
+
+    # Stateless verification/reset codes: derived with HMAC instead of stored, so
+    # resends cost no write. A code is valid for 1 to 2 windows.
+    STATELESS_CODES_ENABLED: bool = False
+    STATELESS_CODE_WINDOW_SECONDS: int = 600
+    # HMAC key for the codes; empty = derived from SECRET_KEY (never the JWT key itself)
+    CODE_SECRET_KEY: str = ""
 
     # Email
     MAIL_USERNAME: str
@@ -34,6 +44,147 @@ class Settings(BaseSettings):
     MAIL_SERVER: str
     MAIL_STARTTLS: bool = True
     MAIL_SSL_TLS: bool = False
+    # Mail transport: "smtp", "memory" (in-process capture) or "local" (stand-in server)
+    MAIL_BACKEND: str = "smtp"
+    MAIL_CAPTURE_MAX_MESSAGES: int = 1000
+    LOCAL_SMTP_HOST: str = "127.0.0.1"
+    LOCAL_SMTP_PORT: int = 1025
+
+    # Rate limiting: "memory" (per worker) or "postgres" (shared by all workers)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    RATE_LIMIT_SHARDS: int = 16
+    RATE_LIMIT_TRUST_FORWARDED: bool = False
+
+    # Idempotency-Key support (responses stored in memory and in idempotency_keys)
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_PATHS: str = "/auth/signup,/auth/forgot-password,/auth/resend-code"
+    IDEMPOTENCY_TTL_SECONDS: float = 86400.0
+    IDEMPOTENCY_CACHE_MAX_ENTRIES: int = 10_000
+    IDEMPOTENCY_LOCK_SECONDS: float = 60.0  # unfinished claims are taken over after this
+    IDEMPOTENCY_PRUNE_SECONDS: float = 3600.0
+
+    # Auth audit trail, written in batches by a background task
+    AUDIT_ENABLED: bool = True
+    AUDIT_SINK: str = "database"  # database | file
+    AUDIT_FILE_PATH: str = "audit.jsonl"
+    AUDIT_BUFFER_SIZE: int = 10_000
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_SECONDS: float = 1.0
+
+    # Failed-login lockout (per account and per IP)
+    LOGIN_LOCKOUT_THRESHOLD: int = 5
+    LOGIN_LOCKOUT_IP_THRESHOLD: int = 20
+    LOGIN_LOCKOUT_BASE_SECONDS: float = 1.0
+    LOGIN_LOCKOUT_MAX_SECONDS: float = 900.0
+    LOGIN_FAILURE_HALF_LIFE_SECONDS: float = 900.0
+    LOGIN_FAILURE_MAX_ENTRIES: int = 100_000
+    LOGIN_FAILURE_FLUSH_SECONDS: float = 60.0
+
+    # Negative lookup cache for unregistered emails, optionally fronted by a Bloom filter
+    NEGATIVE_CACHE_ENABLED: bool = True
+    NEGATIVE_CACHE_MAX_ENTRIES: int = 100_000
+    NEGATIVE_CACHE_TTL_SECONDS: float = 60.0
+    EMAIL_BLOOM_ENABLED: bool = False
+    EMAIL_BLOOM_CAPACITY: int = 1_000_000
+    EMAIL_BLOOM_ERROR_RATE: float = 0.01
+    EMAIL_BLOOM_REFRESH_SECONDS: float = 30.0
+
+    # In-process user lookup cache, kept coherent across workers with LISTEN/NOTIFY
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_MAX_ENTRIES: int = 10_000
+    USER_CACHE_TTL_SECONDS: float = 30.0
+    CACHE_NOTIFY_ENABLED: bool = True
+    # Concurrent identical user lookups share one in-flight query
+    SINGLE_FLIGHT_ENABLED: bool = True
+    CACHE_NOTIFY_CHANNEL: str = "auth_cache_invalidation"
+
+    # Verified access-token cache (0 entries disables it)
+    TOKEN_CACHE_MAX_ENTRIES: int = 10_000
+    TOKEN_CACHE_TTL_SECONDS: float = 60.0
+
+    # Token introspection for the API gateway (RFC 7662); disabled while the secret is empty
+    INTROSPECTION_CLIENT_ID: str = "gateway"
+    INTROSPECTION_CLIENT_SECRET: str = ""
+    # Whether unknown sessions count as active while the database is unreachable
+    INTROSPECTION_FAIL_OPEN: bool = False
+
+    # Login sessions (hot index of session liveness; last-used times are written in batches)
+    SESSION_CACHE_MAX_ENTRIES: int = 100_000
+    SESSION_CACHE_TTL_SECONDS: float = 60.0
+    SESSION_TOUCH_FLUSH_SECONDS: float = 30.0
+
+    # Password hashing thread pool (0 = one thread per CPU, at most 4)
+    BCRYPT_MAX_WORKERS: int = 0
+
+    # Prometheus metrics; set METRICS_MULTIPROC_DIR to aggregate across uvicorn workers
+    METRICS_ENABLED: bool = True
+    METRICS_MULTIPROC_DIR: str = ""
+    METRICS_FLUSH_SECONDS: float = 5.0
+
+    # Request tracing: Server-Timing header and OTLP/JSON span export (file and/or collector)
+    SERVER_TIMING_ENABLED: bool = False
+    TRACING_ENABLED: bool = False
+    TRACE_EXPORT_PATH: str = ""
+    TRACE_EXPORT_URL: str = ""  # e.g. http://127.0.0.1:4318/v1/traces
+    TRACE_SERVICE_NAME: str = "auth-api"
+
+    # SQL logging: echo every statement (debug only), slow-query log, per-request budget
+    DB_ECHO: bool = False
+    SLOW_QUERY_THRESHOLD_MS: float = 100.0
+    QUERY_BUDGET_PER_REQUEST: int = 10
+
+    # Event-loop lag sampler; stalls over the threshold log the blocking stack
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_LAG_SAMPLE_SECONDS: float = 0.1
+    LOOP_LAG_THRESHOLD_SECONDS: float = 0.25
+
+    # Per-request profiling (off by default): X-Profile-Token header or random sampling
+    PROFILING_ENABLED: bool = False
+    PROFILING_TOKEN: str = ""
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_INTERVAL_SECONDS: float = 0.001
+    PROFILING_DIR: str = "profiles"
+    PROFILING_MAX_FILES: int = 50
+
+    # Connection pool (PostgreSQL); DB_POOL_WARM connections are opened at startup
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_WARM: int = 5
+    DB_CONNECT_TIMEOUT_SECONDS: float = 5.0
+
+    # Database circuit breaker: get_db answers 503 at once while the database is down
+    DB_CIRCUIT_ENABLED: bool = True
+    DB_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    DB_CIRCUIT_OPEN_SECONDS: float = 10.0
+    DB_CIRCUIT_PROBE_TIMEOUT_SECONDS: float = 2.0
+
+    # Production server (python -m src.serve); SERVER_WORKERS=0 means one per core
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = 30
+    EMAIL_DRAIN_TIMEOUT_SECONDS: float = 10.0
+
+    # Startup warm-up (pool, hot statements, crypto, schemas, mail backend). The pool
+    # and hot statements always warm before serving; without WARMUP_BLOCKING the
+    # rest runs in the background and /health reports 503 until done
+    WARMUP_ENABLED: bool = True
+    WARMUP_BLOCKING: bool = False
+    WARMUP_TIMEOUT_SECONDS: float = 30.0
+
+    # Render response models straight to JSON bytes (src/helpers/responses.py)
+    FAST_JSON_RESPONSES: bool = True
+
+    # Readiness probe (/readyz answers from a cached report refreshed in the background)
+    READINESS_CHECK_INTERVAL_SECONDS: float = 2.0
+    READINESS_CHECK_TIMEOUT_SECONDS: float = 1.0
+    READINESS_MAX_POOL_UTILIZATION: float = 1.0
+    READINESS_EMAIL_FAILURE_THRESHOLD: int = 5
 
     CORS_ORIGINS: str
 
@@ -1,23 +1,134 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+import asyncio
+import math
+from contextlib import AsyncExitStack, nullcontext
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (
+    create_async_engine,
+    AsyncConnection,
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+)
 from sqlalchemy.orm import declarative_base
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Awaitable, Callable
+from .circuit_breaker import CircuitOpenError, db_circuit, is_outage
 from .config import settings
 
-# Database Setup
-engine = create_async_engine(settings.get_database_url(), echo=True)
-AsyncSessionLocal = async_sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+
+def _engine_options(url: str) -> dict:
+    options = {"echo": settings.DB_ECHO}
+    # SQLite (benchmarks) uses its own pool classes without sizing options
+    if url.startswith("postgresql"):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            # asyncpg waits 60s for an unreachable server by default
+            connect_args={"timeout": settings.DB_CONNECT_TIMEOUT_SECONDS},
+        )
+    return options
+
+
+# Database Setup (created on first use, so importing the app doesn't load the driver)
+_engine: AsyncEngine | None = None
+_session_factory: async_sessionmaker[AsyncSession] | None = None
+
+
+def get_engine() -> AsyncEngine:
+    """Return the process-wide engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        url = settings.get_database_url()
+        _engine = create_async_engine(url, **_engine_options(url))
+    return _engine
+
+
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Return the process-wide session factory, creating it on first use."""
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = async_sessionmaker(
+            bind=get_engine(),
+            class_=AsyncSession,
+            expire_on_commit=False,
+        )
+    return _session_factory
+
+
+def __getattr__(name: str):
+    # Keep `from src.helpers.db import engine, AsyncSessionLocal` working
+    if name == "engine":
+        return get_engine()
+    if name == "AsyncSessionLocal":
+        return get_session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 Base = declarative_base()
 
 
+def _unavailable(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Database temporarily unavailable",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
 # Dependency to get DB session
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with AsyncSessionLocal() as session:
+    probe = False
+    if settings.DB_CIRCUIT_ENABLED:
         try:
-            yield session
-        finally:
-            await session.close()
+            probe = db_circuit.acquire()
+        except CircuitOpenError as exc:
+            # Fail in microseconds instead of waiting for a connection timeout
+            raise _unavailable(exc.retry_after) from None
+    handed_out = False
+    try:
+        with db_circuit.record(probe) if settings.DB_CIRCUIT_ENABLED else nullcontext():
+            async with get_session_factory()() as session:
+                try:
+                    if probe:
+                        # Half-open: check the connection before handing it out
+                        await asyncio.wait_for(
+                            session.execute(text("SELECT 1")),
+                            settings.DB_CIRCUIT_PROBE_TIMEOUT_SECONDS,
+                        )
+                    handed_out = True
+                    yield session
+                finally:
+                    await session.close()
+    except Exception as exc:
+        # A failed probe re-opened the circuit; answer like the requests it rejects
+        if handed_out or not is_outage(exc):
+            raise
+        raise _unavailable(db_circuit.open_seconds) from exc
+
+
+async def warm_pool(
+    connections: int,
+    prime: Callable[[AsyncConnection], Awaitable[None]] | None = None,
+) -> None:
+    """
+    Open `connections` pool connections at once and return them to the pool.
+
+    Run at startup so the first requests don't pay for connection setup.
+
+    Args:
+        connections: Number of connections to hold open together
+        prime: Run on every connection while it is held (default: SELECT 1)
+    """
+    async with AsyncExitStack() as stack:
+        results = await asyncio.gather(
+            *(stack.enter_async_context(get_engine().connect()) for _ in range(connections)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        if prime is None:
+            await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in results))
+        else:
+            await asyncio.gather(*(prime(conn) for conn in results))
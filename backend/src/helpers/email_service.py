@@ -1,26 +1,69 @@
 """
 Email service for sending verification emails.
-Uses FastAPI-Mail for async email sending.
+Uses FastAPI-Mail messages delivered through the configured mail backend.
 """
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
+import asyncio
+import time
+
+from typing import TYPE_CHECKING
+
 from pydantic import EmailStr
 
 from src.helpers.config import settings
+from src.helpers.mail_backends import get_mail_backend
+from src.helpers.metrics import email_send_duration, email_send_failures, emails_in_flight
+
+if TYPE_CHECKING:
+    from fastapi_mail import MessageSchema
+
+_in_flight = 0
+# Sends failed in a row; reset by the next successful send
+_consecutive_failures = 0
 
 
-# Email configuration
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.MAIL_USERNAME,
-    MAIL_PASSWORD=settings.MAIL_PASSWORD,
-    MAIL_FROM=settings.MAIL_FROM,
-    MAIL_PORT=settings.MAIL_PORT,
-    MAIL_SERVER=settings.MAIL_SERVER,
-    MAIL_STARTTLS=settings.MAIL_STARTTLS,
-    MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-)
+async def _send(message: "MessageSchema", kind: str) -> None:
+    """Deliver `message` through the mail backend, recording latency and failures."""
+    global _in_flight, _consecutive_failures
+    _in_flight += 1
+    emails_in_flight.inc()
+    started = time.perf_counter()
+    try:
+        await get_mail_backend().send_message(message)
+        _consecutive_failures = 0
+    except Exception:
+        _consecutive_failures += 1
+        email_send_failures.inc(kind)
+        raise
+    finally:
+        email_send_duration.observe(time.perf_counter() - started, kind)
+        _in_flight -= 1
+        emails_in_flight.dec()
+
+
+def email_status() -> dict:
+    """State of email delivery for the readiness check."""
+    return {
+        "backend": settings.MAIL_BACKEND,
+        "in_flight": _in_flight,
+        "consecutive_failures": _consecutive_failures,
+    }
+
+
+async def wait_for_pending_emails(timeout: float) -> int:
+    """
+    Wait for emails that are still being sent (e.g. during shutdown).
+
+    Args:
+        timeout: Maximum seconds to wait
+
+    Returns:
+        Number of emails still in flight when giving up (0 if all finished)
+    """
+    deadline = time.monotonic() + timeout
+    while _in_flight and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    return _in_flight
 
 
 async def send_verification_email(email: EmailStr, code: str, name: str) -> None:
@@ -47,6 +90,8 @@ async def send_verification_email(email: EmailStr, code: str, name: str) -> None
     </html>
     """
 
+    from fastapi_mail import MessageSchema, MessageType
+
     message = MessageSchema(
         subject="Your Verification Code",
         recipients=[email],
@@ -54,8 +99,7 @@ async def send_verification_email(email: EmailStr, code: str, name: str) -> None
         subtype=MessageType.html,
     )
 
-    fm = FastMail(conf)
-    await fm.send_message(message)
+    await _send(message, "verification")
 
 
 async def send_password_reset_email(email: EmailStr, code: str, name: str) -> None:
@@ -83,6 +127,8 @@ async def send_password_reset_email(email: EmailStr, code: str, name: str) -> No
     </html>
     """
 
+    from fastapi_mail import MessageSchema, MessageType
+
     message = MessageSchema(
         subject="Password Reset Code",
         recipients=[email],
@@ -90,5 +136,4 @@ async def send_password_reset_email(email: EmailStr, code: str, name: str) -> No
         subtype=MessageType.html,
     )
 
-    fm = FastMail(conf)
-    await fm.send_message(message)
+    await _send(message, "password_reset")
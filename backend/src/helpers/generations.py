@@ -0,0 +1,39 @@
+"""
+Per-key invalidation generations for the in-process caches.
+
+A cache fill races with invalidation: a SELECT that started before another
+worker committed can finish after that worker's NOTIFY was handled, and would
+then cache the old row. Readers take generation(key) before querying and only
+fill the cache if it is unchanged afterwards; invalidations call bump(key).
+"""
+
+from collections import OrderedDict
+from typing import Hashable
+
+
+class Generations:
+    """Bounded map of key -> sequence number of its last invalidation."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._seq = 0
+        # Generation of keys not (or no longer) tracked. Raised when an entry is
+        # evicted, so forgetting a key never makes an old read look current.
+        self._floor = 0
+        self._last: OrderedDict[Hashable, int] = OrderedDict()
+
+    def current(self, key: Hashable) -> int:
+        return self._last.get(key, self._floor)
+
+    def bump(self, key: Hashable) -> None:
+        self._seq += 1
+        self._last.pop(key, None)
+        self._last[key] = self._seq
+        if len(self._last) > self.max_entries:
+            _, evicted = self._last.popitem(last=False)
+            self._floor = max(self._floor, evicted)
+
+    def bump_all(self) -> None:
+        self._seq += 1
+        self._floor = self._seq
+        self._last.clear()
@@ -0,0 +1,154 @@
+"""
+Readiness checks for /readyz.
+
+Probes hit every worker several times a second, so /readyz never queries the
+database itself: a background task refreshes a cached report every
+READINESS_CHECK_INTERVAL_SECONDS and probes are answered from it. A report
+older than three intervals (the task is not running, e.g. in tests) is
+refreshed inline, with concurrent probes sharing one check.
+
+A worker is not ready while it warms up, while the database circuit is open,
+or when the database does not answer SELECT 1 within
+READINESS_CHECK_TIMEOUT_SECONDS. A pool with at least
+READINESS_MAX_POOL_UTILIZATION of its connections checked out only degrades
+the report: the worker is busy, not broken, and taking it out of rotation
+would push its load onto the others. Such a pool is not queried at all, since
+the check would queue behind real traffic. Failing email delivery also only
+degrades the report, since logins keep working without it.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import text
+
+from src.helpers.circuit_breaker import OPEN, db_circuit
+from src.helpers.config import settings
+from src.helpers.db import get_engine
+from src.helpers.email_service import email_status
+from src.helpers.warmup import warmup_state
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ReadinessReport:
+    """Outcome of one readiness check."""
+
+    status: str  # "ready", "degraded", "not_ready" or "warming_up"
+    checked_at: float  # time.monotonic() of the check
+    checks: dict = field(default_factory=dict)
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("ready", "degraded")
+
+    def to_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "age_seconds": round(time.monotonic() - self.checked_at, 3),
+            "checks": self.checks,
+        }
+
+
+def pool_status() -> dict:
+    """Checked-out connections against the pool's capacity (if it has one)."""
+    pool = get_engine().sync_engine.pool
+    if not hasattr(pool, "checkedout"):
+        # NullPool / StaticPool (SQLite) have no capacity to run out of
+        return {"checked_out": None, "capacity": None, "utilization": 0.0}
+    capacity = pool.size() + max(0, settings.DB_MAX_OVERFLOW)
+    checked_out = pool.checkedout()
+    return {
+        "checked_out": checked_out,
+        "capacity": capacity,
+        "utilization": round(checked_out / capacity, 3) if capacity else 0.0,
+    }
+
+
+async def _select_one() -> None:
+    async with get_engine().connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def _ping_database(timeout: float) -> str:
+    try:
+        await asyncio.wait_for(_select_one(), timeout)
+    except asyncio.TimeoutError:
+        return "timeout"
+    except Exception as exc:
+        logger.warning("Readiness check could not reach the database: %r", exc)
+        return "error"
+    return "connected"
+
+
+class ReadinessChecker:
+    """Cached readiness report, refreshed in the background."""
+
+    def __init__(self, interval: float, timeout: float):
+        self.interval = interval
+        self.timeout = timeout
+        self._report: ReadinessReport | None = None
+        self._refreshing: asyncio.Task | None = None
+
+    async def check(self) -> ReadinessReport:
+        """Run every check now and cache the result."""
+        pool = pool_status()
+        if db_circuit.state == OPEN:
+            database = "circuit_open"
+        elif pool["utilization"] >= settings.READINESS_MAX_POOL_UTILIZATION:
+            database = "saturated"
+        else:
+            database = await _ping_database(self.timeout)
+        email = email_status()
+
+        if database not in ("connected", "saturated"):
+            status = "not_ready"
+        elif (
+            database == "saturated"
+            or email["consecutive_failures"] >= settings.READINESS_EMAIL_FAILURE_THRESHOLD
+        ):
+            status = "degraded"
+        else:
+            status = "ready"
+        self._report = ReadinessReport(
+            status=status,
+            checked_at=time.monotonic(),
+            checks={
+                "database": database,
+                "circuit": db_circuit.state,
+                "pool": pool,
+                "email": email,
+            },
+        )
+        return self._report
+
+    async def current(self) -> ReadinessReport:
+        """The cached report, or a fresh one if it is missing or stale."""
+        if not warmup_state.ready:
+            return ReadinessReport(status="warming_up", checked_at=time.monotonic())
+        report = self._report
+        if report is not None and time.monotonic() - report.checked_at < 3 * self.interval:
+            return report
+        # One check for every probe that arrives while it runs
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self.check())
+        return await asyncio.shield(self._refreshing)
+
+    async def run(self) -> None:
+        """Refresh the cached report until cancelled."""
+        while True:
+            try:
+                await self.check()
+            except Exception as exc:
+                logger.warning("Readiness check failed: %r", exc)
+            await asyncio.sleep(self.interval)
+
+
+readiness = ReadinessChecker(
+    interval=settings.READINESS_CHECK_INTERVAL_SECONDS,
+    timeout=settings.READINESS_CHECK_TIMEOUT_SECONDS,
+)
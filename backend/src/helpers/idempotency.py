@@ -0,0 +1,273 @@
+"""
+Response store for requests sent with an Idempotency-Key header.
+
+Mobile clients retry signup, forgot-password and resend-code on flaky
+networks. The first request with a given key claims it (an in-flight marker
+in memory and an idempotency_keys row with no response yet), runs, and its
+response is stored; repeats within IDEMPOTENCY_TTL_SECONDS get that response
+back without bcrypt, writes or emails.
+
+- A repeat that arrives while the first request is still running gets 409
+  (this worker knows from its in-flight map, other workers from the row).
+- Reusing a key for a different request (method, path or body) gets 422.
+- Responses are cached in memory (TTL and LRU bounded) in front of the table,
+  so repeats on the same worker cost no query.
+- 5xx responses and failed requests release the key, so a retry runs again.
+- A claim whose request never finished (worker killed) is taken over after
+  IDEMPOTENCY_LOCK_SECONDS.
+
+While the database circuit is open the store works from memory only.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from src.helpers.circuit_breaker import CircuitOpenError, db_circuit
+from src.helpers.config import settings
+from src.helpers.db import get_session_factory
+from src.models.db_scheams.idempotency_key import IdempotencyKey
+
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of IdempotencyStore.begin()
+PROCEED = "proceed"
+REPLAY = "replay"
+CONFLICT = "conflict"
+MISMATCH = "mismatch"
+
+MAX_KEY_LENGTH = 255
+# Larger responses are not stored (the auth endpoints answer a few hundred bytes)
+MAX_STORED_BODY_BYTES = 64 * 1024
+# Not the final answer to the request: a retry has to run again
+_UNSTORED_STATUSES = {409, 429}
+
+
+@dataclass(frozen=True, slots=True)
+class StoredResponse:
+    """A response as sent: status, raw ASGI headers and body."""
+
+    status_code: int
+    headers: tuple[tuple[bytes, bytes], ...]
+    body: bytes
+
+    @property
+    def storable(self) -> bool:
+        return (
+            self.status_code < 500
+            and self.status_code not in _UNSTORED_STATUSES
+            and len(self.body) <= MAX_STORED_BODY_BYTES
+        )
+
+
+def request_fingerprint(method: str, path: str, body: bytes) -> str:
+    """Hash identifying a request, to detect a key reused for a different one."""
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def _dump_headers(headers: tuple[tuple[bytes, bytes], ...]) -> str:
+    return json.dumps([[name.decode("latin-1"), value.decode("latin-1")] for name, value in headers])
+
+
+def _load_headers(raw: str | None) -> tuple[tuple[bytes, bytes], ...]:
+    return tuple(
+        (name.encode("latin-1"), value.encode("latin-1")) for name, value in json.loads(raw or "[]")
+    )
+
+
+class IdempotencyStore:
+    """Claims keys and stores their responses, in memory and in idempotency_keys."""
+
+    def __init__(self, max_entries: int, ttl: float, lock_seconds: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock_seconds = lock_seconds
+        # key -> (expires_at, fingerprint, response)
+        self._responses: OrderedDict[str, tuple[float, str, StoredResponse]] = OrderedDict()
+        # key -> fingerprint of requests running on this worker
+        self._in_flight: dict[str, str] = {}
+
+    # Memory
+
+    def _cached(self, key: str) -> tuple[str, StoredResponse] | None:
+        entry = self._responses.get(key)
+        if entry is None:
+            return None
+        expires_at, fingerprint, response = entry
+        if expires_at < time.monotonic():
+            del self._responses[key]
+            return None
+        self._responses.move_to_end(key)
+        return fingerprint, response
+
+    def _remember(
+        self, key: str, fingerprint: str, response: StoredResponse, ttl: float
+    ) -> None:
+        self._responses.pop(key, None)
+        if len(self._responses) >= self.max_entries:
+            self._responses.popitem(last=False)
+        self._responses[key] = (time.monotonic() + ttl, fingerprint, response)
+
+    def clear(self) -> None:
+        self._responses.clear()
+        self._in_flight.clear()
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    # Requests
+
+    async def begin(self, key: str, fingerprint: str) -> tuple[str, StoredResponse | None]:
+        """
+        Claim `key` for a request, unless it was already used.
+
+        Returns:
+            (PROCEED, None) if the caller should run the request and then call
+            complete() or abandon(); (REPLAY, response) for a finished repeat;
+            (CONFLICT, None) while the first request is running; (MISMATCH, None)
+            if the key belongs to a different request
+        """
+        cached = self._cached(key)
+        if cached is not None:
+            return (REPLAY, cached[1]) if cached[0] == fingerprint else (MISMATCH, None)
+        running = self._in_flight.get(key)
+        if running is not None:
+            return (CONFLICT if running == fingerprint else MISMATCH), None
+
+        # Claimed locally before the first await, so concurrent repeats see it
+        self._in_flight[key] = fingerprint
+        try:
+            outcome = await self._claim(key, fingerprint)
+        except CircuitOpenError:
+            return PROCEED, None
+        except BaseException:
+            self._in_flight.pop(key, None)
+            raise
+        if outcome[0] != PROCEED:
+            self._in_flight.pop(key, None)
+        return outcome
+
+    async def _claim(self, key: str, fingerprint: str) -> tuple[str, StoredResponse | None]:
+        probe = db_circuit.acquire()
+        now = datetime.utcnow()
+        with db_circuit.record(probe):
+            async with get_session_factory()() as db:
+                row = (
+                    await db.execute(select(IdempotencyKey).where(IdempotencyKey.key == key))
+                ).scalar_one_or_none()
+                if row is not None and (
+                    row.expires_at <= now
+                    or (
+                        row.status_code is None
+                        and row.created_at <= now - timedelta(seconds=self.lock_seconds)
+                    )
+                ):
+                    # Expired, or claimed by a request that never finished
+                    await db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key))
+                    row = None
+                if row is not None:
+                    if row.fingerprint != fingerprint:
+                        return MISMATCH, None
+                    if row.status_code is None:
+                        return CONFLICT, None
+                    response = StoredResponse(row.status_code, _load_headers(row.headers), row.body)
+                    remaining = (row.expires_at - now).total_seconds()
+                    self._remember(key, fingerprint, response, min(remaining, self.ttl))
+                    return REPLAY, response
+
+                db.add(
+                    IdempotencyKey(
+                        key=key,
+                        fingerprint=fingerprint,
+                        created_at=now,
+                        expires_at=now + timedelta(seconds=self.ttl),
+                    )
+                )
+                try:
+                    await db.commit()
+                except IntegrityError:
+                    # Another worker claimed it between our read and insert
+                    return CONFLICT, None
+        return PROCEED, None
+
+    async def complete(self, key: str, fingerprint: str, response: StoredResponse) -> None:
+        """Store the response of a request begin() let through (errors are logged, not raised)."""
+        if not response.storable:
+            await self.abandon(key)
+            return
+        self._remember(key, fingerprint, response, self.ttl)
+        self._in_flight.pop(key, None)
+        try:
+            probe = db_circuit.acquire()
+            with db_circuit.record(probe):
+                async with get_session_factory()() as db:
+                    await db.execute(
+                        update(IdempotencyKey)
+                        .where(IdempotencyKey.key == key)
+                        .values(
+                            status_code=response.status_code,
+                            headers=_dump_headers(response.headers),
+                            body=response.body,
+                        )
+                    )
+                    await db.commit()
+        except Exception as exc:
+            # Still served from this worker's memory
+            logger.warning("Could not store idempotent response: %r", exc)
+
+    async def abandon(self, key: str) -> None:
+        """Release a key whose request failed, so a retry runs again (errors are logged)."""
+        self._in_flight.pop(key, None)
+        try:
+            probe = db_circuit.acquire()
+            with db_circuit.record(probe):
+                async with get_session_factory()() as db:
+                    await db.execute(
+                        delete(IdempotencyKey).where(
+                            IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None)
+                        )
+                    )
+                    await db.commit()
+        except Exception as exc:
+            # The claim is taken over after IDEMPOTENCY_LOCK_SECONDS
+            logger.warning("Could not release idempotency key: %r", exc)
+
+    # Maintenance
+
+    async def prune(self) -> int:
+        """Delete expired keys."""
+        async with get_session_factory()() as db:
+            result = await db.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.utcnow())
+            )
+            await db.commit()
+        return result.rowcount
+
+    async def run_periodic_prune(self, interval: float) -> None:
+        """Prune expired keys every `interval` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.prune()
+            except Exception as exc:
+                logger.warning("Idempotency key pruning failed: %r", exc)
+
+
+idempotency_store = IdempotencyStore(
+    max_entries=settings.IDEMPOTENCY_CACHE_MAX_ENTRIES,
+    ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+    lock_seconds=settings.IDEMPOTENCY_LOCK_SECONDS,
+)
@@ -0,0 +1,175 @@
+"""
+Local stand-in SMTP server for offline development, CI and load tests.
+
+Speaks just enough SMTP (HELO/EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT) for
+aiosmtplib / FastAPI-Mail to deliver messages to it. Nothing is relayed:
+received messages are kept in a bounded in-memory list.
+
+Run it standalone with:
+    python -m src.helpers.local_smtp --port 1025
+"""
+
+import argparse
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from email import message_from_bytes
+from email.header import decode_header, make_header
+from typing import Callable
+
+
+@dataclass(frozen=True)
+class ReceivedMessage:
+    """A message accepted by the local SMTP server."""
+
+    mail_from: str
+    rcpt_tos: tuple[str, ...]
+    data: bytes
+    received_at: float  # Unix timestamp
+
+    @property
+    def subject(self) -> str:
+        """Decoded Subject header of the message."""
+        raw = message_from_bytes(self.data).get("Subject", "")
+        return str(make_header(decode_header(raw)))
+
+
+class LocalSMTPServer:
+    """Minimal asyncio SMTP server that records every message it receives."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 1025,
+        max_messages: int = 1000,
+        on_message: Callable[[ReceivedMessage], None] | None = None,
+    ):
+        self.host = host
+        self.port = port
+        self.messages: deque[ReceivedMessage] = deque(maxlen=max_messages)
+        self.on_message = on_message
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self) -> None:
+        """Start listening. With port=0 the bound port is stored in self.port."""
+        self._server = await asyncio.start_server(
+            self._handle_client, self.host, self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Stop listening and close the server."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "LocalSMTPServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.stop()
+
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        async def reply(line: str) -> None:
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        mail_from = ""
+        rcpt_tos: list[str] = []
+
+        try:
+            await reply("220 localhost Local SMTP stand-in ready")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                command, _, argument = line.decode("utf-8", "replace").strip().partition(" ")
+                command = command.upper()
+
+                if command in ("HELO", "EHLO"):
+                    await reply("250 localhost")
+                elif command == "MAIL":
+                    mail_from = _extract_address(argument)
+                    rcpt_tos = []
+                    await reply("250 OK")
+                elif command == "RCPT":
+                    rcpt_tos.append(_extract_address(argument))
+                    await reply("250 OK")
+                elif command == "DATA":
+                    if not rcpt_tos:
+                        await reply("503 Need RCPT command")
+                        continue
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = await _read_data(reader)
+                    self._store(ReceivedMessage(mail_from, tuple(rcpt_tos), data, time.time()))
+                    mail_from, rcpt_tos = "", []
+                    await reply("250 OK: queued")
+                elif command == "RSET":
+                    mail_from, rcpt_tos = "", []
+                    await reply("250 OK")
+                elif command == "NOOP":
+                    await reply("250 OK")
+                elif command == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _store(self, message: ReceivedMessage) -> None:
+        self.messages.append(message)
+        if self.on_message is not None:
+            self.on_message(message)
+
+
+def _extract_address(argument: str) -> str:
+    """Pull the address out of 'FROM:<a@b.c> PARAMS' / 'TO:<a@b.c>'."""
+    _, _, rest = argument.partition(":")
+    return rest.strip().split(" ")[0].strip("<>")
+
+
+async def _read_data(reader: asyncio.StreamReader) -> bytes:
+    """Read a DATA payload up to the terminating '.' line, undoing dot-stuffing."""
+    lines = []
+    while True:
+        line = await reader.readline()
+        if not line or line in (b".\r\n", b".\n"):
+            break
+        if line.startswith(b".."):
+            line = line[1:]
+        lines.append(line)
+    return b"".join(lines)
+
+
+async def _serve_forever(host: str, port: int) -> None:
+    def log_message(message: ReceivedMessage) -> None:
+        print(f"[local-smtp] {message.mail_from} -> {', '.join(message.rcpt_tos)}: {message.subject}")
+
+    server = LocalSMTPServer(host, port, on_message=log_message)
+    await server.start()
+    print(f"[local-smtp] listening on {server.host}:{server.port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the local stand-in SMTP server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(_serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,156 @@
+"""
+Failed-login tracking with exponential backoff.
+
+Failures are counted per account (normalized email) and per client IP. Once a
+key reaches its threshold it is locked for a window that doubles with every
+further failure, and login attempts during a lockout are rejected before the
+user lookup and bcrypt check. Counters decay with a half-life, and the tables
+are LRU-bounded, so a wide scan over many emails cannot grow memory without limit;
+eviction never drops a key that is still locked out.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict
+
+from src.helpers.config import settings
+
+
+class FailureTracker:
+    """
+    Decaying failure counters with exponential lockout windows.
+
+    Each entry is a compact [score, updated_at, locked_until] list in an
+    LRU-ordered dict capped at `max_entries`.
+    """
+
+    def __init__(
+        self,
+        threshold: int,
+        base_lockout: float,
+        max_lockout: float,
+        half_life: float,
+        max_entries: int,
+    ):
+        self.threshold = threshold
+        self.base_lockout = base_lockout
+        self.max_lockout = max_lockout
+        self.half_life = half_life
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, list[float]] = OrderedDict()
+
+    def _decayed(self, entry: list[float], now: float) -> float:
+        return entry[0] * 0.5 ** ((now - entry[1]) / self.half_life)
+
+    def locked_for(self, key: str, now: float | None = None) -> float:
+        """Seconds left on the lockout for `key`, 0.0 if it is not locked."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return max(0.0, entry[2] - now)
+
+    def record_failure(self, key: str, now: float | None = None) -> None:
+        """Count a failure and start or extend the lockout once over the threshold."""
+        now = time.monotonic() if now is None else now
+        entry = self._entries.get(key)
+        if entry is None:
+            if len(self._entries) >= self.max_entries and not self._evict_unlocked(now):
+                # Table full of active lockouts: those must hold, so the new key goes untracked
+                return
+            entry = self._entries[key] = [0.0, now, 0.0]
+        else:
+            self._entries.move_to_end(key)
+
+        entry[0] = self._decayed(entry, now) + 1.0
+        entry[1] = now
+        # Whole failures, so a little decay between rapid attempts doesn't skip the threshold
+        failures = round(entry[0])
+        if failures >= self.threshold:
+            # threshold -> base, threshold + 1 -> 2 * base, ...
+            exponent = min(failures - self.threshold, 32)
+            entry[2] = now + min(self.max_lockout, self.base_lockout * 2**exponent)
+
+    def _evict_unlocked(self, now: float) -> bool:
+        """Drop the least recently failed entry that is not locked; False if all are."""
+        for key, entry in self._entries.items():
+            if entry[2] <= now:
+                del self._entries[key]
+                return True
+        return False
+
+    def reset(self, key: str) -> None:
+        """Forget the failures for `key`."""
+        self._entries.pop(key, None)
+
+    def flush(self, now: float | None = None) -> int:
+        """
+        Drop entries that have decayed away and are no longer locked.
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.monotonic() if now is None else now
+        expired = [
+            key
+            for key, entry in self._entries.items()
+            if entry[2] <= now and self._decayed(entry, now) < 0.5
+        ]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class LoginGuard:
+    """Per-account and per-IP failure tracking for the login endpoint."""
+
+    def __init__(self):
+        common = dict(
+            base_lockout=settings.LOGIN_LOCKOUT_BASE_SECONDS,
+            max_lockout=settings.LOGIN_LOCKOUT_MAX_SECONDS,
+            half_life=settings.LOGIN_FAILURE_HALF_LIFE_SECONDS,
+            max_entries=settings.LOGIN_FAILURE_MAX_ENTRIES,
+        )
+        self.accounts = FailureTracker(threshold=settings.LOGIN_LOCKOUT_THRESHOLD, **common)
+        self.ips = FailureTracker(threshold=settings.LOGIN_LOCKOUT_IP_THRESHOLD, **common)
+
+    def retry_after(self, email: str, ip: str) -> int:
+        """Whole seconds until a login for this email/IP may be attempted, 0 if allowed."""
+        locked = max(self.accounts.locked_for(_normalize(email)), self.ips.locked_for(ip))
+        return math.ceil(locked)
+
+    def record_failure(self, email: str, ip: str) -> None:
+        self.accounts.record_failure(_normalize(email))
+        self.ips.record_failure(ip)
+
+    def record_success(self, email: str, ip: str) -> None:
+        # Only the account is cleared; one good password shouldn't unlock a scanning IP
+        self.accounts.reset(_normalize(email))
+
+    def flush(self) -> int:
+        """Drop decayed counters from both tables."""
+        return self.accounts.flush() + self.ips.flush()
+
+    def clear(self) -> None:
+        self.accounts.clear()
+        self.ips.clear()
+
+    async def run_periodic_flush(self, interval: float) -> None:
+        """Flush decayed counters every `interval` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            self.flush()
+
+
+def _normalize(email: str) -> str:
+    return email.strip().lower()
+
+
+login_guard = LoginGuard()
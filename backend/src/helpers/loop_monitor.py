@@ -0,0 +1,92 @@
+"""
+Event-loop lag monitor.
+
+A background task sleeps for a fixed interval and measures how late it wakes
+up; the extra delay is time the loop spent running something else without
+yielding. Lag goes to the event_loop_lag_seconds histogram.
+
+A watchdog thread notices when the loop stops ticking for longer than the
+threshold and captures the loop thread's stack while it is still blocked, so
+the log names the synchronous call responsible (e.g. bcrypt inside a handler).
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+
+from src.helpers.config import settings
+from src.helpers.metrics import event_loop_blocked, event_loop_lag
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BlockReport:
+    """Stack of the loop thread captured while it was blocked."""
+
+    captured_at: float  # Unix timestamp
+    blocked_seconds: float  # How long the loop had been stuck at capture time
+    stack: str
+
+
+class LoopMonitor:
+    """Sample event-loop lag and capture stacks of long blocking calls."""
+
+    def __init__(self, interval: float, threshold: float, max_reports: int = 20):
+        self.interval = interval
+        self.threshold = threshold
+        self.reports: deque[BlockReport] = deque(maxlen=max_reports)
+        self._last_beat = time.perf_counter()
+        self._loop_thread: int | None = None
+        self._stop = threading.Event()
+
+    async def run(self) -> None:
+        """Sample until cancelled, with the watchdog thread running alongside."""
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._stop.clear()
+        watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        watchdog.start()
+        try:
+            while True:
+                started = time.perf_counter()
+                await asyncio.sleep(self.interval)
+                now = time.perf_counter()
+                lag = max(0.0, now - started - self.interval)
+                self._last_beat = now
+                event_loop_lag.observe(lag)
+                if lag >= self.threshold:
+                    event_loop_blocked.inc()
+        finally:
+            self._stop.set()
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stop.wait(self.threshold / 2):
+            beat = self._last_beat
+            blocked = time.perf_counter() - beat - self.interval
+            if blocked < self.threshold or beat == reported_beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            # One report per stall: wait for the loop to tick again
+            reported_beat = beat
+            stack = "".join(traceback.format_stack(frame))
+            self.reports.append(BlockReport(time.time(), blocked, stack))
+            logger.warning(
+                "Event loop blocked for %.0f ms so far; loop thread stack:\n%s",
+                blocked * 1000,
+                stack,
+            )
+
+
+loop_monitor = LoopMonitor(
+    interval=settings.LOOP_LAG_SAMPLE_SECONDS, threshold=settings.LOOP_LAG_THRESHOLD_SECONDS
+)
@@ -0,0 +1,135 @@
+"""
+Pluggable mail transports used by the email service.
+
+The transport is selected with the MAIL_BACKEND setting:
+    - "smtp":   deliver through the configured SMTP server (default)
+    - "memory": record messages in an in-process outbox, nothing leaves the process
+    - "local":  deliver over plain SMTP to the local stand-in server (local_smtp.py)
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from src.helpers.config import settings
+
+if TYPE_CHECKING:
+    # fastapi_mail pulls in httpx and friends; only load it when mail is sent
+    from fastapi_mail import MessageSchema, ConnectionConfig
+
+
+@dataclass(frozen=True)
+class CapturedMessage:
+    """A message recorded by the in-memory capture backend."""
+
+    subject: str
+    recipients: tuple[str, ...]
+    body: str
+    sent_at: float  # Unix timestamp
+
+
+class SMTPBackend:
+    """Send messages through an SMTP server with FastAPI-Mail."""
+
+    def __init__(self, conf: "ConnectionConfig"):
+        from fastapi_mail import FastMail
+
+        self.conf = conf
+        self.mailer = FastMail(conf)
+
+    async def send_message(self, message: "MessageSchema") -> None:
+        await self.mailer.send_message(message)
+
+
+class CaptureBackend:
+    """Keep messages in a bounded in-memory outbox instead of sending them."""
+
+    def __init__(self, max_messages: int = 1000):
+        self.outbox: deque[CapturedMessage] = deque(maxlen=max_messages)
+
+    async def send_message(self, message: "MessageSchema") -> None:
+        self.outbox.append(
+            CapturedMessage(
+                subject=message.subject,
+                recipients=tuple(str(r) for r in message.recipients),
+                body=str(message.body or ""),
+                sent_at=time.time(),
+            )
+        )
+
+    def clear(self) -> None:
+        """Drop every captured message."""
+        self.outbox.clear()
+
+
+MailBackend = SMTPBackend | CaptureBackend
+
+
+def build_mail_backend(name: str) -> MailBackend:
+    """
+    Build the mail transport for a MAIL_BACKEND value.
+
+    Args:
+        name: One of "smtp", "memory" or "local"
+
+    Returns:
+        Mail backend instance
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    from fastapi_mail import ConnectionConfig
+
+    if name == "smtp":
+        return SMTPBackend(
+            ConnectionConfig(
+                MAIL_USERNAME=settings.MAIL_USERNAME,
+                MAIL_PASSWORD=settings.MAIL_PASSWORD,
+                MAIL_FROM=settings.MAIL_FROM,
+                MAIL_PORT=settings.MAIL_PORT,
+                MAIL_SERVER=settings.MAIL_SERVER,
+                MAIL_STARTTLS=settings.MAIL_STARTTLS,
+                MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
+                USE_CREDENTIALS=True,
+                VALIDATE_CERTS=True,
+            )
+        )
+
+    if name == "memory":
+        return CaptureBackend(max_messages=settings.MAIL_CAPTURE_MAX_MESSAGES)
+
+    if name == "local":
+        # The stand-in server speaks plain SMTP without authentication
+        return SMTPBackend(
+            ConnectionConfig(
+                MAIL_USERNAME=settings.MAIL_USERNAME,
+                MAIL_PASSWORD=settings.MAIL_PASSWORD,
+                MAIL_FROM=settings.MAIL_FROM,
+                MAIL_PORT=settings.LOCAL_SMTP_PORT,
+                MAIL_SERVER=settings.LOCAL_SMTP_HOST,
+                MAIL_STARTTLS=False,
+                MAIL_SSL_TLS=False,
+                USE_CREDENTIALS=False,
+                VALIDATE_CERTS=False,
+            )
+        )
+
+    raise ValueError(f"Unknown MAIL_BACKEND: {name!r} (expected smtp, memory or local)")
+
+
+_backend: MailBackend | None = None
+
+
+def get_mail_backend() -> MailBackend:
+    """Return the process-wide mail backend, building it on first use."""
+    global _backend
+    if _backend is None:
+        _backend = build_mail_backend(settings.MAIL_BACKEND)
+    return _backend
+
+
+def set_mail_backend(backend: MailBackend | None) -> None:
+    """Replace the process-wide mail backend (None rebuilds it from settings)."""
+    global _backend
+    _backend = backend
@@ -0,0 +1,449 @@
+"""
+Low-overhead Prometheus metrics.
+
+Counters, gauges and histograms keep their values in plain dicts keyed by label
+values and are updated from the event loop without locks. render() produces the
+Prometheus text exposition format served on /metrics.
+
+Every uvicorn worker has its own registry. When METRICS_MULTIPROC_DIR is set,
+each worker periodically writes a snapshot to <dir>/<pid>.json and a scrape of
+any worker merges all snapshots: counters and histograms are summed over every
+file, gauges only over workers that are still running. Empty the directory
+before starting the server.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable
+
+from sqlalchemy import event
+
+from src.helpers.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers fast cache hits up to slow SMTP round trips
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class Metric:
+    """Base class: a named metric family with fixed label names."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def _check(self, labels: tuple[str, ...]) -> None:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+
+    def snapshot(self) -> dict:
+        return {
+            "kind": self.kind,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "values": [[list(labels), value] for labels, value in self._values.items()],
+        }
+
+    def clear(self) -> None:
+        self._values.clear()
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        if labels not in self._values:
+            self._check(labels)
+            self._values[labels] = 0.0
+        self._values[labels] += amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+
+class Gauge(Metric):
+    """Value that goes up and down, optionally read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Callable[[], float] | None = None
+
+    def set(self, value: float, *labels: str) -> None:
+        self._check(labels)
+        self._values[labels] = float(value)
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        if labels not in self._values:
+            self._check(labels)
+            self._values[labels] = 0.0
+        self._values[labels] += amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set_function(self, function: Callable[[], float] | None) -> None:
+        """Read the (unlabelled) value from `function` whenever metrics are collected."""
+        self._function = function
+
+    def snapshot(self) -> dict:
+        if self._function is not None:
+            try:
+                self._values[()] = float(self._function())
+            except Exception as exc:
+                logger.debug("Gauge %s callback failed: %s", self.name, exc)
+        return super().snapshot()
+
+
+class Histogram(Metric):
+    """Distribution of observations in fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            self._check(labels)
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def snapshot(self) -> dict:
+        return {
+            "kind": self.kind,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "buckets": list(self.buckets),
+            "values": [
+                [list(labels), {"counts": list(counts), "sum": total}]
+                for labels, (counts, total) in self._series.items()
+            ],
+        }
+
+    def clear(self) -> None:
+        self._series.clear()
+
+
+class MetricsRegistry:
+    """Collection of metric families rendered together."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> dict:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def render(self) -> str:
+        return render_snapshot(self.snapshot())
+
+    def clear(self) -> None:
+        """Reset every value (gauge callbacks stay attached)."""
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+def merge_snapshots(snapshots: list[dict], include_gauges: list[bool] | None = None) -> dict:
+    """
+    Combine registry snapshots from several processes.
+
+    Args:
+        snapshots: Snapshots as returned by MetricsRegistry.snapshot()
+        include_gauges: Per snapshot, whether its gauges count (False for dead workers)
+
+    Returns:
+        A single snapshot with counters, histograms and gauges summed
+    """
+    merged: dict[str, dict] = {}
+    for index, snapshot in enumerate(snapshots):
+        gauges_allowed = include_gauges[index] if include_gauges else True
+        for name, family in snapshot.items():
+            target = merged.setdefault(name, {**family, "values": {}})
+            if family["kind"] == "gauge" and not gauges_allowed:
+                continue
+            for labels, value in family["values"]:
+                key = tuple(labels)
+                if family["kind"] == "histogram":
+                    current = target["values"].get(key)
+                    if current is None:
+                        target["values"][key] = {"counts": list(value["counts"]), "sum": value["sum"]}
+                    else:
+                        current["counts"] = [a + b for a, b in zip(current["counts"], value["counts"])]
+                        current["sum"] += value["sum"]
+                else:
+                    target["values"][key] = target["values"].get(key, 0.0) + value
+    for family in merged.values():
+        family["values"] = [[list(key), value] for key, value in family["values"].items()]
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: list[str], values: list[str], extra: tuple[str, str] | None = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def render_snapshot(snapshot: dict) -> str:
+    """Render a snapshot in the Prometheus text exposition format."""
+    lines = []
+    for name, family in snapshot.items():
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['kind']}")
+        labelnames = family["labelnames"]
+        for labels, value in family["values"]:
+            if family["kind"] != "histogram":
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip([*family["buckets"], math.inf], value["counts"]):
+                cumulative += count
+                le = ("le", _format_value(bound))
+                lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_value(value['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labelnames, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# HTTP
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Time spent handling HTTP requests",
+    ("method", "route", "status"),
+)
+http_requests_in_progress = registry.gauge(
+    "http_requests_in_progress", "HTTP requests currently being handled"
+)
+
+# Database connection pool
+db_pool_size = registry.gauge("db_pool_size", "Configured size of the connection pool")
+db_pool_checked_out = registry.gauge(
+    "db_pool_checked_out", "Pool connections currently in use"
+)
+db_pool_overflow = registry.gauge(
+    "db_pool_overflow", "Connections open beyond the pool size"
+)
+db_pool_checkouts = registry.counter(
+    "db_pool_checkouts_total", "Connections handed out by the pool"
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Time spent executing SQL statements", ("operation",)
+)
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request",
+    "SQL statements run while handling one request",
+    ("route",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50),
+)
+db_circuit_state = registry.gauge(
+    "db_circuit_state", "Database circuit breaker state (0 closed, 1 half-open, 2 open)"
+)
+db_circuit_rejections = registry.counter(
+    "db_circuit_rejections_total", "Requests failed fast because the database circuit was open"
+)
+db_lookups_coalesced = registry.counter(
+    "db_lookups_coalesced_total",
+    "Lookups that shared an identical in-flight query instead of running their own",
+    ("lookup",),
+)
+
+# Idempotency keys
+idempotent_requests = registry.counter(
+    "idempotent_requests_total",
+    "Requests carrying an Idempotency-Key, by outcome (proceed, replay, conflict, mismatch)",
+    ("outcome",),
+)
+
+# Audit trail
+audit_events_written = registry.counter(
+    "audit_events_written_total", "Audit events written to the sink", ("sink",)
+)
+audit_events_dropped = registry.counter(
+    "audit_events_dropped_total",
+    "Audit events lost (overflow: buffer full, sink_error: write failed)",
+    ("reason",),
+)
+audit_queue_depth = registry.gauge(
+    "audit_queue_depth", "Audit events buffered after the last flush"
+)
+
+# Event loop
+event_loop_lag = registry.histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop woke the lag sampler",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+event_loop_blocked = registry.counter(
+    "event_loop_blocked_total", "Samples where the loop lag exceeded the threshold"
+)
+
+# Password hashing
+bcrypt_duration = registry.histogram(
+    "bcrypt_duration_seconds", "Time spent in bcrypt", ("operation",)
+)
+bcrypt_queue_wait = registry.histogram(
+    "bcrypt_queue_wait_seconds",
+    "Time bcrypt calls waited for a hashing thread",
+    ("operation",),
+)
+
+# Tokens
+jwt_operations = registry.counter(
+    "jwt_operations_total",
+    "JWT encode and decode calls",
+    ("operation", "token_type", "result"),
+)
+refresh_grace_hits = registry.counter(
+    "refresh_grace_hits_total",
+    "Refreshes answered with the token pair already minted for the same refresh token",
+)
+
+# Email
+email_send_duration = registry.histogram(
+    "email_send_duration_seconds", "Time spent delivering an email", ("kind",)
+)
+email_send_failures = registry.counter(
+    "email_send_failures_total", "Emails that could not be delivered", ("kind",)
+)
+emails_in_flight = registry.gauge("emails_in_flight", "Emails currently being sent")
+
+
+def _count_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    db_pool_checkouts.inc()
+
+
+def instrument_pool(engine) -> None:
+    """
+    Report an engine's connection pool through the db_pool_* metrics.
+
+    Pools that keep no statistics (NullPool, StaticPool) only count checkouts.
+    """
+    pool = engine.sync_engine.pool
+    if not event.contains(pool, "checkout", _count_checkout):
+        event.listen(pool, "checkout", _count_checkout)
+    if not hasattr(pool, "checkedout"):
+        return
+    db_pool_size.set_function(pool.size)
+    db_pool_checked_out.set_function(pool.checkedout)
+    # QueuePool.overflow() starts at -pool_size
+    db_pool_overflow.set_function(lambda: max(0, pool.overflow()))
+
+
+def write_snapshot(directory: str, metrics: MetricsRegistry = registry) -> None:
+    """Atomically write this worker's snapshot to <directory>/<pid>.json."""
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    pid = os.getpid()
+    tmp = path / f".{pid}.json.tmp"
+    tmp.write_text(json.dumps({"pid": pid, "metrics": metrics.snapshot()}), encoding="utf-8")
+    os.replace(tmp, path / f"{pid}.json")
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect(metrics: MetricsRegistry = registry) -> str:
+    """
+    Render metrics for a scrape, merged across workers if METRICS_MULTIPROC_DIR is set.
+
+    Returns:
+        Prometheus text exposition
+    """
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return metrics.render()
+
+    write_snapshot(directory, metrics)
+    snapshots, alive = [], []
+    for file in sorted(Path(directory).glob("*.json")):
+        try:
+            data = json.loads(file.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            logger.warning("Skipping unreadable metrics snapshot %s: %s", file, exc)
+            continue
+        snapshots.append(data["metrics"])
+        alive.append(_process_alive(data["pid"]))
+    return render_snapshot(merge_snapshots(snapshots, alive))
+
+
+async def run_periodic_dump(interval: float, directory: str) -> None:
+    """Write this worker's snapshot every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            write_snapshot(directory)
+        except OSError as exc:
+            logger.warning("Could not write metrics snapshot: %s", exc)
@@ -0,0 +1,216 @@
+"""
+Negative lookup cache for emails that are not registered.
+
+Lookup-only endpoints (verify, resend, forgot password) answer 404 for unknown
+emails. Enumeration bots send huge numbers of random addresses, so emails that
+were just found missing are remembered for a short TTL and answered without a
+query. An optional Bloom filter of every registered email (EMAIL_BLOOM_ENABLED)
+goes further: an address the filter has never seen is missing for certain, as
+long as the filter is up to date.
+
+Staleness: a user created by another worker shows up here after at most
+NEGATIVE_CACHE_TTL_SECONDS (negative entries) or EMAIL_BLOOM_REFRESH_SECONDS
+(Bloom filter). Signups handled by this worker invalidate immediately.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from src.helpers.config import settings
+from src.helpers.generations import Generations
+
+
+logger = logging.getLogger(__name__)
+
+
+class NegativeLookupCache:
+    """Bounded TTL set of emails recently found missing (LRU eviction)."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._expires: OrderedDict[str, float] = OrderedDict()
+
+    def __contains__(self, email: str) -> bool:
+        expires_at = self._expires.get(email)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            del self._expires[email]
+            return False
+        return True
+
+    def add(self, email: str) -> None:
+        self._expires.pop(email, None)
+        if len(self._expires) >= self.max_entries:
+            self._expires.popitem(last=False)
+        self._expires[email] = time.monotonic() + self.ttl
+
+    def discard(self, email: str) -> None:
+        self._expires.pop(email, None)
+
+    def clear(self) -> None:
+        self._expires.clear()
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over one BLAKE2b digest."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class MissingEmailCache:
+    """Negative cache, optionally fronted by a Bloom filter of registered emails."""
+
+    def __init__(self):
+        self.negative = NegativeLookupCache(
+            max_entries=settings.NEGATIVE_CACHE_MAX_ENTRIES,
+            ttl=settings.NEGATIVE_CACHE_TTL_SECONDS,
+        )
+        self.bloom: BloomFilter | None = None
+        self._watermark: datetime | None = None
+        # Bumped by remember_existing(), so a lookup that raced a signup
+        # doesn't mark the new email missing
+        self.generations = Generations(settings.NEGATIVE_CACHE_MAX_ENTRIES)
+
+    def is_known_missing(self, email: str) -> bool:
+        """True if `email` is certainly not registered, without a DB query."""
+        if not settings.NEGATIVE_CACHE_ENABLED:
+            return False
+        if self.bloom is not None and email not in self.bloom:
+            return True
+        return email in self.negative
+
+    def remember_missing(self, email: str, generation: int | None = None) -> None:
+        """
+        Record that a lookup found no such email.
+
+        Pass generations.current(email) as read before the query: if the email
+        was registered meanwhile, the result is stale and not recorded.
+        """
+        if not settings.NEGATIVE_CACHE_ENABLED:
+            return
+        if generation is not None and self.generations.current(email) != generation:
+            return
+        self.negative.add(email)
+
+    def remember_existing(self, email: str) -> None:
+        """Invalidate after a signup so the new email is found right away."""
+        self.generations.bump(email)
+        self.negative.discard(email)
+        if self.bloom is not None:
+            self.bloom.add(email)
+
+    def clear(self) -> None:
+        self.generations.bump_all()
+        self.negative.clear()
+        self.bloom = None
+        self._watermark = None
+
+    async def rebuild_bloom(self, session_factory=None, batch_size: int = 10_000) -> None:
+        """
+        Build a fresh Bloom filter of every registered email.
+
+        Emails are read in keyset-paginated batches, so the build never holds a
+        long transaction. The filter only takes effect once it is complete.
+        """
+        if session_factory is None:
+            from src.helpers.db import get_session_factory
+
+            session_factory = get_session_factory()
+        from src.models.db_scheams.user import User
+
+        capacity = settings.EMAIL_BLOOM_CAPACITY
+        if self.bloom is not None:
+            capacity = max(capacity, self.bloom.count * 2)
+        bloom = BloomFilter(capacity, settings.EMAIL_BLOOM_ERROR_RATE)
+        started_at = datetime.utcnow()
+
+        last_email = ""
+        async with session_factory() as session:
+            while True:
+                result = await session.execute(
+                    select(User.email)
+                    .where(User.email > last_email)
+                    .order_by(User.email)
+                    .limit(batch_size)
+                )
+                emails = result.scalars().all()
+                for email in emails:
+                    bloom.add(email)
+                if len(emails) < batch_size:
+                    break
+                last_email = emails[-1]
+                await asyncio.sleep(0)  # yield between batches
+
+        self.bloom = bloom
+        # Rows created while we were scanning are picked up by the next refresh
+        self._watermark = started_at - timedelta(seconds=5)
+
+    async def refresh_bloom(self, session_factory=None) -> None:
+        """Add emails created since the last build or refresh (e.g. by other workers)."""
+        if self.bloom is None or self._watermark is None:
+            await self.rebuild_bloom(session_factory)
+            return
+        if self.bloom.count > self.bloom.capacity:
+            # Past capacity the false-positive rate climbs; start over bigger
+            await self.rebuild_bloom(session_factory)
+            return
+
+        if session_factory is None:
+            from src.helpers.db import get_session_factory
+
+            session_factory = get_session_factory()
+        from src.models.db_scheams.user import User
+
+        started_at = datetime.utcnow()
+        async with session_factory() as session:
+            result = await session.execute(
+                select(User.email).where(User.created_at >= self._watermark)
+            )
+            for email in result.scalars():
+                self.bloom.add(email)
+        self._watermark = started_at - timedelta(seconds=5)
+
+    async def run_bloom_maintenance(self, interval: float) -> None:
+        """Build the Bloom filter, then refresh it every `interval` seconds until cancelled."""
+        while True:
+            try:
+                await self.refresh_bloom()
+            except Exception as exc:
+                # A filter we cannot refresh may miss new users: stop using it
+                logger.warning("Email Bloom filter refresh failed, disabling it: %s", exc)
+                self.bloom = None
+            await asyncio.sleep(interval)
+
+
+missing_emails = MissingEmailCache()
@@ -0,0 +1,107 @@
+"""
+Statistical profiler for single requests.
+
+While a request is profiled, a thread samples the event loop every
+PROFILING_INTERVAL_SECONDS. When the request's task is running, the sample is
+the loop thread's full stack; when the task is suspended, the sample is its
+await chain ending in "(await)", so I/O and thread-pool waits (database,
+bcrypt) show up next to CPU time.
+
+Profiles are written in collapsed-stack format ("frame;frame;frame count"),
+readable by flamegraph.pl and speedscope, to a directory that keeps only the
+newest PROFILING_MAX_FILES files.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = "/".join(Path(code.co_filename).parts[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ",")
+
+
+def _collapse(frames) -> str:
+    return ";".join(_frame_label(frame) for frame in frames)
+
+
+def _await_chain(task: asyncio.Task) -> list:
+    """Frames of a suspended task, from its coroutine down to the innermost await."""
+    frames = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return frames
+
+
+class RequestSampler:
+    """Sample the loop thread on behalf of one asyncio task."""
+
+    def __init__(self, task: asyncio.Task, interval: float):
+        self.task = task
+        self.loop = task.get_loop()
+        self.interval = interval
+        self.counts: Counter[str] = Counter()
+        self._loop_thread = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter[str]:
+        self._stop.set()
+        self._thread.join()
+        return self.counts
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if asyncio.current_task(self.loop) is self.task:
+                frame = sys._current_frames().get(self._loop_thread)
+                frames = []
+                while frame is not None:
+                    frames.append(frame)
+                    frame = frame.f_back
+                stack = _collapse(reversed(frames))
+            else:
+                stack = _collapse(_await_chain(self.task)) + ";(await)"
+            self.counts[stack] += 1
+
+
+class ProfileRing:
+    """Directory of profiles that keeps only the newest `max_files`."""
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = Path(directory)
+        self.max_files = max_files
+
+    def write(self, name: str, counts: Counter[str]) -> Path:
+        """
+        Write one profile and drop the oldest ones over the limit.
+
+        Args:
+            name: File name (without extension)
+            counts: Collapsed stack -> sample count
+
+        Returns:
+            Path of the written profile
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{name}.collapsed"
+        path.write_text(
+            "".join(f"{stack} {count}\n" for stack, count in counts.most_common()),
+            encoding="utf-8",
+        )
+        profiles = sorted(self.directory.glob("*.collapsed"), key=os.path.getmtime)
+        for old in profiles[: max(0, len(profiles) - self.max_files)]:
+            old.unlink(missing_ok=True)
+        return path
@@ -0,0 +1,117 @@
+"""
+Query timing, slow-query log and per-request query counts from SQLAlchemy engine events.
+
+Replaces echo=True: every statement's duration goes to the
+db_query_duration_seconds histogram, statements slower than
+SLOW_QUERY_THRESHOLD_MS are logged with their normalized SQL, and
+QueryBudgetMiddleware warns when a request runs more than
+QUERY_BUDGET_PER_REQUEST statements.
+"""
+
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+
+from src.helpers.config import settings
+from src.helpers.metrics import db_query_duration
+from src.helpers.tracing import record_span
+
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"\$\d+|%\(\w+\)s|%s|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    Reduce a statement to its shape: literals and bind parameters become "?",
+    IN lists collapse to "(?...)" and whitespace is squeezed.
+    """
+    sql = _STRING.sub("?", statement)
+    sql = _PARAM.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(?...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def _operation(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"
+
+
+@dataclass
+class QueryStats:
+    """Statements run within one request (or one track_queries() block)."""
+
+    count: int = 0
+    total_seconds: float = 0.0
+
+
+_current_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries():
+    """
+    Count the statements run in this context.
+
+    Nested blocks also add their totals to the enclosing block.
+
+    Yields:
+        QueryStats updated as statements complete
+    """
+    outer = _current_stats.get()
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        if outer is not None:
+            outer.count += stats.count
+            outer.total_seconds += stats.total_seconds
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    duration = time.perf_counter() - started
+    operation = _operation(statement)
+
+    db_query_duration.observe(duration, operation)
+    record_span("db.query", duration, operation=operation)
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.total_seconds += duration
+    if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        logger.warning("Slow query (%.1f ms): %s", duration * 1000, normalize_sql(statement))
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+def instrument_engine(engine) -> None:
+    """Attach the query timing listeners to an (async) engine, once."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
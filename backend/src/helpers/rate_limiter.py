@@ -0,0 +1,260 @@
+"""
+Token-bucket rate limiting for the auth endpoints.
+
+Buckets live in a sharded in-memory store by default (per worker). Set
+RATE_LIMIT_BACKEND=postgres to keep them in an UNLOGGED table so limits hold
+across every worker sharing the database.
+"""
+
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import Float, bindparam, text
+
+from src.helpers.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """Allow `capacity` requests per `period` seconds for each key of `scope` ("ip" or "email")."""
+
+    scope: str
+    capacity: int
+    period: float
+
+    @property
+    def refill_rate(self) -> float:
+        """Tokens added back per second."""
+        return self.capacity / self.period
+
+
+# Per-route policies, checked before the request reaches FastAPI
+ROUTE_POLICIES: dict[str, tuple[RateLimitPolicy, ...]] = {
+    "/auth/login": (
+        RateLimitPolicy("ip", capacity=20, period=60),
+        RateLimitPolicy("email", capacity=10, period=300),
+    ),
+    "/auth/forgot-password": (
+        RateLimitPolicy("ip", capacity=10, period=600),
+        RateLimitPolicy("email", capacity=3, period=600),
+    ),
+    "/auth/resend-code": (
+        RateLimitPolicy("ip", capacity=10, period=600),
+        RateLimitPolicy("email", capacity=3, period=600),
+    ),
+    "/auth/verify-code": (
+        RateLimitPolicy("ip", capacity=20, period=60),
+        RateLimitPolicy("email", capacity=10, period=600),
+    ),
+    "/auth/reset-password": (
+        RateLimitPolicy("ip", capacity=20, period=60),
+        RateLimitPolicy("email", capacity=10, period=600),
+    ),
+    "/auth/signup": (RateLimitPolicy("ip", capacity=10, period=600),),
+    "/auth/refresh": (RateLimitPolicy("ip", capacity=60, period=60),),
+}
+
+
+class MemoryBucketStore:
+    """
+    Sharded in-memory token buckets.
+
+    Each shard is an LRU-ordered dict of key -> [tokens, updated_at], so a
+    check is O(1) and memory is capped at `max_keys` buckets in total: the
+    least recently used bucket is dropped when a shard is full.
+    """
+
+    def __init__(self, max_keys: int = 100_000, shards: int = 16):
+        self._shards: list[OrderedDict[str, list[float]]] = [
+            OrderedDict() for _ in range(shards)
+        ]
+        self._max_per_shard = max(1, max_keys // shards)
+
+    def consume(self, key: str, capacity: int, refill_rate: float, now: float | None = None) -> float:
+        """
+        Take one token from the bucket for `key`.
+
+        Returns:
+            0.0 if the request is allowed, otherwise seconds until a token is available
+        """
+        now = time.monotonic() if now is None else now
+        shard = self._shards[hash(key) % len(self._shards)]
+
+        bucket = shard.get(key)
+        if bucket is None:
+            if len(shard) >= self._max_per_shard:
+                shard.popitem(last=False)
+            shard[key] = [capacity - 1.0, now]
+            return 0.0
+
+        shard.move_to_end(key)
+        tokens = min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)
+        bucket[1] = now
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            return 0.0
+        bucket[0] = tokens
+        return (1.0 - tokens) / refill_rate
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def reset(self) -> None:
+        """Forget every bucket."""
+        for shard in self._shards:
+            shard.clear()
+
+
+class PostgresBucketStore:
+    """
+    Token buckets shared by all workers in an UNLOGGED Postgres table.
+
+    One upsert per check refills and takes a token atomically using the
+    database clock. Unlogged tables skip the WAL, and losing the buckets on a
+    crash is acceptable for rate limiting.
+    """
+
+    CREATE_TABLE = text(
+        """
+        CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+            key TEXT PRIMARY KEY,
+            tokens DOUBLE PRECISION NOT NULL,
+            updated_at DOUBLE PRECISION NOT NULL,
+            allowed BOOLEAN NOT NULL
+        )
+        """
+    )
+
+    # EXCLUDED.updated_at is "now"; SET expressions see the bucket's old values
+    CONSUME = text(
+        """
+        INSERT INTO rate_limit_buckets AS b (key, tokens, updated_at, allowed)
+        VALUES (
+            :key,
+            :capacity - 1,
+            extract(epoch FROM clock_timestamp()),
+            TRUE
+        )
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = CASE
+                WHEN LEAST(:capacity, b.tokens + (EXCLUDED.updated_at - b.updated_at) * :rate) >= 1
+                THEN LEAST(:capacity, b.tokens + (EXCLUDED.updated_at - b.updated_at) * :rate) - 1
+                ELSE LEAST(:capacity, b.tokens + (EXCLUDED.updated_at - b.updated_at) * :rate)
+            END,
+            allowed = LEAST(:capacity, b.tokens + (EXCLUDED.updated_at - b.updated_at) * :rate) >= 1,
+            updated_at = EXCLUDED.updated_at
+        RETURNING b.allowed, b.tokens
+        """
+    ).bindparams(
+        bindparam("capacity", type_=Float), bindparam("rate", type_=Float)
+    )
+
+    PRUNE = text(
+        "DELETE FROM rate_limit_buckets "
+        "WHERE updated_at < extract(epoch FROM clock_timestamp()) - :max_age"
+    ).bindparams(bindparam("max_age", type_=Float))
+
+    def __init__(self, max_age: float = 3600.0, prune_interval: float = 300.0):
+        self.max_age = max_age
+        self.prune_interval = prune_interval
+        self._last_prune = 0.0
+
+    async def setup(self) -> None:
+        """Create the buckets table and drop stale rows."""
+        from src.helpers.db import get_engine
+
+        async with get_engine().begin() as conn:
+            await conn.execute(self.CREATE_TABLE)
+            await conn.execute(self.PRUNE, {"max_age": self.max_age})
+        self._last_prune = time.monotonic()
+
+    async def consume(self, key: str, capacity: int, refill_rate: float) -> float:
+        """Take one token; returns 0.0 if allowed, otherwise seconds to wait."""
+        from src.helpers.db import get_engine
+
+        async with get_engine().begin() as conn:
+            if time.monotonic() - self._last_prune > self.prune_interval:
+                self._last_prune = time.monotonic()
+                await conn.execute(self.PRUNE, {"max_age": self.max_age})
+            allowed, tokens = (
+                await conn.execute(
+                    self.CONSUME, {"key": key, "capacity": capacity, "rate": refill_rate}
+                )
+            ).one()
+        return 0.0 if allowed else (1.0 - tokens) / refill_rate
+
+
+class RateLimiter:
+    """Apply ROUTE_POLICIES using the configured bucket store."""
+
+    def __init__(
+        self,
+        policies: dict[str, tuple[RateLimitPolicy, ...]] = ROUTE_POLICIES,
+        backend: str = "memory",
+        max_keys: int = 100_000,
+        shards: int = 16,
+    ):
+        self.policies = policies
+        self.local = MemoryBucketStore(max_keys=max_keys, shards=shards)
+        self.shared = PostgresBucketStore() if backend == "postgres" else None
+
+    async def setup(self) -> None:
+        """Prepare the shared backend, if any."""
+        if self.shared is not None:
+            await self.shared.setup()
+
+    async def check(
+        self,
+        path: str,
+        ip: str,
+        email: str | None = None,
+        scopes: tuple[str, ...] = ("ip", "email"),
+    ) -> int:
+        """
+        Consume one token from every bucket that applies to the request.
+
+        Args:
+            path: Request path
+            ip: Client IP address
+            email: Normalized email from the request body, if any
+            scopes: Only check policies of these scopes
+
+        Returns:
+            0 if the request may proceed, otherwise the Retry-After in whole seconds
+        """
+        retry_after = 0.0
+        for policy in self.policies.get(path, ()):
+            if policy.scope not in scopes:
+                continue
+            value = ip if policy.scope == "ip" else email
+            if not value:
+                continue
+            key = f"{path}|{policy.scope}|{value}"
+            retry_after = max(retry_after, await self._consume(key, policy))
+        return math.ceil(retry_after)
+
+    async def _consume(self, key: str, policy: RateLimitPolicy) -> float:
+        if self.shared is not None:
+            try:
+                return await self.shared.consume(key, policy.capacity, policy.refill_rate)
+            except Exception as exc:
+                # Never let the limiter take the API down: fall back to per-worker buckets
+                logger.warning("Shared rate limit backend failed, using local buckets: %s", exc)
+        return self.local.consume(key, policy.capacity, policy.refill_rate)
+
+    def reset(self) -> None:
+        """Forget every in-memory bucket."""
+        self.local.reset()
+
+
+rate_limiter = RateLimiter(
+    backend=settings.RATE_LIMIT_BACKEND,
+    max_keys=settings.RATE_LIMIT_MAX_KEYS,
+    shards=settings.RATE_LIMIT_SHARDS,
+)
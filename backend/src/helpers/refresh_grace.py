@@ -0,0 +1,59 @@
+"""
+Grace window for concurrent refreshes of the same refresh token.
+
+Single-page apps with several tabs open call /auth/refresh at the same moment
+with the same cookie. Instead of minting (and signing) a new token pair for
+each of them, the pair minted for a refresh token's `jti` is handed to every
+caller presenting that token within REFRESH_GRACE_SECONDS. All tabs then end
+up with the same cookie, so none of them later presents a token another tab
+has already replaced.
+
+Minting is synchronous, so no request can interleave between the lookup and
+the store: concurrent callers on one worker are deduplicated by the same
+window as near-concurrent ones. The window is per worker.
+"""
+
+import time
+from collections import OrderedDict
+
+from src.helpers.config import settings
+
+
+class RefreshGrace:
+    """Bounded map of refresh token jti -> (access token, refresh token), for `window` seconds."""
+
+    def __init__(self, window: float, max_entries: int):
+        self.window = window
+        self.max_entries = max_entries
+        self._pairs: OrderedDict[str, tuple[float, tuple[str, str]]] = OrderedDict()
+
+    def get(self, jti: str) -> tuple[str, str] | None:
+        entry = self._pairs.get(jti)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._pairs[jti]
+            return None
+        return entry[1]
+
+    def put(self, jti: str, pair: tuple[str, str]) -> None:
+        if self.window <= 0:
+            return
+        # Entries share one window, so insertion order is expiry order
+        now = time.monotonic()
+        while self._pairs and (
+            len(self._pairs) >= self.max_entries or next(iter(self._pairs.values()))[0] <= now
+        ):
+            self._pairs.popitem(last=False)
+        self._pairs[jti] = (now + self.window, pair)
+
+    def clear(self) -> None:
+        self._pairs.clear()
+
+    def __len__(self) -> int:
+        return len(self._pairs)
+
+
+refresh_grace = RefreshGrace(
+    window=settings.REFRESH_GRACE_SECONDS, max_entries=settings.REFRESH_GRACE_MAX_ENTRIES
+)
@@ -0,0 +1,91 @@
+"""
+Helpers for reading request details from ASGI scopes.
+"""
+
+from starlette.routing import Match
+
+from src.helpers.config import settings
+
+
+def get_client_ip(scope: dict) -> str:
+    """
+    Return the client IP for a request.
+
+    Uses the first X-Forwarded-For entry when RATE_LIMIT_TRUST_FORWARDED is set
+    (only enable it behind a proxy that overwrites the header).
+
+    Args:
+        scope: ASGI connection scope
+
+    Returns:
+        Client IP address, or "unknown"
+    """
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+async def buffer_body(receive, max_bytes: int):
+    """
+    Read a request body ahead of the app, up to `max_bytes`.
+
+    Args:
+        receive: ASGI receive callable
+        max_bytes: Stop reading once the body is known to be larger than this
+
+    Returns:
+        The body (None if it is over `max_bytes`), and a receive() that
+        replays what was read to the app, then reads the rest
+    """
+    chunks = []
+    size = 0
+    more_body = True
+    pending = []
+    while more_body and size <= max_bytes:
+        message = await receive()
+        if message["type"] != "http.request":
+            # Client went away; let the app see the disconnect
+            pending = [message]
+            break
+        chunk = message.get("body", b"")
+        chunks.append(chunk)
+        size += len(chunk)
+        more_body = message.get("more_body", False)
+
+    body = b"".join(chunks)
+    replay = [{"type": "http.request", "body": body, "more_body": more_body}, *pending]
+
+    async def replay_receive():
+        if replay:
+            return replay.pop(0)
+        return await receive()
+
+    return (None if size > max_bytes else body), replay_receive
+
+
+def get_route_template(scope: dict) -> str:
+    """
+    Return the route template a request was (or would have been) dispatched to.
+
+    Falls back to matching the app's routes when the request was answered
+    before routing (e.g. rate limited), and to "unmatched" for unknown paths,
+    so raw URLs never end up in metric labels or span names.
+
+    Args:
+        scope: ASGI connection scope
+
+    Returns:
+        Route path such as "/auth/login"
+    """
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    app = scope.get("app")
+    for candidate in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = candidate.matches(scope)
+        if match != Match.NONE:
+            return candidate.path
+    return "unmatched"
@@ -0,0 +1,114 @@
+"""
+Fast JSON responses.
+
+For a route with a response model, FastAPI re-validates the returned model,
+dumps it to Python objects and then encodes those with the stdlib json module.
+The auth controllers already build the exact response model, so all three
+steps repeat work. FastJSONRoute serializes such a return value straight to
+bytes with pydantic-core's serializer instead, and FastJSONResponse does the
+same for everything that still takes FastAPI's generic path.
+
+Status code, headers and cookies set on the injected `Response` carry over
+as they do on FastAPI's own path. Anything the fast path cannot reproduce
+(include/exclude options, other return types) falls back to FastAPI.
+Disable with FAST_JSON_RESPONSES=false.
+"""
+
+import inspect
+from functools import wraps
+from typing import Any
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from fastapi.utils import is_body_allowed_for_status_code
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from src.helpers.config import settings
+
+
+# Keyword under which FastAPI injects the sub-response into wrapped endpoints
+SUB_RESPONSE_PARAM = "_fast_json_sub_response"
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by pydantic-core (models, dicts, UUIDs, datetimes)."""
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content, by_alias=True)
+
+
+class FastJSONRoute(APIRoute):
+    """APIRoute that returns response models as pre-rendered FastJSONResponses."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        # include_router() copies routes with their (already wrapped) endpoint
+        endpoint = getattr(endpoint, "_fast_json_endpoint", endpoint)
+        if settings.FAST_JSON_RESPONSES and inspect.iscoroutinefunction(endpoint):
+            endpoint = self._wrap(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+        self._fast_model = self._fast_path_model()
+
+    def _fast_path_model(self) -> type | None:
+        """The return type rendered directly, or None if FastAPI must handle it."""
+        if (
+            self.response_model_include is not None
+            or self.response_model_exclude is not None
+            or not self.response_model_by_alias
+            or self.response_model_exclude_unset
+            or self.response_model_exclude_defaults
+            or self.response_model_exclude_none
+        ):
+            return None
+        if inspect.isclass(self.response_model) and issubclass(self.response_model, BaseModel):
+            return self.response_model
+        if self.response_model is None or self.response_model is dict:
+            return dict
+        return None
+
+    def _wrap(self, endpoint):
+        signature = inspect.signature(endpoint, eval_str=True)
+        parameters = list(signature.parameters.values())
+        # FastAPI injects the sub-response into one parameter only: reuse the endpoint's
+        declared = next(
+            (
+                p.name
+                for p in parameters
+                if inspect.isclass(p.annotation) and issubclass(p.annotation, Response)
+            ),
+            None,
+        )
+        if declared is None:
+            parameters.append(
+                inspect.Parameter(
+                    SUB_RESPONSE_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Response
+                )
+            )
+
+        @wraps(endpoint)
+        async def fast_endpoint(*args, **kwargs):
+            if declared is None:
+                response: Response = kwargs.pop(SUB_RESPONSE_PARAM)
+            else:
+                response = kwargs[declared]
+            content = await endpoint(*args, **kwargs)
+            # Exact type only: anything else needs FastAPI's validation
+            if self._fast_model is None or type(content) is not self._fast_model:
+                return content
+            status_code = response.status_code or self.status_code or 200
+            fast = Response(
+                content=(
+                    to_json(content, by_alias=True)
+                    if is_body_allowed_for_status_code(status_code)
+                    else b""
+                ),
+                status_code=status_code,
+                media_type="application/json",
+            )
+            fast.headers.raw.extend(response.headers.raw)
+            return fast
+
+        fast_endpoint.__signature__ = signature.replace(parameters=parameters)
+        fast_endpoint._fast_json_endpoint = endpoint
+        return fast_endpoint
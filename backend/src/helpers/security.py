@@ -1,17 +1,35 @@
 """
 Security utilities for password hashing and token generation.
 Uses bcrypt directly for compatibility with newer bcrypt versions.
+bcrypt and jose are imported on first use to keep process start-up fast.
 """
 
+import asyncio
+import hashlib
+import hmac
+import os
 import secrets
-import bcrypt
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from src.helpers.config import settings
-from jose import jwt, JWTError
-from jose.exceptions import ExpiredSignatureError
+from src.helpers.metrics import bcrypt_duration, bcrypt_queue_wait, jwt_operations
+from src.helpers.tracing import span
 from datetime import datetime, timedelta
-from typing import Dict
-from fastapi import HTTPException, Response
+from typing import Callable, Dict, TypeVar
+from fastapi import Depends, HTTPException, Response
+from fastapi.security import (
+    HTTPAuthorizationCredentials,
+    HTTPBasic,
+    HTTPBasicCredentials,
+    HTTPBearer,
+)
+
+
+T = TypeVar("T")
+
+_hash_executor: ThreadPoolExecutor | None = None
 
 
 def hash_password(password: str) -> str:
@@ -24,6 +42,8 @@ def hash_password(password: str) -> str:
     Returns:
         Hashed password string
     """
+    import bcrypt
+
     # Encode password to bytes and hash with bcrypt
     password_bytes = password.encode("utf-8")
     salt = bcrypt.gensalt()
@@ -42,11 +62,52 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         True if password matches, False otherwise
     """
+    import bcrypt
+
     password_bytes = plain_password.encode("utf-8")
     hashed_bytes = hashed_password.encode("utf-8")
     return bcrypt.checkpw(password_bytes, hashed_bytes)
 
 
+def _get_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        workers = settings.BCRYPT_MAX_WORKERS or min(4, os.cpu_count() or 1)
+        _hash_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+    return _hash_executor
+
+
+async def run_hashing(func: Callable[..., T], *args) -> T:
+    """
+    Run a bcrypt helper on the bounded hashing thread pool.
+
+    Keeps the event loop free while bcrypt works, and records how long the
+    call waited for a thread and how long the hashing itself took.
+
+    Args:
+        func: hash_password or verify_password
+        *args: Arguments for func
+
+    Returns:
+        Whatever func returns
+    """
+    submitted = time.perf_counter()
+
+    def timed():
+        started = time.perf_counter()
+        result = func(*args)
+        return started, result, time.perf_counter()
+
+    operation = getattr(func, "__name__", "other")
+    with span(f"bcrypt.{operation}"):
+        started, result, finished = await asyncio.get_running_loop().run_in_executor(
+            _get_hash_executor(), timed
+        )
+    bcrypt_queue_wait.observe(started - submitted, operation)
+    bcrypt_duration.observe(finished - started, operation)
+    return result
+
+
 def generate_verification_code() -> str:
     """
     Generate a 6-digit verification code for email verification.
@@ -57,16 +118,70 @@ def generate_verification_code() -> str:
     return str(secrets.randbelow(900000) + 100000)  # Ensures 6 digits (100000-999999)
 
 
-def generate_access_token(user_id: str | int) -> str:
+def _code_key() -> bytes:
+    if settings.CODE_SECRET_KEY:
+        return settings.CODE_SECRET_KEY.encode()
+    # Separate key per use: codes must not be computed with the JWT signing key
+    return hmac.new(settings.SECRET_KEY.encode(), b"auth-code-v1", hashlib.sha256).digest()
+
+
+def _stateless_code(user_id: str, purpose: str, stamp: str, window: int) -> str:
+    message = "\x00".join(("auth-code", str(user_id), purpose, str(window), stamp)).encode()
+    digest = hmac.new(_code_key(), message, hashlib.sha256).digest()
+    return str(int.from_bytes(digest[:8], "big") % 900000 + 100000)
+
+
+def generate_stateless_code(
+    user_id: str | uuid.UUID, purpose: str, stamp: str, now: float | None = None
+) -> str:
+    """
+    Derive a 6-digit code for `purpose` ("verify" or "reset") without storing it.
+
+    The code is an HMAC of the user id, purpose, current time window and a
+    per-user stamp. Pass the user's password hash as the stamp: changing the
+    password then invalidates every outstanding code.
+
+    Args:
+        user_id: User the code is for
+        purpose: What the code may be used for
+        stamp: Per-user value that changes when the code must stop working
+        now: Unix time (defaults to the current time)
+
+    Returns:
+        6-digit numeric code as string
+    """
+    window = int((time.time() if now is None else now) // settings.STATELESS_CODE_WINDOW_SECONDS)
+    return _stateless_code(str(user_id), purpose, stamp, window)
+
+
+def verify_stateless_code(
+    code: str, user_id: str | uuid.UUID, purpose: str, stamp: str, now: float | None = None
+) -> bool:
+    """
+    Check a code from generate_stateless_code(), issued in this or the previous window.
+    """
+    window = int((time.time() if now is None else now) // settings.STATELESS_CODE_WINDOW_SECONDS)
+    # Compare against both windows so timing doesn't reveal which one matched
+    matches = [
+        hmac.compare_digest(code, _stateless_code(str(user_id), purpose, stamp, w))
+        for w in (window, window - 1)
+    ]
+    return any(matches)
+
+
+def generate_access_token(user_id: str | int, sid: str | None = None) -> str:
     """
     Generate a JWT access token for a user.
 
     Args:
         user_id: User ID to include in the token
+        sid: Login session the token belongs to (see session_registry)
 
     Returns:
         JWT access token
     """
+    from jose import jwt
+
     expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     payload = {
         "user_id": str(user_id),
@@ -74,19 +189,26 @@ def generate_access_token(user_id: str | int) -> str:
         "iat": datetime.utcnow(),  # issued at
         "type": "access",
     }
-    return jwt.encode(payload, settings.SECRET_KEY, algorithm="HS256")
+    if sid is not None:
+        payload["sid"] = str(sid)
+    jwt_operations.inc("encode", "access", "ok")
+    with span("jwt.encode"):
+        return jwt.encode(payload, settings.SECRET_KEY, algorithm="HS256")
 
 
-def generate_refresh_token(user_id: str | int) -> str:
+def generate_refresh_token(user_id: str | int, sid: str | None = None) -> str:
     """
     Generate a JWT refresh token for a user.
 
     Args:
         user_id: User ID to include in the token
+        sid: Login session the token belongs to (see session_registry)
 
     Returns:
         JWT refresh token
     """
+    from jose import jwt
+
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     payload = {
         "user_id": str(user_id),
@@ -95,7 +217,11 @@ def generate_refresh_token(user_id: str | int) -> str:
         "type": "refresh",
         "jti": str(uuid.uuid4()),
     }
-    return jwt.encode(payload, settings.REFRESH_SECRET_KEY, algorithm="HS256")
+    if sid is not None:
+        payload["sid"] = str(sid)
+    jwt_operations.inc("encode", "refresh", "ok")
+    with span("jwt.encode"):
+        return jwt.encode(payload, settings.REFRESH_SECRET_KEY, algorithm="HS256")
 
 
 def verify_access_token(token: str) -> Dict:
@@ -111,15 +237,82 @@ def verify_access_token(token: str) -> Dict:
     Raises:
         HTTPException: If token is invalid or expired
     """
+    from jose import jwt, JWTError
+    from jose.exceptions import ExpiredSignatureError
+
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        if payload.get("type") != "access":
-            raise HTTPException(status_code=401, detail="Invalid token type")
-        return payload
+        with span("jwt.decode"):
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
     except ExpiredSignatureError:
+        jwt_operations.inc("decode", "access", "expired")
         raise HTTPException(status_code=401, detail="Token has expired")
     except JWTError:
+        jwt_operations.inc("decode", "access", "invalid")
         raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("type") != "access":
+        jwt_operations.inc("decode", "access", "wrong_type")
+        raise HTTPException(status_code=401, detail="Invalid token type")
+    jwt_operations.inc("decode", "access", "ok")
+    return payload
+
+
+class VerifiedTokenCache:
+    """
+    Claims of recently verified access tokens, so repeated checks of the same
+    token (gateways, introspection batches) skip the signature check and decode.
+
+    Entries live until the token expires or `ttl` passes, whichever is first.
+    Revocation is not cached here; callers check the session registry.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # token -> (expires_at as Unix time, claims)
+        self._entries: OrderedDict[str, tuple[float, Dict]] = OrderedDict()
+
+    def get(self, token: str) -> Dict | None:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return entry[1]
+
+    def put(self, token: str, claims: Dict) -> None:
+        if self.max_entries <= 0:
+            return
+        if token not in self._entries and len(self._entries) >= self.max_entries:
+            self._entries.popitem(last=False)
+        expires_at = min(float(claims.get("exp", 0)), time.time() + self.ttl)
+        self._entries[token] = (expires_at, claims)
+        self._entries.move_to_end(token)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+verified_tokens = VerifiedTokenCache(
+    max_entries=settings.TOKEN_CACHE_MAX_ENTRIES, ttl=settings.TOKEN_CACHE_TTL_SECONDS
+)
+
+
+def verify_access_token_cached(token: str) -> Dict:
+    """
+    verify_access_token() through the verified-token cache.
+
+    The returned claims are shared with the cache and must not be modified.
+    """
+    claims = verified_tokens.get(token)
+    if claims is None:
+        claims = verify_access_token(token)
+        verified_tokens.put(token, claims)
+    return claims
 
 
 def verify_refresh_token(token: str) -> Dict:
@@ -135,12 +328,80 @@ def verify_refresh_token(token: str) -> Dict:
     Raises:
         HTTPException: If token is invalid or expired
     """
+    from jose import jwt, JWTError
+    from jose.exceptions import ExpiredSignatureError
+
     try:
-        payload = jwt.decode(token, settings.REFRESH_SECRET_KEY, algorithms=["HS256"])
-        if payload.get("type") != "refresh":
-            raise HTTPException(status_code=401, detail="Invalid token type")
-        return payload
+        with span("jwt.decode"):
+            payload = jwt.decode(token, settings.REFRESH_SECRET_KEY, algorithms=["HS256"])
     except ExpiredSignatureError:
+        jwt_operations.inc("decode", "refresh", "expired")
         raise HTTPException(status_code=401, detail="Refresh token has expired")
     except JWTError:
+        jwt_operations.inc("decode", "refresh", "invalid")
         raise HTTPException(status_code=401, detail="Invalid refresh token")
+    if payload.get("type") != "refresh":
+        jwt_operations.inc("decode", "refresh", "wrong_type")
+        raise HTTPException(status_code=401, detail="Invalid token type")
+    jwt_operations.inc("decode", "refresh", "ok")
+    return payload
+
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def get_access_claims(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+) -> Dict:
+    """
+    Dependency: verified claims of the request's Bearer access token.
+
+    Claims only, no database lookup, so it keeps working during a database outage.
+
+    Raises:
+        HTTPException: 401 if the token is missing, invalid or expired
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return verify_access_token_cached(credentials.credentials)
+
+
+basic_scheme = HTTPBasic(auto_error=False)
+
+
+async def require_introspection_client(
+    credentials: HTTPBasicCredentials | None = Depends(basic_scheme),
+) -> str:
+    """
+    Dependency: authenticate the gateway calling the introspection endpoints.
+
+    The gateway holds its own client secret (INTROSPECTION_CLIENT_SECRET),
+    never the token signing key. Without a configured secret the endpoints
+    do not exist (404).
+
+    Returns:
+        The client id
+
+    Raises:
+        HTTPException: 404 if introspection is disabled, 401 on bad credentials
+    """
+    if not settings.INTROSPECTION_CLIENT_SECRET:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if credentials is None or not (
+        secrets.compare_digest(
+            credentials.username.encode(), settings.INTROSPECTION_CLIENT_ID.encode()
+        )
+        & secrets.compare_digest(
+            credentials.password.encode(), settings.INTROSPECTION_CLIENT_SECRET.encode()
+        )
+    ):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid client credentials",
+            headers={"WWW-Authenticate": "Basic"},
+        )
+    return credentials.username
@@ -0,0 +1,418 @@
+"""
+Server-side registry of login sessions.
+
+Every login creates a user_sessions row whose id travels as the `sid` claim
+in the user's access and refresh tokens. Refreshing checks that the session
+is still live through an in-memory hot index (TTL and LRU bounded, like the
+user cache), so a refresh normally costs no query.
+
+Refreshes only record last-used time and IP in memory; run_periodic_flush()
+writes them out as one batched UPDATE every SESSION_TOUCH_FLUSH_SECONDS.
+Revoking all of a user's sessions is a single UPDATE, announced to other
+workers over LISTEN/NOTIFY so they drop their hot entries.
+"""
+
+import asyncio
+import ipaddress
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.helpers.cache_invalidation import publish
+from src.helpers.circuit_breaker import CircuitOpenError, db_circuit, is_outage
+from src.helpers.config import settings
+from src.helpers.db import get_session_factory
+from src.models.db_scheams.user_session import UserSession
+
+
+logger = logging.getLogger(__name__)
+
+MAX_DEVICE_LENGTH = 255
+
+# Last-used times by primary key. Core, not ORM: a row deleted meanwhile
+# (pruned, user removed) is skipped instead of failing the batch
+_TOUCH = (
+    update(UserSession.__table__)
+    .where(UserSession.id == bindparam("sid"))
+    .values(last_used_at=bindparam("used_at"), ip=bindparam("client_ip"))
+)
+
+
+@dataclass(frozen=True, slots=True)
+class SessionInfo:
+    """Read-only view of a live session."""
+
+    id: uuid.UUID
+    device: str
+    ip: str
+    created_at: datetime
+    last_used_at: datetime
+
+
+def _clean_ip(ip: str) -> str:
+    """The IP as stored: forwarded headers are client-controlled, so anything else is dropped."""
+    try:
+        return str(ipaddress.ip_address(ip.strip()))
+    except ValueError:
+        return ""
+
+
+def _as_uuid(value: uuid.UUID | str | None) -> uuid.UUID | None:
+    if value is None or isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        return None
+
+
+class SessionRegistry:
+    """Hot index of session liveness plus coalesced last-used writes."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # sid -> (expires_at, user_id, live)
+        self._index: OrderedDict[uuid.UUID, tuple[float, uuid.UUID, bool]] = OrderedDict()
+        self._by_user: dict[uuid.UUID, set[uuid.UUID]] = {}
+        # sid -> (last_used_at, ip), written by flush()
+        self._pending: dict[uuid.UUID, tuple[datetime, str]] = {}
+
+    # Hot index
+
+    def _lookup(self, sid: uuid.UUID) -> bool | None:
+        entry = self._index.get(sid)
+        if entry is None:
+            return None
+        expires_at, _, live = entry
+        if expires_at < time.monotonic():
+            self._remove(sid)
+            return None
+        self._index.move_to_end(sid)
+        return live
+
+    def _remember(self, sid: uuid.UUID, user_id: uuid.UUID, live: bool) -> None:
+        self._remove(sid)
+        if len(self._index) >= self.max_entries:
+            self._remove(next(iter(self._index)))
+        self._index[sid] = (time.monotonic() + self.ttl, user_id, live)
+        self._by_user.setdefault(user_id, set()).add(sid)
+
+    def _remove(self, sid: uuid.UUID) -> None:
+        entry = self._index.pop(sid, None)
+        if entry is None:
+            return
+        sids = self._by_user.get(entry[1])
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self._by_user[entry[1]]
+
+    def forget_user(self, user_id: uuid.UUID) -> None:
+        """Drop every hot entry of `user_id` (its sessions were revoked elsewhere)."""
+        for sid in list(self._by_user.get(user_id, ())):
+            self._remove(sid)
+
+    def forget_all(self) -> None:
+        """Drop the hot index (e.g. after missing invalidations); pending writes stay."""
+        self._index.clear()
+        self._by_user.clear()
+
+    def clear(self) -> None:
+        self.forget_all()
+        self._pending.clear()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    # Sessions
+
+    async def create(
+        self, db: AsyncSession, user_id: uuid.UUID, device: str, ip: str
+    ) -> uuid.UUID:
+        """
+        Record a new login; the caller commits.
+
+        Args:
+            db: Session whose transaction carries the login
+            user_id: Owner of the session
+            device: Client description (User-Agent)
+            ip: Client IP
+
+        Returns:
+            The new session id (the tokens' `sid` claim)
+        """
+        now = datetime.utcnow()
+        session = UserSession(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            device=device[:MAX_DEVICE_LENGTH],
+            ip=_clean_ip(ip),
+            created_at=now,
+            last_used_at=now,
+        )
+        db.add(session)
+        await db.flush()
+        self._remember(session.id, user_id, True)
+        return session.id
+
+    async def is_live(self, sid: uuid.UUID | str | None, user_id: uuid.UUID | str) -> bool:
+        """
+        Whether a token's session has not been revoked.
+
+        Tokens issued before sessions were tracked carry no sid and stay valid
+        until they expire. While the database circuit is open, an unknown sid
+        is accepted too, so refresh keeps working from claims alone.
+        """
+        return (await self.live_many([(sid, user_id)]))[0]
+
+    async def live_many(
+        self,
+        tokens: list[tuple[uuid.UUID | str | None, uuid.UUID | str]],
+        fail_open: bool = True,
+    ) -> list[bool]:
+        """
+        is_live() for many (sid, user_id) pairs, with one query for all hot-index misses.
+
+        Args:
+            tokens: (sid, user_id) pairs
+            fail_open: Whether sids missing from the hot index count as live while
+                the database circuit is open (False: they count as revoked)
+
+        Returns:
+            Liveness of each pair, in order
+        """
+        results: list[bool | None] = []
+        misses: dict[uuid.UUID, uuid.UUID] = {}
+        for sid, user_id in tokens:
+            if sid is None:
+                results.append(True)
+                continue
+            sid, user_id = _as_uuid(sid), _as_uuid(user_id)
+            if sid is None or user_id is None:
+                results.append(False)
+                continue
+            live = self._lookup(sid)
+            if live is None:
+                misses[sid] = user_id
+            results.append(live)
+        if not misses:
+            return results
+
+        try:
+            probe = db_circuit.acquire()
+        except CircuitOpenError:
+            return [fail_open if live is None else live for live in results]
+        with db_circuit.record(probe):
+            async with get_session_factory()() as db:
+                result = await db.execute(
+                    select(UserSession.id, UserSession.user_id, UserSession.revoked_at).where(
+                        UserSession.id.in_(misses)
+                    )
+                )
+                rows = {row.id: row for row in result}
+        live_by_sid = {}
+        for sid, user_id in misses.items():
+            row = rows.get(sid)
+            # A sid only counts for the user it was issued to
+            live_by_sid[sid] = (
+                row is not None and row.user_id == user_id and row.revoked_at is None
+            )
+            self._remember(sid, user_id, live_by_sid[sid])
+        return [
+            live_by_sid[_as_uuid(sid)] if live is None else live
+            for (sid, _), live in zip(tokens, results)
+        ]
+
+    def touch(self, sid: uuid.UUID | str | None, ip: str) -> None:
+        """Note that a session was just used; written out by the next flush()."""
+        sid = _as_uuid(sid)
+        if sid is not None:
+            self._pending[sid] = (datetime.utcnow(), _clean_ip(ip))
+
+    async def list_live(self, db: AsyncSession, user_id: uuid.UUID | str) -> list[SessionInfo]:
+        """Live, unexpired sessions of a user, most recently used first."""
+        cutoff = datetime.utcnow() - timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        result = await db.execute(
+            select(UserSession).where(
+                UserSession.user_id == _as_uuid(user_id),
+                UserSession.revoked_at.is_(None),
+                UserSession.last_used_at >= cutoff,
+            )
+        )
+        sessions = []
+        for row in result.scalars():
+            # Refreshes this worker hasn't flushed yet
+            last_used_at, ip = self._pending.get(row.id, (row.last_used_at, row.ip))
+            sessions.append(
+                SessionInfo(
+                    id=row.id,
+                    device=row.device,
+                    ip=ip,
+                    created_at=row.created_at,
+                    last_used_at=last_used_at,
+                )
+            )
+        sessions.sort(key=lambda s: s.last_used_at, reverse=True)
+        return sessions
+
+    async def revoke_all(self, db: AsyncSession, user_id: uuid.UUID | str) -> int:
+        """
+        Revoke every live session of a user in one statement and commit.
+
+        Returns:
+            Number of sessions revoked
+        """
+        user_id = _as_uuid(user_id)
+        result = await db.execute(
+            update(UserSession)
+            .where(UserSession.user_id == user_id, UserSession.revoked_at.is_(None))
+            .values(revoked_at=datetime.utcnow())
+        )
+        await publish(db, {"kind": "sessions", "user_id": str(user_id)})
+        await db.commit()
+        self.forget_user(user_id)
+        return result.rowcount
+
+    async def revoke(self, sid: uuid.UUID | str, user_id: uuid.UUID | str) -> bool:
+        """
+        Revoke one session (logout), best effort.
+
+        This worker stops accepting the session at once. The database write
+        and the notification to other workers are skipped while the circuit
+        is open, and a failure is logged rather than raised.
+
+        Returns:
+            Whether the revocation was written
+        """
+        sid, user_id = _as_uuid(sid), _as_uuid(user_id)
+        if sid is None or user_id is None:
+            return False
+        self._remember(sid, user_id, False)
+        try:
+            probe = db_circuit.acquire()
+            with db_circuit.record(probe):
+                async with get_session_factory()() as db:
+                    await db.execute(
+                        update(UserSession)
+                        .where(
+                            UserSession.id == sid,
+                            UserSession.user_id == user_id,
+                            UserSession.revoked_at.is_(None),
+                        )
+                        .values(revoked_at=datetime.utcnow())
+                    )
+                    await publish(
+                        db, {"kind": "sessions", "user_id": str(user_id), "sid": str(sid)}
+                    )
+                    await db.commit()
+        except Exception as exc:
+            logger.warning("Could not revoke session %s: %r", sid, exc)
+            return False
+        return True
+
+    def handle_invalidation(self, event: dict) -> None:
+        """Apply a revocation published by another worker."""
+        if event.get("kind") != "sessions":
+            return
+        sid = _as_uuid(event.get("sid"))
+        user_id = _as_uuid(event.get("user_id"))
+        if sid is not None:
+            self._remove(sid)
+        elif user_id is not None:
+            self.forget_user(user_id)
+
+    # Batched writes
+
+    async def flush(self) -> int:
+        """
+        Write pending last-used times and IPs in one batched UPDATE.
+
+        On an outage (or cancellation) the batch is kept for the next flush.
+        Any other failure retries the rows one by one and drops those that
+        still fail, so a bad row can't hold back the others.
+
+        Returns:
+            Number of sessions written
+        """
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        rows = [
+            {"sid": sid, "used_at": last_used_at, "client_ip": ip}
+            for sid, (last_used_at, ip) in pending.items()
+        ]
+        try:
+            # One executemany for the whole batch
+            await self._write(rows)
+            return len(rows)
+        except Exception as exc:
+            if isinstance(exc, CircuitOpenError) or is_outage(exc):
+                self._restore(pending)
+                raise
+            logger.warning("Session flush failed, writing rows one by one: %r", exc)
+        except BaseException:
+            self._restore(pending)
+            raise
+
+        written = 0
+        for index, row in enumerate(rows):
+            try:
+                await self._write([row])
+            except Exception as exc:
+                if not (isinstance(exc, CircuitOpenError) or is_outage(exc)):
+                    logger.warning("Dropped last-used time of session %s: %r", row["sid"], exc)
+                    continue
+                self._restore({later["sid"]: pending[later["sid"]] for later in rows[index:]})
+                raise
+            except BaseException:
+                self._restore({later["sid"]: pending[later["sid"]] for later in rows[index:]})
+                raise
+            written += 1
+        return written
+
+    async def _write(self, rows: list[dict]) -> None:
+        async with get_session_factory()() as db:
+            await db.execute(_TOUCH, rows)
+            await db.commit()
+
+    def _restore(self, pending: dict[uuid.UUID, tuple[datetime, str]]) -> None:
+        # Keep them for the next flush, unless newer touches replaced them
+        for sid, value in pending.items():
+            self._pending.setdefault(sid, value)
+
+    async def prune(self) -> int:
+        """Delete sessions revoked or unused for longer than a refresh token lives."""
+        cutoff = datetime.utcnow() - timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        async with get_session_factory()() as db:
+            result = await db.execute(
+                delete(UserSession).where(
+                    or_(UserSession.revoked_at < cutoff, UserSession.last_used_at < cutoff)
+                )
+            )
+            await db.commit()
+        return result.rowcount
+
+    async def run_periodic_flush(self, interval: float, prune_every: float = 3600.0) -> None:
+        """Flush pending touches every `interval` seconds (and prune hourly) until cancelled."""
+        next_prune = time.monotonic() + prune_every
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+                if time.monotonic() >= next_prune:
+                    next_prune = time.monotonic() + prune_every
+                    await self.prune()
+            except Exception as exc:
+                logger.warning("Session flush failed: %r", exc)
+
+
+session_registry = SessionRegistry(
+    max_entries=settings.SESSION_CACHE_MAX_ENTRIES, ttl=settings.SESSION_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,66 @@
+"""
+Request coalescing ("single flight") for identical concurrent lookups.
+
+Double-submitted forms and client retries make the same email arrive several
+times at once. The first lookup of a key runs its query; lookups of the same
+key that start while it is in flight wait for it and share its result (or its
+exception) instead of issuing an identical query. Nothing is cached: once the
+query finishes, the next lookup runs a new one.
+
+Results are shared between requests, so they must be immutable (UserSnapshot,
+never ORM objects). Coalescing is per worker; it does not span processes.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+from src.helpers.metrics import db_lookups_coalesced
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share it."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await fn(), or the call of fn already in flight for `key`.
+
+        If the call in flight is cancelled (its request went away), the
+        callers waiting on it run fn() themselves.
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            db_lookups_coalesced.inc(self.name)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # this caller was cancelled, not the shared call
+            return await self.do(key, fn)
+
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting: don't log "exception was never retrieved"
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def __len__(self) -> int:
+        return len(self._calls)
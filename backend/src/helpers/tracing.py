@@ -0,0 +1,295 @@
+"""
+Lightweight request tracing.
+
+Wrap a phase in `with span("db.user_lookup"):` to time it. Spans belong to the
+trace of the current request (kept in a contextvar by TracingMiddleware); with
+no active trace span() returns a shared no-op context manager, so disabled
+tracing costs one contextvar lookup per call.
+
+A finished trace can be summarized in a Server-Timing header
+(SERVER_TIMING_ENABLED) and/or exported as OTLP/JSON (TRACING_ENABLED) to a
+file of JSON lines (TRACE_EXPORT_PATH) or to a collector's
+/v1/traces endpoint (TRACE_EXPORT_URL).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import secrets
+import time
+import urllib.request
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from src.helpers.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+
+@dataclass(slots=True)
+class Span:
+    """One timed phase of a request."""
+
+    name: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int
+    end_ns: int = 0
+    kind: int = SPAN_KIND_INTERNAL
+    attributes: dict = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+
+class Trace:
+    """The spans recorded while handling one request."""
+
+    __slots__ = ("trace_id", "parent_id", "spans")
+
+    def __init__(self, trace_id: str | None = None, parent_id: str | None = None):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        # Span id of the caller, from an incoming traceparent header
+        self.parent_id = parent_id
+        self.spans: list[Span] = []
+
+    def server_timing(self) -> str:
+        """
+        Summarize finished spans as a Server-Timing header value.
+
+        Spans with the same name (e.g. several DB queries) are added together.
+        """
+        totals: dict[str, float] = {}
+        for span in self.spans:
+            if span.end_ns and span.kind != SPAN_KIND_SERVER:
+                totals[span.name] = totals.get(span.name, 0.0) + span.duration_ms
+        return ", ".join(f"{name};dur={duration:.2f}" for name, duration in totals.items())
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+_NOOP = nullcontext()
+
+
+def span(name: str, **attributes):
+    """
+    Time a phase of the current request.
+
+    Args:
+        name: Span name, also used as the Server-Timing metric name
+        **attributes: Extra attributes attached to the exported span
+
+    Returns:
+        Context manager (a no-op outside a traced request)
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP
+    return _record_span(trace, name, attributes, SPAN_KIND_INTERNAL)
+
+
+@contextmanager
+def _record_span(trace: Trace, name: str, attributes: dict, kind: int):
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent else trace.parent_id,
+        start_ns=time.time_ns(),
+        kind=kind,
+        attributes=attributes,
+    )
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+
+
+@contextmanager
+def start_trace(name: str, traceparent: str | None = None):
+    """
+    Start the trace for a request and make it current.
+
+    Args:
+        name: Name of the root (server) span
+        traceparent: W3C traceparent header of the caller, if any
+
+    Yields:
+        (trace, root span)
+    """
+    trace_id, parent_id = _parse_traceparent(traceparent)
+    trace = Trace(trace_id, parent_id)
+    token = _current_trace.set(trace)
+    try:
+        with _record_span(trace, name, {}, SPAN_KIND_SERVER) as root:
+            yield trace, root
+    finally:
+        _current_trace.reset(token)
+
+
+def current_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+def record_span(name: str, duration: float, **attributes) -> None:
+    """
+    Add an already finished span (e.g. timed by an event hook) to the current trace.
+
+    Args:
+        name: Span name
+        duration: Seconds the phase took, ending now
+        **attributes: Extra attributes attached to the exported span
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    end_ns = time.time_ns()
+    parent = _current_span.get()
+    trace.spans.append(
+        Span(
+            name=name,
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else trace.parent_id,
+            start_ns=end_ns - int(duration * 1e9),
+            end_ns=end_ns,
+            attributes=attributes,
+        )
+    )
+
+
+def _parse_traceparent(header: str | None) -> tuple[str | None, str | None]:
+    # version-traceid-parentid-flags, e.g. 00-<32 hex>-<16 hex>-01
+    if not header:
+        return None, None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None, None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None, None
+    return parts[1], parts[2]
+
+
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def to_otlp(traces: list[Trace], service_name: str) -> dict:
+    """Encode traces as an OTLP/JSON ExportTraceServiceRequest."""
+    spans = []
+    for trace in traces:
+        for span in trace.spans:
+            encoded = {
+                "traceId": trace.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": span.kind,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns or span.start_ns),
+                "attributes": [_attribute(k, v) for k, v in span.attributes.items()],
+            }
+            if span.parent_id:
+                encoded["parentSpanId"] = span.parent_id
+            spans.append(encoded)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        _attribute("service.name", service_name),
+                        _attribute("process.pid", os.getpid()),
+                    ]
+                },
+                "scopeSpans": [{"scope": {"name": "auth-api.tracing"}, "spans": spans}],
+            }
+        ]
+    }
+
+
+class SpanExporter:
+    """Buffer finished traces and export them in batches from a background task."""
+
+    def __init__(
+        self,
+        path: str = "",
+        url: str = "",
+        service_name: str = "auth-api",
+        max_queue: int = 10_000,
+        batch_size: int = 512,
+    ):
+        self.path = path
+        self.url = url
+        self.service_name = service_name
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.queue: deque[Trace] = deque()
+        self.dropped = 0
+
+    def submit(self, trace: Trace) -> None:
+        """Queue a finished trace; drops it if the exporter is falling behind."""
+        if len(self.queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self.queue.append(trace)
+
+    async def flush(self) -> None:
+        """Export everything queued so far."""
+        while self.queue:
+            batch = [
+                self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))
+            ]
+            payload = json.dumps(to_otlp(batch, self.service_name), separators=(",", ":"))
+            try:
+                await asyncio.to_thread(self._write, payload)
+            except Exception as exc:
+                logger.warning("Dropped %d traces, export failed: %s", len(batch), exc)
+                self.dropped += len(batch)
+
+    def _write(self, payload: str) -> None:
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(payload + "\n")
+        if self.url:
+            request = urllib.request.Request(
+                self.url,
+                data=payload.encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            with urllib.request.urlopen(request, timeout=5):
+                pass
+
+    async def run(self, interval: float = 1.0) -> None:
+        """Export queued traces every `interval` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+
+span_exporter = SpanExporter(
+    path=settings.TRACE_EXPORT_PATH,
+    url=settings.TRACE_EXPORT_URL,
+    service_name=settings.TRACE_SERVICE_NAME,
+)
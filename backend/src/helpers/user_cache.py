@@ -0,0 +1,268 @@
+"""
+In-process user lookup cache.
+
+Holds immutable snapshots of the user fields the auth flows need (never live
+ORM objects), keyed by both id and normalized email, with a TTL and LRU bound.
+Writers must call invalidate_user() inside their transaction: it announces the
+change to other workers via LISTEN/NOTIFY, and drop_cached_user() clears the
+local entry after commit.
+"""
+
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.helpers.cache_invalidation import publish
+from src.helpers.config import settings
+from src.helpers.generations import Generations
+from src.helpers.negative_cache import missing_emails
+from src.helpers.single_flight import SingleFlight
+from src.models.db_scheams.user import User
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """Read-only copy of a users row."""
+
+    id: uuid.UUID
+    name: str
+    email: str
+    hashed_password: str
+    is_active: bool
+    is_verified: bool
+    verification_token: str | None
+    created_at: datetime
+
+    @classmethod
+    def from_model(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            name=user.name,
+            email=user.email,
+            hashed_password=user.hashed_password,
+            is_active=bool(user.is_active),
+            is_verified=bool(user.is_verified),
+            verification_token=user.verification_token,
+            created_at=user.created_at,
+        )
+
+
+def normalize_email(email: str) -> str:
+    """
+    Normalize an email the way EmailStr stores it: trimmed, domain lowercased.
+
+    The local part keeps its case because the users.email lookup is case-sensitive.
+    """
+    local, _, domain = email.strip().rpartition("@")
+    return f"{local}@{domain.lower()}" if local else email.strip()
+
+
+class UserCache:
+    """Bounded TTL cache of UserSnapshot, indexed by id and by email."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._by_id: OrderedDict[uuid.UUID, tuple[float, UserSnapshot]] = OrderedDict()
+        self._id_by_email: dict[str, uuid.UUID] = {}
+        # Lookups read generation() before querying and pass it to put()
+        self._generations = Generations(max_entries)
+
+    def generation(self, user_id: uuid.UUID | None = None, email: str | None = None) -> int:
+        """Invalidation generation of a user id or an email, to pass to put()."""
+        if email is not None:
+            return self._generations.current(("email", normalize_email(email)))
+        return self._generations.current(("id", user_id))
+
+    def get(self, user_id: uuid.UUID) -> UserSnapshot | None:
+        entry = self._by_id.get(user_id)
+        if entry is None:
+            return None
+        expires_at, snapshot = entry
+        if expires_at < time.monotonic():
+            self._remove(user_id)
+            return None
+        self._by_id.move_to_end(user_id)
+        return snapshot
+
+    def get_by_email(self, email: str) -> UserSnapshot | None:
+        user_id = self._id_by_email.get(normalize_email(email))
+        return None if user_id is None else self.get(user_id)
+
+    def put(
+        self,
+        snapshot: UserSnapshot,
+        generation: int | None = None,
+        key: tuple[uuid.UUID | None, str | None] = (None, None),
+    ) -> UserSnapshot:
+        """
+        Cache a snapshot, unless `key` (user_id, email) was invalidated since
+        `generation` was read: the snapshot may then predate the change.
+        """
+        if generation is not None and self.generation(*key) != generation:
+            return snapshot
+        self._remove(snapshot.id)
+        if len(self._by_id) >= self.max_entries:
+            oldest_id = next(iter(self._by_id))
+            self._remove(oldest_id)
+        self._by_id[snapshot.id] = (time.monotonic() + self.ttl, snapshot)
+        self._id_by_email[normalize_email(snapshot.email)] = snapshot.id
+        return snapshot
+
+    def invalidate(self, user_id: uuid.UUID | None = None, email: str | None = None) -> None:
+        if email is not None:
+            self._generations.bump(("email", normalize_email(email)))
+            mapped_id = self._id_by_email.get(normalize_email(email))
+            if mapped_id is not None:
+                self._generations.bump(("id", mapped_id))
+                self._remove(mapped_id)
+        if user_id is not None:
+            self._generations.bump(("id", user_id))
+            entry = self._by_id.get(user_id)
+            if entry is not None:
+                self._generations.bump(("email", normalize_email(entry[1].email)))
+            self._remove(user_id)
+
+    def _remove(self, user_id: uuid.UUID) -> None:
+        entry = self._by_id.pop(user_id, None)
+        if entry is not None:
+            self._id_by_email.pop(normalize_email(entry[1].email), None)
+
+    def clear(self) -> None:
+        self._generations.bump_all()
+        self._by_id.clear()
+        self._id_by_email.clear()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+
+user_cache = UserCache(
+    max_entries=settings.USER_CACHE_MAX_ENTRIES, ttl=settings.USER_CACHE_TTL_SECONDS
+)
+lookups_by_email = SingleFlight("user_by_email")
+lookups_by_id = SingleFlight("user_by_id")
+
+
+def _remember(
+    user: User,
+    generation: int | None = None,
+    key: tuple[uuid.UUID | None, str | None] = (None, None),
+) -> UserSnapshot:
+    snapshot = UserSnapshot.from_model(user)
+    if settings.USER_CACHE_ENABLED:
+        user_cache.put(snapshot, generation, key)
+    return snapshot
+
+
+async def get_user_by_email(db: AsyncSession, email: str) -> UserSnapshot | None:
+    """
+    Load a user by email through the negative cache and the user cache.
+
+    On a miss, concurrent lookups of the same email share one query.
+
+    Args:
+        db: Database session used on a cache miss
+        email: Email address from a validated request
+
+    Returns:
+        User snapshot, or None if no such user exists
+    """
+    if missing_emails.is_known_missing(email):
+        return None
+    if settings.USER_CACHE_ENABLED:
+        snapshot = user_cache.get_by_email(email)
+        if snapshot is not None:
+            return snapshot
+
+    async def load() -> UserSnapshot | None:
+        # Read before the query: an invalidation handled while it runs means
+        # the row may be stale, so it must not be cached
+        generation = user_cache.generation(email=email)
+        missing_generation = missing_emails.generations.current(email)
+        result = await db.execute(select(User).where(User.email == email))
+        user = result.scalar_one_or_none()
+        if user is None:
+            missing_emails.remember_missing(email, missing_generation)
+            return None
+        return _remember(user, generation, (None, email))
+
+    if not settings.SINGLE_FLIGHT_ENABLED:
+        return await load()
+    return await lookups_by_email.do(email, load)
+
+
+async def get_user_by_id(db: AsyncSession, user_id: uuid.UUID | str) -> UserSnapshot | None:
+    """
+    Load a user by id through the user cache; concurrent misses share one query.
+
+    Args:
+        db: Database session used on a cache miss
+        user_id: User id (UUID or its string form, e.g. from a token)
+
+    Returns:
+        User snapshot, or None if no such user exists
+    """
+    if isinstance(user_id, str):
+        try:
+            user_id = uuid.UUID(user_id)
+        except ValueError:
+            return None
+    if settings.USER_CACHE_ENABLED:
+        snapshot = user_cache.get(user_id)
+        if snapshot is not None:
+            return snapshot
+
+    async def load() -> UserSnapshot | None:
+        generation = user_cache.generation(user_id=user_id)
+        user = await db.get(User, user_id)
+        return None if user is None else _remember(user, generation, (user_id, None))
+
+    if not settings.SINGLE_FLIGHT_ENABLED:
+        return await load()
+    return await lookups_by_id.do(user_id, load)
+
+
+def cache_new_user(user: User) -> UserSnapshot:
+    """Write-through for a freshly created user."""
+    missing_emails.remember_existing(user.email)
+    return _remember(user)
+
+
+async def invalidate_user(db: AsyncSession, user: UserSnapshot | User) -> None:
+    """
+    Announce a write to `user` on the current transaction.
+
+    Other workers drop their copy when the transaction commits. Call
+    drop_cached_user() after the commit to drop this worker's copy.
+    """
+    await publish(db, {"kind": "user", "id": str(user.id), "email": user.email})
+
+
+def drop_cached_user(user: UserSnapshot) -> None:
+    user_cache.invalidate(user_id=user.id, email=user.email)
+
+
+def handle_invalidation(event: dict) -> None:
+    """Apply an invalidation event published by another worker."""
+    if event.get("kind") != "user":
+        return
+    user_id = event.get("id")
+    user_cache.invalidate(
+        user_id=uuid.UUID(user_id) if user_id else None, email=event.get("email")
+    )
+    if event.get("email"):
+        # The user exists (it may have just signed up on that worker)
+        missing_emails.remember_existing(event["email"])
+
+
+def clear_user_caches() -> None:
+    """Drop everything cached about users (e.g. after missing invalidations)."""
+    user_cache.clear()
+    missing_emails.generations.bump_all()
+    missing_emails.negative.clear()
@@ -0,0 +1,172 @@
+"""
+Startup warm-up.
+
+Pays the first-request costs before real traffic arrives:
+    - statements: open DB_POOL_WARM connections at once and run the hot user
+      queries on each of them, filling SQLAlchemy's compiled cache and
+      asyncpg's per-connection prepared statements (against an id/email that
+      cannot exist; writes are rolled back)
+    - crypto: one bcrypt hash and verify on the hashing pool, and an access
+      and refresh token round trip
+    - schemas: validate and serialize the request/response models once
+    - mail: build the mail backend (imports fastapi_mail) off the event loop
+
+The statements phase always finishes before warm_up() returns, so the lifespan
+holds off uvicorn until the pool is warm: under serve.py workers share one
+socket, and a cold worker would be handed requests while its peers report
+ready. The other phases run in the background unless WARMUP_BLOCKING is set;
+warmup_state reports "warming_up" until they finish and /readyz answers 503
+meanwhile.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from src.helpers.config import settings
+from src.helpers.db import warm_pool
+from src.helpers.mail_backends import get_mail_backend
+from src.models.db_scheams.user import User
+
+
+logger = logging.getLogger(__name__)
+
+WARMUP_EMAIL = "warmup@example.com"
+WARMUP_USER_ID = uuid.UUID(int=0)
+
+
+class WarmupState:
+    """Progress of the startup warm-up, read by the health check."""
+
+    def __init__(self):
+        # "idle" until a lifespan starts warming up (tests never do)
+        self.status = "idle"
+        self.timings: dict[str, float] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.status != "warming_up"
+
+
+warmup_state = WarmupState()
+
+
+async def _warm_statements(connections: int) -> None:
+    async def prime(conn: AsyncConnection) -> None:
+        async with AsyncSession(bind=conn) as session:
+            await session.execute(select(User).where(User.email == WARMUP_EMAIL))
+            await session.get(User, WARMUP_USER_ID)
+            await session.execute(
+                update(User).where(User.id == WARMUP_USER_ID).values(verification_token=None)
+            )
+            await session.rollback()
+
+    await warm_pool(connections, prime)
+
+
+async def _warm_crypto() -> None:
+    from src.helpers.security import (
+        hash_password,
+        verify_password,
+        run_hashing,
+        generate_access_token,
+        verify_access_token,
+        generate_refresh_token,
+        verify_refresh_token,
+    )
+
+    hashed = await run_hashing(hash_password, "warmup-password")
+    await run_hashing(verify_password, "warmup-password", hashed)
+    verify_access_token(generate_access_token(str(WARMUP_USER_ID)))
+    verify_refresh_token(generate_refresh_token(str(WARMUP_USER_ID)))
+
+
+def _warm_schemas() -> None:
+    from src.models.schemas.user_schema import (
+        UserCreate,
+        LoginRequest,
+        VerifyCodeRequest,
+        ResendCodeRequest,
+        ForgotPasswordRequest,
+        ResetPasswordRequest,
+        UserResponse,
+        LoginResponse,
+    )
+
+    UserCreate(name="Warm Up", email=WARMUP_EMAIL, password="warmup-password")
+    LoginRequest(email=WARMUP_EMAIL, password="warmup-password")
+    VerifyCodeRequest(email=WARMUP_EMAIL, code="000000")
+    ResendCodeRequest(email=WARMUP_EMAIL)
+    ForgotPasswordRequest(email=WARMUP_EMAIL)
+    ResetPasswordRequest(email=WARMUP_EMAIL, code="000000", new_password="warmup-password")
+    UserResponse(
+        id=WARMUP_USER_ID,
+        name="Warm Up",
+        email=WARMUP_EMAIL,
+        is_verified=False,
+        created_at=datetime.utcnow(),
+    ).model_dump_json()
+    LoginResponse(access_token="warmup", token_type="bearer").model_dump_json()
+
+
+async def _run_phases(state: WarmupState, phases: list) -> None:
+    for name, phase in phases:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(phase(), settings.WARMUP_TIMEOUT_SECONDS)
+        except Exception as exc:
+            logger.warning("Warm-up phase %r failed: %r", name, exc)
+        state.timings[name] = time.perf_counter() - started
+
+
+async def _finish(state: WarmupState) -> None:
+    try:
+        await _run_phases(
+            state,
+            [
+                ("crypto", _warm_crypto),
+                ("schemas", lambda: asyncio.to_thread(_warm_schemas)),
+                ("mail", lambda: asyncio.to_thread(get_mail_backend)),
+            ],
+        )
+        logger.info(
+            "Warm-up finished: %s",
+            ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in state.timings.items()),
+        )
+    finally:
+        state.status = "ready"
+
+
+async def warm_up(state: WarmupState = warmup_state, wait: bool = True) -> asyncio.Task | None:
+    """
+    Run every warm-up phase, recording how long each took.
+
+    A failing phase is logged and skipped: warm-up only saves latency, so it
+    never keeps the worker from becoming ready.
+
+    Args:
+        state: Progress to report
+        wait: Whether to wait for every phase; if False, only the statements
+            phase is awaited and the rest continue in a background task
+
+    Returns:
+        The background task, or None if everything already ran
+    """
+    state.status = "warming_up"
+    try:
+        # At least one connection, so the statements are primed even without pool warm-up
+        await _run_phases(
+            state, [("statements", lambda: _warm_statements(max(1, settings.DB_POOL_WARM)))]
+        )
+    except BaseException:
+        state.status = "ready"
+        raise
+    if not wait:
+        return asyncio.create_task(_finish(state))
+    await _finish(state)
+    return None
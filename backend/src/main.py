@@ -1,23 +1,137 @@
+import asyncio
+import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from src.helpers.db import get_db, engine, Base
+from src.helpers.db import get_engine, Base, warm_pool
 from src.routes.auth_routes import router as auth_router
-from src.helpers.config import Settings
+from src.helpers.config import settings
+from src.helpers.email_service import wait_for_pending_emails
+from src.helpers.login_guard import login_guard
+from src.helpers.loop_monitor import loop_monitor
+from src.helpers.negative_cache import missing_emails
+from src.helpers.cache_invalidation import InvalidationListener
+from src.helpers.user_cache import handle_invalidation, clear_user_caches
+from src.helpers.session_registry import session_registry
+from src.helpers.rate_limiter import rate_limiter
+from src.helpers import metrics
+from src.helpers.tracing import span_exporter
+from src.helpers.query_stats import instrument_engine
+from src.helpers.warmup import warm_up
+from src.helpers.health import readiness
+from src.helpers.responses import FastJSONResponse, FastJSONRoute
+from src.helpers.idempotency import idempotency_store
+from src.helpers.audit import audit_log
+from src.middlewares.idempotency import IdempotencyMiddleware
+from src.middlewares.rate_limit import RateLimitMiddleware
+from src.middlewares.metrics import MetricsMiddleware
+from src.middlewares.tracing import TracingMiddleware
+from src.middlewares.query_budget import QueryBudgetMiddleware
+from src.middlewares.profiling import ProfilingMiddleware
 
 # Import models to register them with Base.metadata
 from src.models.db_scheams.user import User  # noqa: F401
+from src.models.db_scheams.user_session import UserSession  # noqa: F401
+from src.models.db_scheams.idempotency_key import IdempotencyKey  # noqa: F401
+from src.models.db_scheams.audit_event import ensure_audit_partitions
+
+
+logger = logging.getLogger(__name__)
+
+
+def _on_invalidation(event: dict) -> None:
+    handle_invalidation(event)
+    session_registry.handle_invalidation(event)
+
+
+def _on_missed_invalidations() -> None:
+    clear_user_caches()
+    session_registry.forget_all()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Create database tables on startup."""
+    """Create database tables, start the warm-up and background maintenance tasks."""
+    engine = get_engine()
+    # Instrument before the first statement so every query is timed
+    instrument_engine(engine)
+    if settings.METRICS_ENABLED:
+        metrics.instrument_pool(engine)
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await ensure_audit_partitions(conn)
+    await rate_limiter.setup()
+    background_tasks = [
+        asyncio.create_task(
+            login_guard.run_periodic_flush(settings.LOGIN_FAILURE_FLUSH_SECONDS)
+        ),
+        asyncio.create_task(
+            session_registry.run_periodic_flush(settings.SESSION_TOUCH_FLUSH_SECONDS)
+        ),
+        asyncio.create_task(readiness.run()),
+    ]
+    if settings.AUDIT_ENABLED:
+        background_tasks.append(asyncio.create_task(audit_log.run(settings.AUDIT_FLUSH_SECONDS)))
+    if settings.IDEMPOTENCY_ENABLED:
+        background_tasks.append(
+            asyncio.create_task(
+                idempotency_store.run_periodic_prune(settings.IDEMPOTENCY_PRUNE_SECONDS)
+            )
+        )
+    if settings.EMAIL_BLOOM_ENABLED:
+        background_tasks.append(
+            asyncio.create_task(
+                missing_emails.run_bloom_maintenance(settings.EMAIL_BLOOM_REFRESH_SECONDS)
+            )
+        )
+    if settings.CACHE_NOTIFY_ENABLED:
+        listener = InvalidationListener(_on_invalidation, _on_missed_invalidations)
+        background_tasks.append(asyncio.create_task(listener.run()))
+    if settings.METRICS_MULTIPROC_DIR:
+        background_tasks.append(
+            asyncio.create_task(
+                metrics.run_periodic_dump(
+                    settings.METRICS_FLUSH_SECONDS, settings.METRICS_MULTIPROC_DIR
+                )
+            )
+        )
+    if settings.TRACING_ENABLED:
+        background_tasks.append(asyncio.create_task(span_exporter.run()))
+    if settings.LOOP_MONITOR_ENABLED:
+        background_tasks.append(asyncio.create_task(loop_monitor.run()))
+    # Pay the first-request costs before traffic arrives (see /health). The pool
+    # is warm before uvicorn accepts connections either way
+    if settings.WARMUP_ENABLED:
+        rest = await warm_up(wait=settings.WARMUP_BLOCKING)
+        if rest is not None:
+            background_tasks.append(rest)
+    elif settings.DB_POOL_WARM > 0:
+        await warm_pool(settings.DB_POOL_WARM)
     yield
+    # uvicorn has stopped accepting requests; let queued emails go out first
+    pending = await wait_for_pending_emails(settings.EMAIL_DRAIN_TIMEOUT_SECONDS)
+    if pending:
+        logger.warning("Shutting down with %d emails still being sent", pending)
+    for task in background_tasks:
+        task.cancel()
+    # Let cancelled flushes put their in-flight batches back before the final flush
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    # Last-used times not written yet
+    try:
+        await session_registry.flush()
+    except Exception as exc:
+        logger.warning("Could not flush session last-used times: %r", exc)
+    # Audit events still buffered
+    try:
+        await audit_log.flush()
+    except Exception as exc:
+        logger.warning("Could not flush audit events: %r", exc)
+    if settings.TRACING_ENABLED:
+        await span_exporter.flush()
+    if settings.METRICS_MULTIPROC_DIR:
+        metrics.write_snapshot(settings.METRICS_MULTIPROC_DIR)
 
 
 # FastAPI App
@@ -26,10 +140,18 @@ app = FastAPI(
     description="A simple FastAPI server with PostgreSQL connection",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse if settings.FAST_JSON_RESPONSES else JSONResponse,
 )
+app.router.route_class = FastJSONRoute
+
+# idempotency keys (inside rate limiting, so replays still count against the limits)
+app.add_middleware(IdempotencyMiddleware)
+
+# rate limiting (added before CORS so 429 responses still carry CORS headers)
+app.add_middleware(RateLimitMiddleware)
 
 # cors
-origins = Settings().CORS_ORIGINS.split(",")
+origins = settings.CORS_ORIGINS.split(",")
 
 app.add_middleware(
     CORSMiddleware,
@@ -40,6 +162,27 @@ app.add_middleware(
 )
 
 
+# per-request query budgets (statement timing is attached to the engine in lifespan)
+if settings.QUERY_BUDGET_PER_REQUEST > 0:
+    app.add_middleware(QueryBudgetMiddleware)
+
+# per-request profiling (only installed when enabled)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# tracing (only installed when enabled, so it costs nothing otherwise)
+if settings.SERVER_TIMING_ENABLED or settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+
+# metrics (outermost, so rate-limited and failed requests are timed too)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        return PlainTextResponse(metrics.collect(), media_type=metrics.CONTENT_TYPE)
+
+
 # Include routers
 app.include_router(auth_router)
 
@@ -53,28 +196,57 @@ async def root():
     }
 
 
+@app.get("/livez")
+async def liveness_check():
+    """
+    Report that the process is up. Never touches the database.
+    """
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+async def readiness_check():
+    """
+    Report whether this worker should receive traffic (cached, see helpers/health.py).
+    """
+    report = await readiness.current()
+    return JSONResponse(status_code=200 if report.ready else 503, content=report.to_dict())
+
+
 @app.get("/health")
-async def health_check(db: AsyncSession = Depends(get_db)):
+async def health_check():
     """
     Check if the server and database are running correctly.
+
+    Served from the cached readiness report, so it never takes a pool
+    connection itself. Answers 503 while the startup warm-up is still running.
     """
-    try:
-        # Execute a simple query to verify database connectivity
-        await db.execute(text("SELECT 1"))
+    report = await readiness.current()
+    if report.status == "warming_up":
+        return JSONResponse(
+            status_code=503,
+            content={
+                "status": "warming_up",
+                "database": "unknown",
+                "message": "Server is warming up",
+            },
+        )
+    database = report.checks["database"]
+    if database == "connected":
         return {
             "status": "online",
             "database": "connected",
             "message": "System is healthy",
         }
-    except Exception as e:
-        return {
-            "status": "online",
-            "database": f"error: {str(e)}",
-            "message": "Database connection failed",
-        }
+    return {
+        "status": "online",
+        "database": f"error: {database}",
+        "message": "Database connection failed",
+    }
 
 
 if __name__ == "__main__":
+    # Development server with auto-reload; run `python -m src.serve` in production
     import uvicorn
 
     uvicorn.run("src.main:app", host="0.0.0.0", port=8000, reload=True)
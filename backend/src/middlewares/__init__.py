@@ -0,0 +1 @@
+# Empty file to make middlewares a Python package
@@ -0,0 +1,141 @@
+"""
+Pure ASGI Idempotency-Key middleware.
+
+POSTs to the IDEMPOTENCY_PATHS endpoints that carry an Idempotency-Key
+header run at most once per key: repeats get the stored response back
+(marked with Idempotent-Replayed: true) without reaching the endpoint.
+Requests without the header are not affected. See helpers/idempotency.py.
+"""
+
+import json
+
+from src.helpers.config import settings
+from src.helpers.idempotency import (
+    CONFLICT,
+    MAX_KEY_LENGTH,
+    MISMATCH,
+    REPLAY,
+    IdempotencyStore,
+    StoredResponse,
+    idempotency_store,
+    request_fingerprint,
+)
+from src.helpers.metrics import idempotent_requests
+from src.helpers.request_utils import buffer_body
+
+
+# Larger bodies are refused rather than buffered for fingerprinting
+MAX_BODY_BYTES = 64 * 1024
+
+
+class IdempotencyMiddleware:
+    """Replay stored responses for repeated Idempotency-Key requests."""
+
+    def __init__(self, app, store: IdempotencyStore = idempotency_store):
+        self.app = app
+        self.store = store
+        self.paths = frozenset(
+            path.strip() for path in settings.IDEMPOTENCY_PATHS.split(",") if path.strip()
+        )
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not settings.IDEMPOTENCY_ENABLED
+            or scope["method"] != "POST"
+            or scope["path"] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        key = None
+        for name, value in scope.get("headers", ()):
+            if name == b"idempotency-key":
+                key = value.decode("latin-1").strip()
+                break
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_error(send, 400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+            return
+
+        body, receive = await buffer_body(receive, MAX_BODY_BYTES)
+        if body is None:
+            await _send_error(send, 413, "Request body too large for an Idempotency-Key request")
+            return
+        fingerprint = request_fingerprint(scope["method"], scope["path"], body)
+        outcome, stored = await self.store.begin(key, fingerprint)
+        idempotent_requests.inc(outcome)
+        if outcome == REPLAY:
+            await _send_stored(send, stored)
+            return
+        if outcome == CONFLICT:
+            await _send_error(
+                send,
+                409,
+                "A request with this Idempotency-Key is still being processed",
+                [(b"retry-after", b"1")],
+            )
+            return
+        if outcome == MISMATCH:
+            await _send_error(send, 422, "Idempotency-Key was already used for a different request")
+            return
+
+        start = None
+        chunks = []
+        finished = False
+
+        async def capture_send(message):
+            nonlocal start, finished
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await send(message)
+                    # Stored before background tasks (emails) run, so retries
+                    # arriving meanwhile are replayed rather than refused
+                    finished = True
+                    await self.store.complete(
+                        key,
+                        fingerprint,
+                        StoredResponse(
+                            start["status"], tuple(start.get("headers", ())), b"".join(chunks)
+                        ),
+                    )
+                    return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture_send)
+        finally:
+            if not finished:
+                await self.store.abandon(key)
+
+
+async def _send_stored(send, response: StoredResponse) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [*response.headers, (b"idempotent-replayed", b"true")],
+        }
+    )
+    await send({"type": "http.response.body", "body": response.body})
+
+
+async def _send_error(send, status: int, detail: str, headers: list | None = None) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *(headers or ()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,45 @@
+"""
+Pure ASGI middleware recording request latency per route and status.
+
+Routes are labelled by their template ("/auth/login", not the raw path) so
+unknown URLs cannot blow up the number of series.
+"""
+
+import time
+
+from src.helpers.metrics import http_request_duration, http_requests_in_progress
+from src.helpers.request_utils import get_route_template
+
+
+class MetricsMiddleware:
+    """Observe http_request_duration_seconds for every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        http_requests_in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_progress.dec()
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                get_route_template(scope),
+                str(status_code),
+            )
+
@@ -0,0 +1,74 @@
+"""
+Pure ASGI middleware that profiles selected requests.
+
+Only installed when PROFILING_ENABLED is set. A request is profiled when it
+carries an X-Profile-Token header matching PROFILING_TOKEN, or at random with
+probability PROFILING_SAMPLE_RATE. One request per worker is profiled at a
+time; the profile name is returned in the X-Profile-Id response header.
+"""
+
+import asyncio
+import random
+import re
+import secrets
+import time
+
+from src.helpers.config import settings
+from src.helpers.profiler import ProfileRing, RequestSampler
+from src.helpers.request_utils import get_route_template
+
+
+class ProfilingMiddleware:
+    """Sample the stacks of a request and store them as a collapsed-stack profile."""
+
+    def __init__(
+        self,
+        app,
+        token: str = settings.PROFILING_TOKEN,
+        sample_rate: float = settings.PROFILING_SAMPLE_RATE,
+        ring: ProfileRing | None = None,
+        interval: float = settings.PROFILING_INTERVAL_SECONDS,
+    ):
+        self.app = app
+        self.token = token.encode("latin-1")
+        self.sample_rate = sample_rate
+        self.ring = ring or ProfileRing(settings.PROFILING_DIR, settings.PROFILING_MAX_FILES)
+        self.interval = interval
+        self._active = False
+
+    def _selected(self, scope) -> bool:
+        if self.token:
+            for name, value in scope.get("headers", ()):
+                if name == b"x-profile-token":
+                    return secrets.compare_digest(value, self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._active or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._active = True
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{secrets.token_hex(4)}"
+        status_code = 500
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"x-profile-id", profile_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        sampler = RequestSampler(asyncio.current_task(), self.interval)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            counts = sampler.stop()
+            self._active = False
+            route = re.sub(r"[^\w-]+", "_", get_route_template(scope)).strip("_") or "root"
+            name = f"{profile_id}_{scope['method']}_{route}_{status_code}"
+            await asyncio.to_thread(self.ring.write, name, counts)
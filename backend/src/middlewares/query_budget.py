@@ -0,0 +1,43 @@
+"""
+Pure ASGI middleware counting the SQL statements each request runs.
+
+Logs a warning when a request goes over QUERY_BUDGET_PER_REQUEST, so an extra
+round trip added to a flow shows up as soon as it is exercised.
+"""
+
+import logging
+
+from src.helpers.config import settings
+from src.helpers.metrics import db_queries_per_request
+from src.helpers.query_stats import track_queries
+from src.helpers.request_utils import get_route_template
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    """Record db_queries_per_request and warn about requests over budget."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            await self.app(scope, receive, send)
+
+        route = get_route_template(scope)
+        db_queries_per_request.observe(stats.count, route)
+        if stats.count > settings.QUERY_BUDGET_PER_REQUEST:
+            logger.warning(
+                "%s %s ran %d queries (budget %d, %.1f ms in the database)",
+                scope["method"],
+                route,
+                stats.count,
+                settings.QUERY_BUDGET_PER_REQUEST,
+                stats.total_seconds * 1000,
+            )
@@ -0,0 +1,74 @@
+"""
+Pure ASGI rate limiting middleware.
+
+Runs before routing, body validation and dependencies, so a rejected request
+never reaches bcrypt or the database. IP-scoped buckets are checked before
+the body is read; email-scoped ones read at most MAX_BODY_BYTES of it.
+"""
+
+import json
+
+from src.helpers.config import settings
+from src.helpers.rate_limiter import RateLimiter, rate_limiter
+from src.helpers.request_utils import buffer_body, get_client_ip
+
+
+# Bodies larger than this are not parsed for the email key
+MAX_BODY_BYTES = 64 * 1024
+
+
+class RateLimitMiddleware:
+    """Reject requests over their route's token-bucket limits with 429."""
+
+    def __init__(self, app, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        policies = self.limiter.policies.get(scope["path"])
+        if not policies or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        ip = get_client_ip(scope)
+        retry_after = await self.limiter.check(scope["path"], ip, scopes=("ip",))
+        if not retry_after and any(policy.scope == "email" for policy in policies):
+            body, receive = await buffer_body(receive, MAX_BODY_BYTES)
+            retry_after = await self.limiter.check(
+                scope["path"], ip, _extract_email(body), scopes=("email",)
+            )
+        if retry_after:
+            await _send_too_many_requests(send, retry_after)
+            return
+
+        await self.app(scope, receive, send)
+
+
+def _extract_email(body: bytes | None) -> str | None:
+    if not body:
+        return None
+    try:
+        email = json.loads(body).get("email")
+    except (ValueError, AttributeError):
+        return None
+    return email.strip().lower() if isinstance(email, str) and email else None
+
+
+async def _send_too_many_requests(send, retry_after: int) -> None:
+    body = json.dumps({"detail": "Too many requests, please try again later"}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
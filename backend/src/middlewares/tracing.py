@@ -0,0 +1,57 @@
+"""
+Pure ASGI middleware that opens a trace for every HTTP request.
+
+Only installed when SERVER_TIMING_ENABLED or TRACING_ENABLED is set, so it
+costs nothing otherwise.
+"""
+
+import time
+
+from src.helpers.config import settings
+from src.helpers.request_utils import get_route_template
+from src.helpers.tracing import SpanExporter, span_exporter, start_trace
+
+
+class TracingMiddleware:
+    """Add a Server-Timing header and hand finished traces to the exporter."""
+
+    def __init__(self, app, exporter: SpanExporter = span_exporter):
+        self.app = app
+        self.exporter = exporter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope.get("headers", ()):
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        with start_trace(scope["method"], traceparent) as (trace, root):
+
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    root.attributes["http.status_code"] = message["status"]
+                    if settings.SERVER_TIMING_ENABLED:
+                        elapsed_ms = (time.time_ns() - root.start_ns) / 1e6
+                        timing = ", ".join(
+                            filter(None, (trace.server_timing(), f"total;dur={elapsed_ms:.2f}"))
+                        )
+                        message["headers"] = [
+                            *message.get("headers", ()),
+                            (b"server-timing", timing.encode("latin-1")),
+                        ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+            # Name by route template so span names stay low-cardinality
+            route = get_route_template(scope)
+            root.name = f"{scope['method']} {route}"
+            root.attributes["http.method"] = scope["method"]
+            root.attributes["http.route"] = route
+
+        if settings.TRACING_ENABLED:
+            self.exporter.submit(trace)
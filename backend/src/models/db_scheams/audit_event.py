@@ -0,0 +1,109 @@
+"""
+Auth audit event schema for SQLAlchemy ORM.
+
+On PostgreSQL the table is range-partitioned by month on occurred_at, so
+queries for a time range only scan the months they cover and old months can
+be detached or dropped whole. Monthly partitions are created ahead of time by
+ensure_audit_partitions(); a DEFAULT partition catches anything else. Other
+databases (SQLite in benchmarks) get a plain table.
+"""
+
+import logging
+import uuid
+from datetime import datetime
+from sqlalchemy import (
+    DDL,
+    Boolean,
+    Column,
+    DateTime,
+    Index,
+    String,
+    Uuid,
+    event as sa_event,
+    text,
+)
+from sqlalchemy.exc import DBAPIError
+
+from src.helpers.db import Base
+
+
+logger = logging.getLogger(__name__)
+
+
+class AuditEvent(Base):
+    """One security-relevant auth event (login, signup, verification, reset)."""
+
+    __tablename__ = "auth_audit_events"
+
+    # The partition key has to be part of the primary key
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    occurred_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
+
+    event = Column(String(32), nullable=False)  # login, signup, verify_email, password_reset
+    success = Column(Boolean, nullable=False)
+    user_id = Column(Uuid(as_uuid=True), nullable=True)  # no FK: the trail outlives the user
+    email = Column(String(255), nullable=True)
+    ip = Column(String(45), nullable=False, default="")
+    detail = Column(String(255), nullable=True)  # failure reason
+
+    __table_args__ = (
+        # "What happened to this account" and "all failed logins since ..."
+        Index("ix_auth_audit_events_user_time", "user_id", "occurred_at"),
+        Index("ix_auth_audit_events_event_time", "event", "occurred_at"),
+        {"postgresql_partition_by": "RANGE (occurred_at)"},
+    )
+
+    def __repr__(self):
+        return f"<AuditEvent {self.event} success={self.success} user={self.user_id}>"
+
+
+sa_event.listen(
+    AuditEvent.__table__,
+    "after_create",
+    DDL(
+        "CREATE TABLE IF NOT EXISTS auth_audit_events_default "
+        "PARTITION OF auth_audit_events DEFAULT"
+    ).execute_if(dialect="postgresql"),
+)
+
+
+def _month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def _next_month(moment: datetime) -> datetime:
+    return datetime(moment.year + moment.month // 12, moment.month % 12 + 1, 1)
+
+
+async def ensure_audit_partitions(
+    conn, now: datetime | None = None, months_ahead: int = 1
+) -> None:
+    """
+    Create the monthly partitions of auth_audit_events up to `months_ahead` months out.
+
+    Does nothing on databases other than PostgreSQL. A month whose rows already
+    landed in the DEFAULT partition cannot get its own partition; that is
+    logged and the rows stay where they are.
+
+    Args:
+        conn: AsyncConnection (committed by the caller)
+        now: Reference time (defaults to the current UTC time)
+        months_ahead: How many months after the current one to prepare
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    start = _month_start(now or datetime.utcnow())
+    for _ in range(months_ahead + 1):
+        end = _next_month(start)
+        try:
+            async with conn.begin_nested():
+                await conn.execute(
+                    text(
+                        f"CREATE TABLE IF NOT EXISTS auth_audit_events_{start:%Y_%m} "
+                        f"PARTITION OF auth_audit_events "
+                        f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+                    )
+                )
+        except DBAPIError as exc:
+            logger.warning("Could not create audit partition for %s: %s", f"{start:%Y-%m}", exc)
+        start = end
@@ -0,0 +1,29 @@
+"""
+Idempotency key schema for SQLAlchemy ORM.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime, LargeBinary, Text
+
+from src.helpers.db import Base
+
+
+class IdempotencyKey(Base):
+    """Stored response of a request sent with an Idempotency-Key header."""
+
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 of method, path and body
+
+    # Response; status_code is NULL while the first request is still running
+    status_code = Column(Integer, nullable=True)
+    headers = Column(Text, nullable=True)  # JSON list of [name, value]
+    body = Column(LargeBinary, nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.key} status={self.status_code}>"
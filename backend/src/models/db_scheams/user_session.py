@@ -0,0 +1,40 @@
+"""
+Login session schema for SQLAlchemy ORM.
+"""
+
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Uuid, ForeignKey, Index
+
+from src.helpers.db import Base
+
+
+class UserSession(Base):
+    """One login (device) of a user; its id is the `sid` claim of the user's tokens."""
+
+    __tablename__ = "user_sessions"
+
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(
+        Uuid(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    device = Column(String(255), nullable=False, default="")  # User-Agent, truncated
+    ip = Column(String(45), nullable=False, default="")
+
+    # Timestamps
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_used_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    revoked_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Listing and revoking only ever look at a user's live sessions
+        Index(
+            "ix_user_sessions_user_live",
+            "user_id",
+            postgresql_where=revoked_at.is_(None),
+            sqlite_where=revoked_at.is_(None),
+        ),
+    )
+
+    def __repr__(self):
+        return f"<UserSession {self.id} user={self.user_id}>"
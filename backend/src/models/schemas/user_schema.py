@@ -118,3 +118,29 @@ class ResetPasswordRequest(BaseModel):
         if len(v) < 8:
             raise ValueError("Password must be at least 8 characters long")
         return v
+
+
+class SessionResponse(BaseModel):
+    """Schema for one login session (device) of the current user."""
+
+    id: UUID
+    device: str
+    ip: str
+    created_at: datetime
+    last_used_at: datetime
+    current: bool  # The session of the token making the request
+
+    class Config:
+        from_attributes = True
+
+
+class SessionListResponse(BaseModel):
+    """Schema for the current user's live sessions."""
+
+    sessions: list[SessionResponse]
+
+
+class IntrospectionBatchRequest(BaseModel):
+    """Schema for introspecting several access tokens in one gateway call."""
+
+    tokens: list[str] = Field(..., min_length=1, max_length=500)
@@ -2,10 +2,12 @@
 Authentication routes for FastAPI.
 """
 
-from fastapi import APIRouter, Depends, BackgroundTasks, status, Response, Cookie
+from fastapi import APIRouter, Depends, BackgroundTasks, status, Request, Response, Cookie, Form
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.helpers.db import get_db
+from src.helpers.responses import FastJSONRoute
+from src.helpers.security import get_access_claims, require_introspection_client
 from src.models.schemas.user_schema import (
     UserCreate,
     UserResponse,
@@ -15,6 +17,8 @@ from src.models.schemas.user_schema import (
     LoginRequest,
     ForgotPasswordRequest,
     ResetPasswordRequest,
+    SessionListResponse,
+    IntrospectionBatchRequest,
 )
 from src.controllers.auth_controller import (
     signup,
@@ -22,12 +26,16 @@ from src.controllers.auth_controller import (
     resend_verification_code,
     login,
     refresh_access_token,
+    logout,
     forgot_password,
     reset_password,
+    list_sessions,
+    revoke_all_sessions,
+    introspect_tokens,
 )
 
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=FastJSONRoute)
 
 
 @router.post(
@@ -36,6 +44,7 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 async def register_user(
     user_data: UserCreate,
     background_tasks: BackgroundTasks,
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ) -> UserResponse:
     """
@@ -47,12 +56,13 @@ async def register_user(
 
     Returns the created user info. A verification code will be sent via email.
     """
-    return await signup(user_data, db, background_tasks)
+    return await signup(user_data, db, background_tasks, request)
 
 
 @router.post("/verify-code", status_code=status.HTTP_200_OK)
 async def verify_user_email(
     verify_data: VerifyCodeRequest,
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ) -> dict:
     """
@@ -63,7 +73,7 @@ async def verify_user_email(
 
     Returns success message if verification is successful.
     """
-    return await verify_email(verify_data, db)
+    return await verify_email(verify_data, db, request)
 
 
 @router.post("/resend-code", status_code=status.HTTP_200_OK)
@@ -85,6 +95,7 @@ async def resend_code(
 @router.post("/login", response_model=LoginResponse, status_code=status.HTTP_200_OK)
 async def login_user(
     login_data: LoginRequest,
+    request: Request,
     response: Response,
     db: AsyncSession = Depends(get_db),
 ) -> LoginResponse:
@@ -96,23 +107,25 @@ async def login_user(
 
     Returns access token and token type.
     """
-    return await login(login_data, response, db)
+    return await login(login_data, request, response, db)
 
 
 @router.post("/refresh", response_model=LoginResponse)
 async def refresh_endpoint(
+    request: Request,
     response: Response,
     refresh_token: str = Cookie(None),
-    db: AsyncSession = Depends(get_db),
 ):
-    return await refresh_access_token(response, refresh_token, db)
+    # No DB session: the sid check uses the session registry's hot index, so
+    # refresh keeps working while the database circuit is open
+    return await refresh_access_token(response, refresh_token, request=request)
 
 
 @router.post("/logout")
-async def logout_endpoint(response: Response):
-    """Logout user by clearing refresh token cookie."""
-    response.delete_cookie(key="refresh_token")
-    return {"message": "Logged out successfully"}
+async def logout_endpoint(response: Response, refresh_token: str = Cookie(None)):
+    """Logout user: revoke the refresh token's session and clear the cookie."""
+    # No DB dependency: logout must clear the cookie even while the database is down
+    return await logout(response, refresh_token)
 
 
 @router.post("/forgot-password", status_code=status.HTTP_200_OK)
@@ -134,6 +147,7 @@ async def forgot_password_endpoint(
 @router.post("/reset-password", status_code=status.HTTP_200_OK)
 async def reset_password_endpoint(
     reset_data: ResetPasswordRequest,
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ) -> dict:
     """
@@ -145,4 +159,59 @@ async def reset_password_endpoint(
 
     Returns success message if password is reset successfully.
     """
-    return await reset_password(reset_data, db)
+    return await reset_password(reset_data, db, request)
+
+
+@router.get("/sessions", response_model=SessionListResponse)
+async def list_sessions_endpoint(
+    claims: dict = Depends(get_access_claims),
+    db: AsyncSession = Depends(get_db),
+) -> SessionListResponse:
+    """
+    List the devices the current user is logged in on.
+
+    Requires a Bearer access token. The session making the request is marked `current`.
+    """
+    return await list_sessions(claims, db)
+
+
+@router.post("/sessions/revoke-all", status_code=status.HTTP_200_OK)
+async def revoke_all_sessions_endpoint(
+    response: Response,
+    claims: dict = Depends(get_access_claims),
+    db: AsyncSession = Depends(get_db),
+) -> dict:
+    """
+    Log out everywhere: revoke every session of the current user.
+
+    Requires a Bearer access token. Refresh tokens of all devices stop working immediately.
+    """
+    return await revoke_all_sessions(claims, response, db)
+
+
+@router.post("/introspect", status_code=status.HTTP_200_OK)
+async def introspect_endpoint(
+    token: str = Form(...),
+    token_type_hint: str | None = Form(None),
+    client_id: str = Depends(require_introspection_client),
+) -> dict:
+    """
+    RFC 7662 token introspection for the API gateway.
+
+    Requires HTTP Basic client credentials. Returns `{"active": false}` for
+    any token that is invalid, expired or whose session was revoked.
+    """
+    return (await introspect_tokens([token]))[0]
+
+
+@router.post("/introspect/batch", status_code=status.HTTP_200_OK)
+async def introspect_batch_endpoint(
+    batch: IntrospectionBatchRequest,
+    client_id: str = Depends(require_introspection_client),
+) -> dict:
+    """
+    Introspect up to 500 tokens in one call; results come back in request order.
+
+    Requires HTTP Basic client credentials.
+    """
+    return {"results": await introspect_tokens(batch.tokens)}
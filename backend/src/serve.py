@@ -0,0 +1,102 @@
+"""
+Production server entry point.
+
+    python -m src.serve                    # one worker per available core
+    python -m src.serve --workers 4 --port 8080
+
+Runs uvicorn with uvloop and httptools (when installed), a tuned listen
+backlog and keep-alive, and a graceful shutdown window: on SIGTERM each worker
+stops accepting connections, finishes in-flight requests, then drains pending
+verification/reset emails in the lifespan shutdown. Each worker warms up
+(pool, hot statements, crypto) at startup and reports 503 on /readyz until
+it is done.
+
+Defaults come from the SERVER_* settings; command-line flags override them.
+For development with auto-reload use `python -m src.main`.
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+import re
+
+import uvicorn
+
+from src.helpers.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+def default_workers() -> int:
+    """One worker per core available to this process (respects CPU affinity)."""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+# Worker snapshots written by metrics.write_snapshot(), and their temp files
+_SNAPSHOT_NAME = re.compile(r"\.?\d+\.json(\.tmp)?")
+
+
+def _reset_metrics_dir(directory: str) -> None:
+    # Snapshots from a previous run would be merged into this one's counters.
+    # Only those are removed: the directory may be shared or misconfigured
+    os.makedirs(directory, exist_ok=True)
+    for entry in os.scandir(directory):
+        if entry.is_file() and _SNAPSHOT_NAME.fullmatch(entry.name):
+            os.remove(entry.path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the auth API in production mode.")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.SERVER_WORKERS or default_workers(),
+        help="worker processes (default: one per core)",
+    )
+    parser.add_argument("--backlog", type=int, default=settings.SERVER_BACKLOG)
+    parser.add_argument(
+        "--keep-alive", type=int, default=settings.SERVER_KEEPALIVE_SECONDS, help="idle seconds"
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        help="seconds to finish in-flight requests on shutdown",
+    )
+    parser.add_argument("--access-log", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    if args.workers > 1 and settings.METRICS_ENABLED and not settings.METRICS_MULTIPROC_DIR:
+        logger.warning("Set METRICS_MULTIPROC_DIR to aggregate /metrics across workers")
+    if settings.METRICS_MULTIPROC_DIR:
+        _reset_metrics_dir(settings.METRICS_MULTIPROC_DIR)
+
+    uvicorn.run(
+        "src.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if _installed("uvloop") else "asyncio",
+        http="httptools" if _installed("httptools") else "h11",
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=settings.RATE_LIMIT_TRUST_FORWARDED,
+        access_log=args.access_log,
+        server_header=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ Pytest configuration for authentication system tests.
 Uses existing dev database as specified by user.
 """
 
+import os
 import pytest
 import asyncio
 from typing import AsyncGenerator
@@ -10,12 +11,29 @@ from httpx import AsyncClient, ASGITransport
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy import text
 
+# Keep emails in memory so the suite never needs a real SMTP server
+os.environ["MAIL_BACKEND"] = "memory"
+
 from src.main import app
 from src.helpers.db import Base, get_db
 from src.helpers.config import settings
+from src.helpers.mail_backends import get_mail_backend
+from src.helpers.rate_limiter import rate_limiter
+from src.helpers.login_guard import login_guard
+from src.helpers.negative_cache import missing_emails
+from src.helpers.user_cache import user_cache
+from src.helpers.session_registry import session_registry
+from src.helpers.security import verified_tokens
+from src.helpers.refresh_grace import refresh_grace
+from src.helpers.idempotency import idempotency_store
+from src.helpers.audit import audit_log
+from src.helpers.security import hash_password
 
 # Import models to register them with Base.metadata
-from src.models.db_scheams.user import User  # noqa: F401
+from src.models.db_scheams.user import User
+from src.models.db_scheams.user_session import UserSession  # noqa: F401
+from src.models.db_scheams.idempotency_key import IdempotencyKey  # noqa: F401
+from src.models.db_scheams.audit_event import AuditEvent  # noqa: F401
 
 
 # Create test engine using the same database
@@ -26,6 +44,16 @@ TestSessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+# Helpers that open their own sessions rather than using get_db
+SESSION_FACTORY_USERS = (
+    "src.helpers.db",  # also used by negative_cache
+    "src.helpers.audit",
+    "src.helpers.idempotency",
+    "src.helpers.session_registry",
+)
+
+PASSWORD = "SecurePass123"
+
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -44,6 +72,20 @@ async def setup_database():
     # Clean up users table after each test for isolation
     async with test_engine.begin() as conn:
         await conn.execute(text("DELETE FROM users"))
+        await conn.execute(text("DELETE FROM idempotency_keys"))
+        await conn.execute(text("DELETE FROM auth_audit_events"))
+
+
+def use_session_factory(monkeypatch, factory: async_sessionmaker) -> None:
+    """Point every helper that opens its own sessions at `factory`."""
+    for module in SESSION_FACTORY_USERS:
+        monkeypatch.setattr(f"{module}.get_session_factory", lambda: factory)
+
+
+@pytest.fixture(autouse=True)
+def helpers_on_test_db(monkeypatch):
+    """Flushes, hot-index misses and other background queries use the test database."""
+    use_session_factory(monkeypatch, TestSessionLocal)
 
 
 async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -66,7 +108,76 @@ async def db_session(setup_database) -> AsyncGenerator[AsyncSession, None]:
 async def client(setup_database) -> AsyncGenerator[AsyncClient, None]:
     """Create an async test client."""
     app.dependency_overrides[get_db] = override_get_db
+    get_mail_backend().clear()
+    rate_limiter.reset()
+    login_guard.clear()
+    missing_emails.clear()
+    user_cache.clear()
+    session_registry.clear()
+    verified_tokens.clear()
+    refresh_grace.clear()
+    idempotency_store.clear()
+    audit_log.clear()
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         yield ac
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def create_user(db_session: AsyncSession):
+    """Add users to the test database: `await create_user(email, is_verified=...)`."""
+
+    async def create(
+        email: str = "user@example.com",
+        *,
+        name: str = "Test User",
+        password: str = PASSWORD,
+        is_verified: bool = True,
+    ) -> User:
+        user = User(
+            email=email,
+            name=name,
+            hashed_password=hash_password(password),
+            is_verified=is_verified,
+        )
+        db_session.add(user)
+        await db_session.commit()
+        return user
+
+    return create
+
+
+@pytest.fixture
+def login(client: AsyncClient):
+    """
+    Log a user in: `access_token, refresh_token = await login(email, device=...)`.
+
+    The client's cookie jar is left empty, so logins don't leak into later requests.
+    """
+
+    async def log_in(
+        email: str = "user@example.com", *, password: str = PASSWORD, device: str = "test"
+    ) -> tuple[str, str]:
+        response = await client.post(
+            "/auth/login",
+            json={"email": email, "password": password},
+            headers={"user-agent": device},
+        )
+        assert response.status_code == 200
+        client.cookies.clear()
+        return response.json()["access_token"], response.cookies["refresh_token"]
+
+    return log_in
+
+
+async def refresh(client: AsyncClient, refresh_token: str):
+    """POST /auth/refresh with `refresh_token` as the cookie."""
+    client.cookies.set("refresh_token", refresh_token)
+    response = await client.post("/auth/refresh")
+    client.cookies.clear()
+    return response
+
+
+def bearer(access_token: str) -> dict:
+    return {"authorization": f"Bearer {access_token}"}
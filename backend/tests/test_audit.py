@@ -0,0 +1,155 @@
+"""
+Tests for the batched auth audit trail.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.helpers import audit
+from src.helpers.audit import AuditLog, audit_log
+from src.helpers.metrics import audit_events_dropped
+from src.helpers.query_stats import instrument_engine, track_queries
+from src.models.db_scheams.audit_event import AuditEvent, ensure_audit_partitions
+from tests.conftest import test_engine
+
+
+class TestAuditTrail:
+    @pytest.mark.asyncio
+    async def test_logins_are_written_in_one_batch(
+        self, client: AsyncClient, db_session: AsyncSession, create_user, login
+    ):
+        instrument_engine(test_engine)
+        user = await create_user("audited@example.com")
+        await client.post(
+            "/auth/login", json={"email": "audited@example.com", "password": "WrongPass123"}
+        )
+        await login("audited@example.com")
+
+        with track_queries() as stats:
+            assert await audit_log.flush() == 2
+
+        assert stats.count == 1
+        result = await db_session.execute(
+            select(AuditEvent.event, AuditEvent.success, AuditEvent.user_id, AuditEvent.detail)
+            .order_by(AuditEvent.occurred_at)
+        )
+        assert result.all() == [
+            (audit.LOGIN, False, user.id, "bad_password"),
+            (audit.LOGIN, True, user.id, None),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_requests_do_not_write(
+        self, client: AsyncClient, db_session: AsyncSession, create_user, login
+    ):
+        await create_user("audited@example.com")
+        await login("audited@example.com")
+
+        assert len(audit_log) == 1
+        assert await db_session.scalar(select(AuditEvent.id)) is None
+
+    def test_full_buffer_overwrites_oldest(self):
+        log = AuditLog(max_events=2, batch_size=10)
+        dropped_before = audit_events_dropped.value("overflow")
+
+        for n in range(3):
+            log.record(audit.SIGNUP, email=f"user{n}@example.com")
+
+        assert [event["email"] for event in log.buffer] == ["user1@example.com", "user2@example.com"]
+        assert audit_events_dropped.value("overflow") == dropped_before + 1
+
+    @pytest.mark.asyncio
+    async def test_failed_insert_is_retried(self, monkeypatch):
+        log = AuditLog(max_events=10, batch_size=10)
+        log.record(audit.SIGNUP, email="retry@example.com")
+
+        async def fail(batch):
+            raise ConnectionError("database down")
+
+        monkeypatch.setattr(log, "_insert", fail)
+        assert await log.flush() == 0
+        assert len(log) == 1
+
+    @pytest.mark.asyncio
+    async def test_rejected_batch_is_dropped(self, monkeypatch):
+        log = AuditLog(max_events=10, batch_size=10)
+        log.record(audit.SIGNUP, email="bad@example.com")
+        dropped_before = audit_events_dropped.value("sink_error")
+
+        async def reject(batch):
+            raise ValueError("row rejected by the database")
+
+        monkeypatch.setattr(log, "_insert", reject)
+        assert await log.flush() == 0
+        assert len(log) == 0
+        assert audit_events_dropped.value("sink_error") == dropped_before + 1
+
+    @pytest.mark.asyncio
+    async def test_long_values_are_truncated(self, db_session: AsyncSession):
+        log = AuditLog(max_events=10, batch_size=10)
+        log.record(audit.LOGIN, ip="1" * 100, email="e" * 300, detail="d" * 300)
+
+        assert await log.flush() == 1
+        ip, email = (await db_session.execute(select(AuditEvent.ip, AuditEvent.email))).one()
+        assert len(ip) == 45
+        assert len(email) == 255
+
+    @pytest.mark.asyncio
+    async def test_cancelled_flush_keeps_batch(self, monkeypatch):
+        log = AuditLog(max_events=10, batch_size=10)
+        log.record(audit.SIGNUP, email="shutdown@example.com")
+        started = asyncio.Event()
+
+        async def slow(batch):
+            started.set()
+            await asyncio.sleep(60)
+
+        monkeypatch.setattr(log, "_insert", slow)
+        task = asyncio.create_task(log.flush())
+        await started.wait()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        assert [event["email"] for event in log.buffer] == ["shutdown@example.com"]
+
+    @pytest.mark.asyncio
+    async def test_file_sink_writes_jsonl(self, tmp_path):
+        path = tmp_path / "audit.jsonl"
+        log = AuditLog(sink="file", path=str(path))
+        log.record(audit.PASSWORD_RESET, success=False, email="a@example.com", detail="invalid_code")
+        log.record(audit.PASSWORD_RESET, email="a@example.com")
+
+        assert await log.flush() == 2
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [line["success"] for line in lines] == [False, True]
+        assert lines[0]["detail"] == "invalid_code"
+
+
+class TestAuditPartitions:
+    @pytest.mark.asyncio
+    async def test_monthly_partitions(self, setup_database):
+        async with test_engine.begin() as conn:
+            await ensure_audit_partitions(conn, now=datetime(2031, 12, 15))
+            result = await conn.execute(
+                text(
+                    "SELECT c.relname FROM pg_inherits i "
+                    "JOIN pg_class c ON c.oid = i.inhrelid "
+                    "WHERE i.inhparent = 'auth_audit_events'::regclass"
+                )
+            )
+            partitions = {row.relname for row in result}
+            for name in ("auth_audit_events_2031_12", "auth_audit_events_2032_01"):
+                await conn.execute(text(f"DROP TABLE {name}"))
+
+        assert {
+            "auth_audit_events_default",
+            "auth_audit_events_2031_12",
+            "auth_audit_events_2032_01",
+        } <= partitions
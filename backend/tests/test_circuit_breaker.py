@@ -0,0 +1,164 @@
+"""
+Tests for the database circuit breaker.
+"""
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.helpers.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    db_circuit,
+)
+from src.helpers.db import get_db
+from src.helpers.security import generate_refresh_token
+from src.main import app
+from tests.conftest import TestSessionLocal, use_session_factory
+
+
+OUTAGE = OperationalError("SELECT 1", {}, ConnectionRefusedError("refused"))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _fail(breaker: CircuitBreaker, error: Exception = OUTAGE, probe: bool = False) -> None:
+    with pytest.raises(type(error)):
+        with breaker.record(probe):
+            raise error
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_outages(self):
+        breaker = CircuitBreaker(failure_threshold=3, open_seconds=10, clock=FakeClock())
+
+        _fail(breaker)
+        _fail(breaker)
+        with breaker.record(breaker.acquire()):
+            pass  # a success resets the count
+        for _ in range(3):
+            _fail(breaker, probe=breaker.acquire())
+
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError) as raised:
+            breaker.acquire()
+        assert raised.value.retry_after == 10
+
+    def test_query_errors_do_not_count(self):
+        breaker = CircuitBreaker(failure_threshold=1, open_seconds=10, clock=FakeClock())
+
+        _fail(breaker, IntegrityError("INSERT", {}, Exception("duplicate key")))
+        _fail(breaker, ValueError("bad input"))
+
+        assert breaker.state == CLOSED
+
+    def test_half_open_allows_one_probe(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, open_seconds=10, clock=clock)
+        _fail(breaker)
+
+        clock.now += 10
+        assert breaker.acquire() is True
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.acquire()
+
+    def test_probe_outcome_decides_state(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, open_seconds=10, clock=clock)
+        _fail(breaker)
+
+        clock.now += 10
+        _fail(breaker, probe=breaker.acquire())
+        assert breaker.state == OPEN
+
+        clock.now += 10
+        with breaker.record(breaker.acquire()):
+            pass
+        assert breaker.state == CLOSED
+        assert breaker.acquire() is False
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(db_circuit, "failure_threshold", 2)
+    monkeypatch.setattr(db_circuit, "clock", clock)
+    db_circuit.reset()
+    yield clock
+    db_circuit.reset()
+
+
+@pytest.fixture
+async def unguarded_client(setup_database, monkeypatch):
+    """Client that goes through the real get_db (the suite overrides it)."""
+    monkeypatch.delitem(app.dependency_overrides, get_db, raising=False)
+    transport = ASGITransport(app=app, raise_app_exceptions=False)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+def _database_down(monkeypatch):
+    engine = create_async_engine("postgresql+asyncpg://nobody:x@127.0.0.1:1/none")
+    factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr("src.helpers.db.get_session_factory", lambda: factory)
+
+
+async def _login(client: AsyncClient, n: int):
+    body = {"email": f"outage{n}@example.com", "password": "Password123"}
+    return await client.post("/auth/login", json=body)
+
+
+class TestDatabaseOutage:
+    @pytest.mark.asyncio
+    async def test_fails_fast_while_open(self, unguarded_client, breaker, monkeypatch):
+        _database_down(monkeypatch)
+
+        assert (await _login(unguarded_client, 1)).status_code == 500
+        assert (await _login(unguarded_client, 2)).status_code == 500
+        response = await _login(unguarded_client, 3)
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "10"
+        assert db_circuit.state == OPEN
+
+    @pytest.mark.asyncio
+    async def test_refresh_works_while_open(self, unguarded_client, breaker, monkeypatch):
+        _database_down(monkeypatch)
+        for n in range(2):
+            await _login(unguarded_client, n)
+
+        unguarded_client.cookies.set("refresh_token", generate_refresh_token("42"))
+        response = await unguarded_client.post("/auth/refresh")
+
+        assert db_circuit.state == OPEN
+        assert response.status_code == 200
+        assert response.json()["access_token"]
+
+    @pytest.mark.asyncio
+    async def test_probe_closes_after_recovery(self, unguarded_client, breaker, monkeypatch):
+        _database_down(monkeypatch)
+        for n in range(2):
+            await _login(unguarded_client, n)
+
+        # Still down when the probe runs: open again, answered with 503
+        breaker.now += 10
+        assert (await _login(unguarded_client, 3)).status_code == 503
+        assert db_circuit.state == OPEN
+
+        use_session_factory(monkeypatch, TestSessionLocal)
+        breaker.now += 10
+        response = await _login(unguarded_client, 4)
+
+        assert response.status_code == 401  # unknown user: the database answered
+        assert db_circuit.state == CLOSED
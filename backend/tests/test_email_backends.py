@@ -0,0 +1,114 @@
+"""
+Tests for the pluggable mail transports and the local SMTP stand-in server.
+"""
+
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from src.helpers.config import settings
+from src.helpers.email_service import send_verification_email, wait_for_pending_emails
+from src.helpers.local_smtp import LocalSMTPServer
+from src.helpers.mail_backends import (
+    CaptureBackend,
+    SMTPBackend,
+    build_mail_backend,
+    get_mail_backend,
+    set_mail_backend,
+)
+
+
+class TestCaptureBackend:
+    """Emails sent by the auth endpoints land in the in-memory outbox."""
+
+    @pytest.mark.asyncio
+    async def test_signup_captures_verification_email(self, client: AsyncClient):
+        response = await client.post(
+            "/auth/signup",
+            json={
+                "name": "Mail User",
+                "email": "mail@example.com",
+                "password": "SecurePass123",
+            },
+        )
+        assert response.status_code == 201
+
+        outbox = get_mail_backend().outbox
+        assert len(outbox) == 1
+        assert outbox[0].recipients == ("mail@example.com",)
+        assert outbox[0].subject == "Your Verification Code"
+
+    @pytest.mark.asyncio
+    async def test_forgot_password_captures_reset_email(self, client: AsyncClient):
+        await client.post(
+            "/auth/signup",
+            json={
+                "name": "Reset Mail",
+                "email": "resetmail@example.com",
+                "password": "SecurePass123",
+            },
+        )
+
+        response = await client.post(
+            "/auth/forgot-password", json={"email": "resetmail@example.com"}
+        )
+        assert response.status_code == 200
+
+        subjects = [m.subject for m in get_mail_backend().outbox]
+        assert subjects == ["Your Verification Code", "Password Reset Code"]
+
+
+class TestLocalSMTPServer:
+    """The "local" backend delivers over SMTP to the stand-in server."""
+
+    @pytest.mark.asyncio
+    async def test_local_backend_delivers_to_stand_in_server(self, monkeypatch):
+        async with LocalSMTPServer(port=0) as server:
+            monkeypatch.setattr(settings, "LOCAL_SMTP_PORT", server.port)
+            backend = build_mail_backend("local")
+            monkeypatch.setattr(
+                "src.helpers.email_service.get_mail_backend", lambda: backend
+            )
+
+            await send_verification_email(
+                email="local@example.com", code="123456", name="Local"
+            )
+
+        assert len(server.messages) == 1
+        message = server.messages[0]
+        assert message.rcpt_tos == ("local@example.com",)
+        assert message.subject == "Your Verification Code"
+
+
+class TestBuildMailBackend:
+    def test_known_backends(self):
+        assert isinstance(build_mail_backend("memory"), CaptureBackend)
+        assert isinstance(build_mail_backend("smtp"), SMTPBackend)
+
+    def test_unknown_backend_raises(self):
+        with pytest.raises(ValueError):
+            build_mail_backend("carrier-pigeon")
+
+
+class TestShutdownDrain:
+    @pytest.mark.asyncio
+    async def test_waits_for_emails_in_flight(self):
+        class SlowBackend(CaptureBackend):
+            async def send_message(self, message):
+                await asyncio.sleep(0.2)
+                await super().send_message(message)
+
+        backend = SlowBackend()
+        set_mail_backend(backend)
+        try:
+            task = asyncio.create_task(
+                send_verification_email("drain@example.com", "123456", "Drain")
+            )
+            await asyncio.sleep(0.01)
+            assert await wait_for_pending_emails(timeout=0.01) == 1
+            assert await wait_for_pending_emails(timeout=2) == 0
+            await task
+            assert len(backend.outbox) == 1
+        finally:
+            set_mail_backend(None)
@@ -0,0 +1,116 @@
+"""
+Tests for the liveness and readiness probes.
+"""
+
+import pytest
+from httpx import AsyncClient
+
+from src.helpers import email_service, health
+from src.helpers.circuit_breaker import OPEN, db_circuit
+from src.helpers.health import readiness
+from src.helpers.warmup import warmup_state
+from tests.conftest import test_engine
+
+
+@pytest.fixture(autouse=True)
+def probe_engine(monkeypatch):
+    # Check the test database, and start every test without a cached report
+    monkeypatch.setattr("src.helpers.health.get_engine", lambda: test_engine)
+    monkeypatch.setattr(readiness, "_report", None)
+
+
+@pytest.fixture
+def count_pings(monkeypatch):
+    calls = []
+    ping = health._select_one
+
+    async def counting():
+        calls.append(1)
+        await ping()
+
+    monkeypatch.setattr(health, "_select_one", counting)
+    return calls
+
+
+class TestLiveness:
+    @pytest.mark.asyncio
+    async def test_alive_without_database(self, client: AsyncClient, count_pings):
+        response = await client.get("/livez")
+
+        assert response.status_code == 200
+        assert response.json() == {"status": "alive"}
+        assert count_pings == []
+
+
+class TestReadiness:
+    @pytest.mark.asyncio
+    async def test_ready(self, client: AsyncClient):
+        response = await client.get("/readyz")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "ready"
+        assert data["checks"]["database"] == "connected"
+        assert data["checks"]["pool"]["capacity"] > 0
+        assert data["checks"]["email"]["backend"] == "memory"
+
+    @pytest.mark.asyncio
+    async def test_probes_share_the_cached_report(self, client: AsyncClient, count_pings):
+        for _ in range(5):
+            assert (await client.get("/readyz")).status_code == 200
+        await client.get("/health")
+
+        assert len(count_pings) == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_report_is_refreshed(self, client: AsyncClient, count_pings, monkeypatch):
+        await client.get("/readyz")
+        monkeypatch.setattr(readiness, "interval", 0.0)
+        await client.get("/readyz")
+
+        assert len(count_pings) == 2
+
+    @pytest.mark.asyncio
+    async def test_saturated_pool_degrades_without_query(
+        self, client: AsyncClient, count_pings, monkeypatch
+    ):
+        monkeypatch.setattr("src.helpers.health.settings.READINESS_MAX_POOL_UTILIZATION", 0.0)
+
+        response = await client.get("/readyz")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "degraded"
+        assert data["checks"]["database"] == "saturated"
+        assert {"checked_out", "capacity", "utilization"} <= data["checks"]["pool"].keys()
+        assert count_pings == []
+
+    @pytest.mark.asyncio
+    async def test_not_ready_while_circuit_open(
+        self, client: AsyncClient, count_pings, monkeypatch
+    ):
+        monkeypatch.setattr(db_circuit, "state", OPEN)
+
+        response = await client.get("/readyz")
+
+        assert response.status_code == 503
+        assert response.json()["checks"]["database"] == "circuit_open"
+        assert count_pings == []
+
+    @pytest.mark.asyncio
+    async def test_failing_email_degrades(self, client: AsyncClient, monkeypatch):
+        monkeypatch.setattr(email_service, "_consecutive_failures", 5)
+
+        response = await client.get("/readyz")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "degraded"
+
+    @pytest.mark.asyncio
+    async def test_not_ready_while_warming_up(self, client: AsyncClient, monkeypatch):
+        monkeypatch.setattr(warmup_state, "status", "warming_up")
+
+        response = await client.get("/readyz")
+
+        assert response.status_code == 503
+        assert response.json()["status"] == "warming_up"
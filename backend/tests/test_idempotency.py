@@ -0,0 +1,114 @@
+"""
+Tests for Idempotency-Key support on signup and the email-sending endpoints.
+"""
+
+import json
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.helpers.idempotency import (
+    CONFLICT,
+    PROCEED,
+    idempotency_store,
+    request_fingerprint,
+)
+from src.helpers.mail_backends import get_mail_backend
+from src.middlewares.idempotency import MAX_BODY_BYTES
+from src.models.db_scheams.idempotency_key import IdempotencyKey
+from src.models.db_scheams.user import User
+
+
+SIGNUP = {"name": "Retry User", "email": "retry@example.com", "password": "SecurePass123"}
+
+
+def _key(value: str = "key-1") -> dict:
+    return {"idempotency-key": value}
+
+
+async def _signup(client: AsyncClient, body: dict = SIGNUP, key: str = "key-1"):
+    return await client.post("/auth/signup", json=body, headers=_key(key))
+
+
+class TestIdempotentSignup:
+    @pytest.mark.asyncio
+    async def test_retry_replays_without_running_again(
+        self, client: AsyncClient, db_session: AsyncSession
+    ):
+        first = await _signup(client)
+        retry = await _signup(client)
+
+        assert first.status_code == retry.status_code == 201
+        assert retry.content == first.content
+        assert retry.headers["idempotent-replayed"] == "true"
+        users = await db_session.scalar(select(func.count()).select_from(User))
+        assert users == 1
+        assert len(get_mail_backend().outbox) == 1
+
+    @pytest.mark.asyncio
+    async def test_replayed_from_database_on_another_worker(self, client: AsyncClient):
+        first = await _signup(client)
+        idempotency_store.clear()  # a worker that has not seen the key
+
+        retry = await _signup(client)
+
+        assert retry.status_code == 201
+        assert retry.content == first.content
+
+    @pytest.mark.asyncio
+    async def test_key_reused_for_different_request(self, client: AsyncClient):
+        await _signup(client)
+
+        response = await _signup(client, {**SIGNUP, "email": "other@example.com"})
+
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_duplicate_while_running_gets_409(self, client: AsyncClient):
+        body = json.dumps(SIGNUP).encode()
+        fingerprint = request_fingerprint("POST", "/auth/signup", body)
+        assert (await idempotency_store.begin("key-1", fingerprint))[0] == PROCEED
+        idempotency_store.clear()  # the first request runs on another worker
+
+        response = await client.post(
+            "/auth/signup",
+            content=body,
+            headers={**_key(), "content-type": "application/json"},
+        )
+
+        assert response.status_code == 409
+        assert response.headers["retry-after"] == "1"
+        assert (await idempotency_store.begin("key-1", fingerprint))[0] == CONFLICT
+
+    @pytest.mark.asyncio
+    async def test_server_error_releases_key(
+        self, client: AsyncClient, db_session: AsyncSession, monkeypatch
+    ):
+        async def fail(*args, **kwargs):
+            raise RuntimeError("database fell over")
+
+        with monkeypatch.context() as patch:
+            patch.setattr("src.routes.auth_routes.signup", fail)
+            with pytest.raises(RuntimeError):
+                await _signup(client)
+
+        assert await db_session.get(IdempotencyKey, "key-1") is None
+        assert (await _signup(client)).status_code == 201
+
+    @pytest.mark.asyncio
+    async def test_without_header_is_unaffected(self, client: AsyncClient):
+        await client.post("/auth/signup", json=SIGNUP)
+        response = await client.post("/auth/signup", json=SIGNUP)
+
+        assert response.status_code == 400
+        assert "idempotent-replayed" not in response.headers
+
+    @pytest.mark.asyncio
+    async def test_oversized_body_is_refused(self, client: AsyncClient):
+        body = {**SIGNUP, "name": "x" * (MAX_BODY_BYTES + 1)}
+
+        response = await _signup(client, body)
+
+        assert response.status_code == 413
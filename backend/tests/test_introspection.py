@@ -0,0 +1,137 @@
+"""
+Tests for gateway token introspection.
+"""
+
+import pytest
+from httpx import AsyncClient, BasicAuth
+
+from src.helpers.circuit_breaker import CircuitOpenError, db_circuit
+from src.helpers.query_stats import instrument_engine, track_queries
+from src.helpers.security import generate_access_token, verified_tokens
+from src.helpers.session_registry import session_registry
+from tests.conftest import bearer, test_engine
+
+
+GATEWAY = BasicAuth("gateway", "gateway-secret")
+
+
+@pytest.fixture(autouse=True)
+def introspection_enabled(monkeypatch):
+    monkeypatch.setattr(
+        "src.helpers.security.settings.INTROSPECTION_CLIENT_SECRET", "gateway-secret"
+    )
+
+
+class TestIntrospect:
+    @pytest.mark.asyncio
+    async def test_active_token(self, client: AsyncClient, create_user, login):
+        await create_user()
+        token, _ = await login()
+
+        response = await client.post("/auth/introspect", data={"token": token}, auth=GATEWAY)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["active"] is True
+        assert body["token_type"] == "access"
+        assert {"sub", "exp", "iat", "sid"} <= body.keys()
+
+    @pytest.mark.asyncio
+    async def test_invalid_token_is_inactive(self, client: AsyncClient):
+        response = await client.post("/auth/introspect", data={"token": "garbage"}, auth=GATEWAY)
+
+        assert response.status_code == 200
+        assert response.json() == {"active": False}
+
+    @pytest.mark.asyncio
+    async def test_revoked_session_is_inactive(self, client: AsyncClient, create_user, login):
+        await create_user()
+        token, _ = await login()
+        await client.post("/auth/sessions/revoke-all", headers=bearer(token))
+
+        response = await client.post("/auth/introspect", data={"token": token}, auth=GATEWAY)
+
+        assert response.json() == {"active": False}
+
+    @pytest.mark.asyncio
+    async def test_requires_client_credentials(self, client: AsyncClient):
+        wrong = BasicAuth("gateway", "nope")
+
+        response = await client.post("/auth/introspect", data={"token": "x"}, auth=wrong)
+
+        assert response.status_code == 401
+        assert response.headers["www-authenticate"] == "Basic"
+
+    @pytest.mark.asyncio
+    async def test_disabled_without_secret(self, client: AsyncClient, monkeypatch):
+        monkeypatch.setattr("src.helpers.security.settings.INTROSPECTION_CLIENT_SECRET", "")
+
+        response = await client.post("/auth/introspect", data={"token": "x"}, auth=GATEWAY)
+
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_unknown_session_inactive_while_circuit_open(
+        self, client: AsyncClient, monkeypatch, create_user, login
+    ):
+        await create_user()
+        token, _ = await login()
+        session_registry.forget_all()
+
+        def circuit_open():
+            raise CircuitOpenError(5.0)
+
+        monkeypatch.setattr(db_circuit, "acquire", circuit_open)
+
+        response = await client.post("/auth/introspect", data={"token": token}, auth=GATEWAY)
+        assert response.json() == {"active": False}
+
+        monkeypatch.setattr("src.helpers.config.settings.INTROSPECTION_FAIL_OPEN", True)
+        response = await client.post("/auth/introspect", data={"token": token}, auth=GATEWAY)
+        assert response.json()["active"] is True
+
+
+class TestIntrospectBatch:
+    @pytest.mark.asyncio
+    async def test_results_in_order_with_one_query(self, client: AsyncClient, create_user, login):
+        instrument_engine(test_engine)
+        emails = [f"introspect{n}@example.com" for n in range(3)]
+        for email in emails:
+            await create_user(email)
+        tokens = [(await login(email))[0] for email in emails]
+        legacy = generate_access_token("42")  # no sid: nothing to look up
+        client_tokens = tokens + ["garbage", legacy, tokens[0]]
+        # Cold hot index and verification cache, as on a fresh worker
+        session_registry.forget_all()
+        verified_tokens.clear()
+        with track_queries() as stats:
+            response = await client.post(
+                "/auth/introspect/batch", json={"tokens": client_tokens}, auth=GATEWAY
+            )
+
+        assert response.status_code == 200
+        active = [result["active"] for result in response.json()["results"]]
+        assert active == [True, True, True, False, True, True]
+        assert stats.count == 1
+
+    @pytest.mark.asyncio
+    async def test_repeat_is_served_from_caches(self, client: AsyncClient, create_user, login):
+        instrument_engine(test_engine)
+        await create_user()
+        token, _ = await login()
+        await client.post("/auth/introspect/batch", json={"tokens": [token]}, auth=GATEWAY)
+
+        with track_queries() as stats:
+            response = await client.post(
+                "/auth/introspect/batch", json={"tokens": [token]}, auth=GATEWAY
+            )
+
+        assert response.json()["results"][0]["active"] is True
+        assert stats.count == 0
+        assert len(verified_tokens) == 1
+
+    @pytest.mark.asyncio
+    async def test_rejects_empty_batch(self, client: AsyncClient):
+        response = await client.post("/auth/introspect/batch", json={"tokens": []}, auth=GATEWAY)
+
+        assert response.status_code == 422
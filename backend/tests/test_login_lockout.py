@@ -0,0 +1,116 @@
+"""
+Tests for per-account failed-login tracking and lockout.
+"""
+
+import pytest
+from httpx import AsyncClient
+
+from src.helpers.login_guard import FailureTracker
+
+
+class TestLoginLockout:
+    """Repeated failures lock the account before any password check."""
+
+    @pytest.mark.asyncio
+    async def test_locked_account_rejected_without_password_check(
+        self, client: AsyncClient, monkeypatch, create_user
+    ):
+        await create_user("lockout@example.com")
+
+        for _ in range(5):
+            response = await client.post(
+                "/auth/login",
+                json={"email": "lockout@example.com", "password": "WrongPass123"},
+            )
+            assert response.status_code == 401
+
+        calls = []
+        monkeypatch.setattr(
+            "src.controllers.auth_controller.verify_password",
+            lambda plain, hashed: calls.append(plain) or True,
+        )
+
+        # Even the right password is refused while locked
+        response = await client.post(
+            "/auth/login",
+            json={"email": "lockout@example.com", "password": "SecurePass123"},
+        )
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+        assert calls == []
+
+    @pytest.mark.asyncio
+    async def test_successful_login_resets_failures(self, client: AsyncClient, create_user):
+        await create_user("lockout@example.com")
+
+        for _ in range(4):
+            await client.post(
+                "/auth/login",
+                json={"email": "lockout@example.com", "password": "WrongPass123"},
+            )
+        response = await client.post(
+            "/auth/login",
+            json={"email": "lockout@example.com", "password": "SecurePass123"},
+        )
+        assert response.status_code == 200
+
+        # The counter starts over, so one more failure does not lock
+        await client.post(
+            "/auth/login",
+            json={"email": "lockout@example.com", "password": "WrongPass123"},
+        )
+        response = await client.post(
+            "/auth/login",
+            json={"email": "lockout@example.com", "password": "SecurePass123"},
+        )
+        assert response.status_code == 200
+
+
+class TestFailureTracker:
+    def _tracker(self, **overrides) -> FailureTracker:
+        options = dict(
+            threshold=3, base_lockout=1.0, max_lockout=60.0, half_life=100.0, max_entries=1000
+        )
+        options.update(overrides)
+        return FailureTracker(**options)
+
+    def test_lockout_window_grows_exponentially(self):
+        tracker = self._tracker()
+        for _ in range(3):
+            tracker.record_failure("k", now=0.0)
+        assert tracker.locked_for("k", now=0.0) == pytest.approx(1.0)
+
+        tracker.record_failure("k", now=1.0)
+        assert tracker.locked_for("k", now=1.0) == pytest.approx(2.0)
+
+        tracker.record_failure("k", now=3.0)
+        assert tracker.locked_for("k", now=3.0) == pytest.approx(4.0)
+
+    def test_lockout_is_capped(self):
+        tracker = self._tracker(max_lockout=10.0)
+        for i in range(20):
+            tracker.record_failure("k", now=float(i))
+        assert tracker.locked_for("k", now=19.0) <= 10.0
+
+    def test_counters_decay_and_flush(self):
+        tracker = self._tracker()
+        tracker.record_failure("k", now=0.0)
+        assert tracker.flush(now=1.0) == 0
+        assert tracker.flush(now=1000.0) == 1
+        assert len(tracker) == 0
+
+    def test_memory_is_bounded(self):
+        tracker = self._tracker(max_entries=50)
+        for i in range(500):
+            tracker.record_failure(f"user-{i}@example.com", now=0.0)
+        assert len(tracker) == 50
+
+    def test_scan_does_not_evict_locked_keys(self):
+        tracker = self._tracker(max_entries=50)
+        for _ in range(3):
+            tracker.record_failure("victim@example.com", now=0.0)
+        for i in range(500):
+            tracker.record_failure(f"user-{i}@example.com", now=0.5)
+
+        assert len(tracker) == 50
+        assert tracker.locked_for("victim@example.com", now=0.5) > 0
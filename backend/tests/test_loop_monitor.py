@@ -0,0 +1,49 @@
+"""
+Tests for the event-loop lag monitor.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.helpers.loop_monitor import LoopMonitor
+from src.helpers.metrics import event_loop_blocked, event_loop_lag
+
+
+def _blocking_call():
+    time.sleep(0.3)
+
+
+class TestLoopMonitor:
+    @pytest.mark.asyncio
+    async def test_blocking_call_is_measured_and_located(self):
+        monitor = LoopMonitor(interval=0.01, threshold=0.1)
+        samples_before = event_loop_lag.count()
+        blocked_before = event_loop_blocked.value()
+
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.05)
+        _blocking_call()
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert event_loop_lag.count() > samples_before
+        assert event_loop_blocked.value() == blocked_before + 1
+        assert len(monitor.reports) == 1
+        report = monitor.reports[0]
+        assert report.blocked_seconds >= 0.1
+        assert "_blocking_call" in report.stack
+        assert "time.sleep" in report.stack
+
+    @pytest.mark.asyncio
+    async def test_idle_loop_reports_nothing(self):
+        monitor = LoopMonitor(interval=0.01, threshold=0.1)
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not monitor.reports
@@ -0,0 +1,98 @@
+"""
+Tests for the Prometheus metrics registry and the /metrics endpoint.
+"""
+
+import os
+
+import pytest
+from httpx import AsyncClient
+
+from src.helpers import metrics
+from src.helpers.metrics import MetricsRegistry, merge_snapshots, render_snapshot
+from src.serve import _reset_metrics_dir
+
+
+class TestRegistry:
+    def test_histogram_renders_cumulative_buckets(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("op_seconds", "Op time", ("op",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value, "hash")
+
+        output = registry.render()
+        assert "# TYPE op_seconds histogram" in output
+        assert 'op_seconds_bucket{op="hash",le="0.1"} 1' in output
+        assert 'op_seconds_bucket{op="hash",le="1.0"} 3' in output
+        assert 'op_seconds_bucket{op="hash",le="+Inf"} 4' in output
+        assert 'op_seconds_count{op="hash"} 4' in output
+        assert 'op_seconds_sum{op="hash"} 6.05' in output
+
+    def test_label_count_is_checked(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("calls_total", "Calls", ("kind",))
+        with pytest.raises(ValueError):
+            counter.inc("a", "b")
+
+    def test_merge_sums_workers_and_drops_dead_gauges(self):
+        snapshots = []
+        for value in (2, 3):
+            registry = MetricsRegistry()
+            registry.counter("calls_total", "Calls").inc(amount=value)
+            registry.gauge("busy", "Busy").set(value)
+            registry.histogram("t_seconds", "T", buckets=(1.0,)).observe(0.5)
+            snapshots.append(registry.snapshot())
+
+        output = render_snapshot(merge_snapshots(snapshots, [True, False]))
+        assert "calls_total 5.0" in output
+        assert "busy 2.0" in output
+        assert 't_seconds_bucket{le="1.0"} 2' in output
+
+    def test_reset_only_removes_snapshots(self, tmp_path):
+        for name in ("123.json", ".123.json.tmp", "config.json", "notes.txt"):
+            (tmp_path / name).write_text("{}")
+
+        _reset_metrics_dir(str(tmp_path))
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["config.json", "notes.txt"]
+
+
+class TestMetricsEndpoint:
+    @pytest.mark.asyncio
+    async def test_request_and_hashing_metrics_exposed(self, client: AsyncClient):
+        await client.post(
+            "/auth/signup",
+            json={"name": "Metrics User", "email": "metrics@example.com", "password": "SecurePass123"},
+        )
+
+        response = await client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert 'route="/auth/signup",status="201"' in body
+        assert 'bcrypt_duration_seconds_count{operation="hash_password"}' in body
+        assert 'jwt_operations_total' in body
+        assert 'email_send_duration_seconds_count{kind="verification"}' in body
+        assert "db_pool_checked_out" in body
+
+    @pytest.mark.asyncio
+    async def test_unknown_paths_share_one_label(self, client: AsyncClient):
+        await client.get("/no-such-page-123")
+        body = (await client.get("/metrics")).text
+        assert "no-such-page-123" not in body
+        assert 'route="unmatched",status="404"' in body
+
+    @pytest.mark.asyncio
+    async def test_multiprocess_directory_is_merged(
+        self, client: AsyncClient, tmp_path, monkeypatch
+    ):
+        # A snapshot left by another worker that has since exited
+        other = MetricsRegistry()
+        other.counter("email_send_failures_total", "Emails", ("kind",)).inc("verification", amount=7)
+        monkeypatch.setattr(os, "getpid", lambda: 999_999_999)
+        metrics.write_snapshot(str(tmp_path), other)
+        monkeypatch.undo()
+
+        monkeypatch.setattr(metrics.settings, "METRICS_MULTIPROC_DIR", str(tmp_path))
+        body = (await client.get("/metrics")).text
+        assert 'email_send_failures_total{kind="verification"} 7.0' in body
+        assert (tmp_path / f"{os.getpid()}.json").exists()
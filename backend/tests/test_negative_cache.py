@@ -0,0 +1,134 @@
+"""
+Tests for the negative lookup cache and the Bloom filter of registered emails.
+"""
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.helpers.negative_cache import BloomFilter, MissingEmailCache, missing_emails
+from src.helpers.security import hash_password
+from src.helpers.user_cache import get_user_by_email
+from src.models.db_scheams.user import User
+from tests.conftest import test_engine, TestSessionLocal
+
+
+@pytest.fixture
+def query_log():
+    """Collect every SQL statement run against the test database."""
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", before_execute)
+    yield statements
+    event.remove(test_engine.sync_engine, "before_cursor_execute", before_execute)
+
+
+class TestNegativeCache:
+    """Unknown emails are answered from memory after the first miss."""
+
+    @pytest.mark.asyncio
+    async def test_repeat_unknown_email_skips_database(
+        self, client: AsyncClient, query_log: list
+    ):
+        response = await client.post(
+            "/auth/forgot-password", json={"email": "ghost@example.com"}
+        )
+        assert response.status_code == 404
+        queries_after_first = len(query_log)
+        assert queries_after_first > 0
+
+        for path in ("/auth/forgot-password", "/auth/resend-code"):
+            response = await client.post(path, json={"email": "ghost@example.com"})
+            assert response.status_code == 404
+            assert "not found" in response.json()["detail"].lower()
+
+        response = await client.post(
+            "/auth/verify-code", json={"email": "ghost@example.com", "code": "123456"}
+        )
+        assert response.status_code == 404
+        assert len(query_log) == queries_after_first
+
+    @pytest.mark.asyncio
+    async def test_signup_invalidates_negative_entry(self, client: AsyncClient):
+        response = await client.post(
+            "/auth/resend-code", json={"email": "latecomer@example.com"}
+        )
+        assert response.status_code == 404
+
+        await client.post(
+            "/auth/signup",
+            json={
+                "name": "Late Comer",
+                "email": "latecomer@example.com",
+                "password": "SecurePass123",
+            },
+        )
+
+        response = await client.post(
+            "/auth/resend-code", json={"email": "latecomer@example.com"}
+        )
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_signup_during_lookup_is_not_marked_missing(self, client: AsyncClient):
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            # The signup commits (and invalidates) while the SELECT runs
+            missing_emails.remember_existing("racer@example.com")
+
+        async with TestSessionLocal() as db:
+            event.listen(test_engine.sync_engine, "before_cursor_execute", before_execute)
+            try:
+                assert await get_user_by_email(db, "racer@example.com") is None
+            finally:
+                event.remove(test_engine.sync_engine, "before_cursor_execute", before_execute)
+
+        assert not missing_emails.is_known_missing("racer@example.com")
+
+
+class TestBloomFilter:
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        emails = [f"user{i}@example.com" for i in range(1000)]
+        for email in emails:
+            bloom.add(email)
+        assert all(email in bloom for email in emails)
+
+    def test_false_positive_rate_near_target(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"user{i}@example.com")
+        false_positives = sum(f"other{i}@example.com" in bloom for i in range(10_000))
+        assert false_positives < 300
+
+    @pytest.mark.asyncio
+    async def test_bloom_built_from_database(
+        self, client: AsyncClient, db_session: AsyncSession, monkeypatch
+    ):
+        db_session.add(
+            User(
+                email="bloom@example.com",
+                name="Bloom User",
+                hashed_password=hash_password("SecurePass123"),
+            )
+        )
+        await db_session.commit()
+
+        cache = MissingEmailCache()
+        await cache.rebuild_bloom(TestSessionLocal, batch_size=1)
+        assert not cache.is_known_missing("bloom@example.com")
+        assert cache.is_known_missing("nobody@example.com")
+
+        # A filled filter answers lookups for unknown emails without the database
+        monkeypatch.setattr(missing_emails, "bloom", cache.bloom)
+        response = await client.post(
+            "/auth/forgot-password", json={"email": "nobody@example.com"}
+        )
+        assert response.status_code == 404
+        response = await client.post(
+            "/auth/forgot-password", json={"email": "bloom@example.com"}
+        )
+        assert response.status_code == 200
@@ -0,0 +1,67 @@
+"""
+Tests for the per-request profiling middleware.
+"""
+
+from collections import Counter
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.helpers.profiler import ProfileRing
+from src.helpers.security import hash_password
+from src.main import app
+from src.middlewares.profiling import ProfilingMiddleware
+from src.models.db_scheams.user import User
+
+
+class TestProfileRing:
+    def test_keeps_newest_files(self, tmp_path):
+        ring = ProfileRing(str(tmp_path), max_files=3)
+        for i in range(5):
+            ring.write(f"profile-{i}", Counter({"main;work": i + 1}))
+        names = sorted(p.name for p in tmp_path.iterdir())
+        assert names == ["profile-2.collapsed", "profile-3.collapsed", "profile-4.collapsed"]
+        assert (tmp_path / "profile-4.collapsed").read_text() == "main;work 5\n"
+
+
+class TestProfilingMiddleware:
+    @pytest.mark.asyncio
+    async def test_authorized_header_profiles_request(
+        self, client: AsyncClient, db_session: AsyncSession, tmp_path
+    ):
+        db_session.add(
+            User(
+                email="profiled@example.com",
+                name="Profiled User",
+                hashed_password=hash_password("SecurePass123"),
+                is_verified=True,
+            )
+        )
+        await db_session.commit()
+
+        middleware = ProfilingMiddleware(
+            app, token="s3cret", sample_rate=0.0, ring=ProfileRing(str(tmp_path), 10)
+        )
+        # The client fixture has already pointed the app at the test database
+        transport = ASGITransport(app=middleware)
+        async with AsyncClient(transport=transport, base_url="http://test") as profiled:
+            body = {"email": "profiled@example.com", "password": "SecurePass123"}
+            unprofiled = await profiled.post(
+                "/auth/login", json=body, headers={"X-Profile-Token": "wrong"}
+            )
+            response = await profiled.post(
+                "/auth/login", json=body, headers={"X-Profile-Token": "s3cret"}
+            )
+
+        assert "x-profile-id" not in unprofiled.headers
+        assert response.status_code == 200
+        profile_id = response.headers["x-profile-id"]
+        (profile,) = tmp_path.iterdir()
+        assert profile.name.startswith(profile_id)
+        assert "POST_auth_login_200" in profile.name
+
+        stacks = profile.read_text()
+        # bcrypt runs in a thread pool, so the login task is seen awaiting it
+        assert "run_hashing" in stacks and "(await)" in stacks
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks.splitlines())
@@ -0,0 +1,64 @@
+"""
+Tests for query timing, the slow-query log and per-request query budgets.
+"""
+
+import logging
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+
+from src.helpers.query_stats import instrument_engine, normalize_sql, track_queries
+from tests.conftest import test_engine, TestSessionLocal
+
+
+@pytest.fixture(autouse=True)
+def instrumented():
+    # The app's engine is instrumented in main.py; tests run on their own engine
+    instrument_engine(test_engine)
+
+
+class TestNormalizeSql:
+    def test_literals_and_parameters_collapse(self):
+        sql = """SELECT users.id FROM users
+                 WHERE users.email = $1::VARCHAR AND users.name = 'bob' LIMIT 10"""
+        assert normalize_sql(sql) == (
+            "SELECT users.id FROM users WHERE users.email = ?::VARCHAR "
+            "AND users.name = ? LIMIT ?"
+        )
+
+    def test_in_lists_collapse(self):
+        assert normalize_sql("DELETE FROM t WHERE id IN ($1, $2, $3)") == (
+            "DELETE FROM t WHERE id IN (?...)"
+        )
+
+
+class TestQueryCounting:
+    @pytest.mark.asyncio
+    async def test_signup_round_trips(self, client: AsyncClient):
+        with track_queries() as stats:
+            response = await client.post(
+                "/auth/signup",
+                json={"name": "Count User", "email": "count@example.com", "password": "SecurePass123"},
+            )
+        assert response.status_code == 201
+        # lookup, insert, notify, reload of server defaults
+        assert stats.count <= 4
+        assert stats.total_seconds > 0
+
+    @pytest.mark.asyncio
+    async def test_slow_queries_logged_normalized(self, monkeypatch, caplog):
+        monkeypatch.setattr("src.helpers.query_stats.settings.SLOW_QUERY_THRESHOLD_MS", 0)
+        with caplog.at_level(logging.WARNING, logger="src.helpers.query_stats"):
+            async with TestSessionLocal() as session:
+                await session.execute(text("SELECT 42 AS answer"))
+        assert any("Slow query" in r.message and "SELECT ? AS answer" in r.message for r in caplog.records)
+
+    @pytest.mark.asyncio
+    async def test_request_over_budget_warns(self, client: AsyncClient, monkeypatch, caplog):
+        monkeypatch.setattr("src.middlewares.query_budget.settings.QUERY_BUDGET_PER_REQUEST", 0)
+        with caplog.at_level(logging.WARNING, logger="src.middlewares.query_budget"):
+            await client.post("/auth/resend-code", json={"email": "budget@example.com"})
+        assert any(
+            "POST /auth/resend-code ran 1 queries (budget 0" in r.message for r in caplog.records
+        )
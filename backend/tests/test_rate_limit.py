@@ -0,0 +1,146 @@
+"""
+Tests for the token-bucket rate limiter and its ASGI middleware.
+"""
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.main import app
+from src.helpers.login_guard import login_guard
+from src.helpers.rate_limiter import MemoryBucketStore, RateLimiter
+from src.helpers.request_utils import buffer_body
+from src.middlewares.rate_limit import MAX_BODY_BYTES, RateLimitMiddleware
+from src.helpers.security import hash_password
+from src.models.db_scheams.user import User
+
+
+class TestRateLimitMiddleware:
+    """Requests over a route's limit are rejected with 429."""
+
+    @pytest.mark.asyncio
+    async def test_ip_limit_returns_429_with_retry_after(self, client: AsyncClient):
+        for _ in range(60):
+            response = await client.post("/auth/refresh")
+            assert response.status_code == 401
+
+        response = await client.post("/auth/refresh")
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+
+    @pytest.mark.asyncio
+    async def test_ip_limit_is_per_client(self, client: AsyncClient):
+        for _ in range(61):
+            await client.post("/auth/refresh")
+
+        transport = ASGITransport(app=app, client=("10.0.0.2", 1234))
+        async with AsyncClient(transport=transport, base_url="http://test") as other:
+            response = await other.post("/auth/refresh")
+        assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_email_limit_rejects_before_password_check(
+        self, client: AsyncClient, db_session: AsyncSession, monkeypatch
+    ):
+        db_session.add(
+            User(
+                email="target@example.com",
+                name="Target",
+                hashed_password=hash_password("SecurePass123"),
+                is_verified=True,
+            )
+        )
+        await db_session.commit()
+
+        # Keep the failed-login lockout out of the way of the rate limiter
+        monkeypatch.setattr(login_guard.accounts, "threshold", 100)
+
+        calls = []
+        monkeypatch.setattr(
+            "src.controllers.auth_controller.verify_password",
+            lambda plain, hashed: calls.append(plain) or False,
+        )
+
+        statuses = []
+        for i in range(11):
+            # Vary the client so only the per-email bucket can trip
+            transport = ASGITransport(app=app, client=(f"10.0.1.{i}", 1234))
+            async with AsyncClient(transport=transport, base_url="http://test") as c:
+                response = await c.post(
+                    "/auth/login",
+                    json={"email": "target@example.com", "password": "WrongPass123"},
+                )
+            statuses.append(response.status_code)
+
+        assert statuses[:10] == [401] * 10
+        assert statuses[10] == 429
+        assert len(calls) == 10
+
+
+def _receive_chunks(chunks: list[bytes], reads: list):
+    async def receive():
+        reads.append(1)
+        body = chunks[len(reads) - 1]
+        return {"type": "http.request", "body": body, "more_body": len(reads) < len(chunks)}
+
+    return receive
+
+
+async def _reply(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+class TestBodyReading:
+    """The body is read only when needed, and never past the size cap."""
+
+    @pytest.mark.asyncio
+    async def test_ip_limited_request_body_is_not_read(self):
+        middleware = RateLimitMiddleware(_reply, RateLimiter())
+        scope = {"type": "http", "method": "POST", "path": "/auth/login", "client": ("10.0.2.1", 1)}
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        for _ in range(20):
+            await middleware(scope, _receive_chunks([b"{}"], []), send)
+
+        reads = []
+        sent.clear()
+        await middleware(scope, _receive_chunks([b"{}"], reads), send)
+
+        assert sent[0]["status"] == 429
+        assert reads == []
+
+    @pytest.mark.asyncio
+    async def test_buffer_stops_at_cap_and_replays_everything(self):
+        chunks = [b"x" * MAX_BODY_BYTES, b"y" * 10, b"z" * MAX_BODY_BYTES]
+        reads = []
+
+        body, receive = await buffer_body(_receive_chunks(chunks, reads), MAX_BODY_BYTES)
+
+        assert body is None
+        assert len(reads) == 2
+        replayed = b""
+        while True:
+            message = await receive()
+            replayed += message["body"]
+            if not message["more_body"]:
+                break
+        assert replayed == b"".join(chunks)
+
+
+class TestMemoryBucketStore:
+    def test_bucket_refills_over_time(self):
+        store = MemoryBucketStore(shards=1)
+        assert store.consume("k", capacity=2, refill_rate=1.0, now=0.0) == 0.0
+        assert store.consume("k", capacity=2, refill_rate=1.0, now=0.0) == 0.0
+        assert store.consume("k", capacity=2, refill_rate=1.0, now=0.0) == pytest.approx(1.0)
+        assert store.consume("k", capacity=2, refill_rate=1.0, now=1.0) == 0.0
+
+    def test_memory_is_bounded(self):
+        store = MemoryBucketStore(max_keys=100, shards=4)
+        for i in range(1000):
+            store.consume(f"key-{i}", capacity=5, refill_rate=1.0, now=0.0)
+        assert len(store) <= 100
@@ -0,0 +1,57 @@
+"""
+Tests for the refresh grace window: concurrent refreshes of one cookie share a token pair.
+"""
+
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from src.helpers.metrics import jwt_operations
+from src.helpers.refresh_grace import refresh_grace
+from tests.conftest import bearer, refresh
+
+
+class TestRefreshGrace:
+    @pytest.mark.asyncio
+    async def test_tabs_refreshing_together_share_one_pair(
+        self, client: AsyncClient, create_user, login
+    ):
+        await create_user()
+        _, refresh_token = await login(device="laptop")
+        encoded_before = jwt_operations.value("encode", "refresh", "ok")
+
+        # Every tab sends the old cookie, whatever the others received
+        cookie = {"cookie": f"refresh_token={refresh_token}"}
+        responses = await asyncio.gather(
+            *(client.post("/auth/refresh", headers=cookie) for _ in range(3))
+        )
+
+        assert all(response.status_code == 200 for response in responses)
+        assert len({response.json()["access_token"] for response in responses}) == 1
+        assert len({response.cookies["refresh_token"] for response in responses}) == 1
+        assert jwt_operations.value("encode", "refresh", "ok") == encoded_before + 1
+
+    @pytest.mark.asyncio
+    async def test_new_pair_after_window(
+        self, client: AsyncClient, monkeypatch, create_user, login
+    ):
+        await create_user()
+        _, refresh_token = await login(device="laptop")
+        first = await refresh(client, refresh_token)
+
+        monkeypatch.setattr(refresh_grace, "window", 0)
+        refresh_grace.clear()
+        second = await refresh(client, refresh_token)
+
+        assert first.cookies["refresh_token"] != second.cookies["refresh_token"]
+
+    @pytest.mark.asyncio
+    async def test_revocation_beats_grace(self, client: AsyncClient, create_user, login):
+        await create_user()
+        access_token, refresh_token = await login(device="laptop")
+        assert (await refresh(client, refresh_token)).status_code == 200
+
+        await client.post("/auth/sessions/revoke-all", headers=bearer(access_token))
+
+        assert (await refresh(client, refresh_token)).status_code == 401
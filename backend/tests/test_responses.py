@@ -0,0 +1,92 @@
+"""
+Tests for the fast JSON response path.
+"""
+
+from datetime import datetime
+
+import pytest
+from fastapi import APIRouter, FastAPI, Response
+from fastapi.routing import APIRoute
+from httpx import AsyncClient, ASGITransport
+
+from src.helpers.responses import FastJSONRoute
+from src.models.schemas.user_schema import UserResponse
+
+
+USER = UserResponse(
+    id="6f1c2a54-8f7e-4d8b-9a34-0c1f7e2b9d11",
+    name="Zoë",
+    email="zoe@example.com",
+    is_verified=True,
+    created_at=datetime(2025, 1, 1, 12, 30, 45, 123456),
+)
+
+
+def _app(route_class) -> FastAPI:
+    router = APIRouter(route_class=route_class)
+
+    @router.post("/user", response_model=UserResponse, status_code=201)
+    async def user(response: Response) -> UserResponse:
+        response.set_cookie("session", "abc", httponly=True)
+        return USER
+
+    @router.get("/accepted")
+    async def accepted(response: Response) -> dict:
+        response.status_code = 202
+        return {"message": "queued", "id": USER.id}
+
+    @router.get("/excluded", response_model=UserResponse, response_model_exclude={"email"})
+    async def excluded() -> UserResponse:
+        return USER
+
+    @router.get("/converted", response_model=UserResponse)
+    async def converted() -> dict:
+        # Not the response model itself: FastAPI has to validate it
+        return USER.model_dump()
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+async def _call(app: FastAPI, method: str, path: str):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        return await client.request(method, path)
+
+
+class TestFastJSONRoute:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "method, path",
+        [("POST", "/user"), ("GET", "/accepted"), ("GET", "/excluded"), ("GET", "/converted")],
+    )
+    async def test_matches_fastapi_output(self, method, path):
+        fast = await _call(_app(FastJSONRoute), method, path)
+        default = await _call(_app(APIRoute), method, path)
+
+        assert fast.status_code == default.status_code
+        assert fast.content == default.content
+        assert fast.headers["content-type"] == default.headers["content-type"]
+        assert fast.headers.get("set-cookie") == default.headers.get("set-cookie")
+
+    @pytest.mark.asyncio
+    async def test_model_skips_response_validation(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(
+            "fastapi.routing.serialize_response",
+            lambda **kwargs: calls.append(kwargs),
+        )
+
+        response = await _call(_app(FastJSONRoute), "POST", "/user")
+
+        assert response.status_code == 201
+        assert calls == []
+
+    @pytest.mark.asyncio
+    async def test_disabled(self, monkeypatch):
+        monkeypatch.setattr("src.helpers.responses.settings.FAST_JSON_RESPONSES", False)
+        app = _app(FastJSONRoute)
+
+        route = next(r for r in app.routes if getattr(r, "path", None) == "/user")
+        assert not hasattr(route.endpoint, "_fast_json_endpoint")
+        assert (await _call(app, "POST", "/user")).status_code == 201
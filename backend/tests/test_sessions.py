@@ -0,0 +1,212 @@
+"""
+Tests for the session registry: listing devices, logging out and logging out everywhere.
+"""
+
+import uuid
+from datetime import datetime
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.helpers.circuit_breaker import CircuitOpenError, db_circuit
+from src.helpers.query_stats import instrument_engine, track_queries
+from src.helpers.security import verify_refresh_token
+from src.helpers.session_registry import session_registry
+from src.models.db_scheams.user_session import UserSession
+from tests.conftest import PASSWORD, bearer, refresh, test_engine
+
+
+class TestSessionList:
+    @pytest.mark.asyncio
+    async def test_lists_devices_with_current(self, client: AsyncClient, create_user, login):
+        await create_user()
+        laptop, _ = await login(device="laptop")
+        await login(device="phone")
+
+        response = await client.get("/auth/sessions", headers=bearer(laptop))
+
+        assert response.status_code == 200
+        sessions = response.json()["sessions"]
+        assert sorted(s["device"] for s in sessions) == ["laptop", "phone"]
+        assert [s["device"] for s in sessions if s["current"]] == ["laptop"]
+
+    @pytest.mark.asyncio
+    async def test_requires_bearer_token(self, client: AsyncClient):
+        response = await client.get("/auth/sessions")
+
+        assert response.status_code == 401
+        assert response.headers["www-authenticate"] == "Bearer"
+
+    @pytest.mark.asyncio
+    async def test_refresh_keeps_session(self, client: AsyncClient, create_user, login):
+        await create_user()
+        _, refresh_token = await login(device="laptop")
+
+        response = await refresh(client, refresh_token)
+
+        assert response.status_code == 200
+        new_refresh = response.cookies["refresh_token"]
+        assert verify_refresh_token(new_refresh)["sid"] == verify_refresh_token(refresh_token)["sid"]
+
+
+class TestLastUsedBatching:
+    @pytest.mark.asyncio
+    async def test_refreshes_are_flushed_in_one_statement(
+        self, client: AsyncClient, db_session: AsyncSession, create_user, login
+    ):
+        instrument_engine(test_engine)
+        await create_user()
+        tokens = [await login(device=f"device-{n}") for n in range(3)]
+
+        with track_queries() as refresh_stats:
+            for _ in range(2):
+                for _, refresh_token in tokens:
+                    assert (await refresh(client, refresh_token)).status_code == 200
+        with track_queries() as flush_stats:
+            assert await session_registry.flush() == 3
+
+        assert refresh_stats.count == 0
+        assert flush_stats.count == 1
+        result = await db_session.execute(select(UserSession.last_used_at, UserSession.created_at))
+        assert all(last_used > created for last_used, created in result.all())
+
+    @pytest.mark.asyncio
+    async def test_deleted_session_does_not_block_flush(
+        self, client: AsyncClient, db_session: AsyncSession, create_user, login
+    ):
+        await create_user()
+        tokens = [await login(device=f"device-{n}") for n in range(2)]
+        for _, refresh_token in tokens:
+            assert (await refresh(client, refresh_token)).status_code == 200
+        gone = verify_refresh_token(tokens[0][1])["sid"]
+        await db_session.execute(delete(UserSession).where(UserSession.id == gone))
+        await db_session.commit()
+
+        await session_registry.flush()
+
+        assert len(session_registry._pending) == 0
+        result = await db_session.execute(select(UserSession.last_used_at, UserSession.created_at))
+        assert all(last_used > created for last_used, created in result.all())
+
+    @pytest.mark.asyncio
+    async def test_failing_row_is_dropped(self, monkeypatch):
+        bad, good = uuid.uuid4(), uuid.uuid4()
+        session_registry.touch(bad, "10.0.0.1")
+        session_registry.touch(good, "10.0.0.2")
+        written = []
+
+        async def write(rows):
+            if any(row["sid"] == bad for row in rows):
+                raise ValueError("row rejected by the database")
+            written.extend(row["sid"] for row in rows)
+
+        monkeypatch.setattr(session_registry, "_write", write)
+
+        assert await session_registry.flush() == 1
+        assert written == [good]
+        assert len(session_registry._pending) == 0
+
+    @pytest.mark.asyncio
+    async def test_forwarded_ip_is_validated(
+        self, client: AsyncClient, db_session: AsyncSession, monkeypatch, create_user
+    ):
+        monkeypatch.setattr("src.helpers.request_utils.settings.RATE_LIMIT_TRUST_FORWARDED", True)
+        await create_user()
+
+        response = await client.post(
+            "/auth/login",
+            json={"email": "user@example.com", "password": PASSWORD},
+            headers={"x-forwarded-for": "1" * 100},
+        )
+
+        assert response.status_code == 200
+        assert await db_session.scalar(select(UserSession.ip)) == ""
+
+
+class TestRevokeAll:
+    @pytest.mark.asyncio
+    async def test_revokes_every_session(self, client: AsyncClient, create_user, login):
+        await create_user()
+        laptop, laptop_refresh = await login(device="laptop")
+        _, phone_refresh = await login(device="phone")
+
+        response = await client.post("/auth/sessions/revoke-all", headers=bearer(laptop))
+
+        assert response.status_code == 200
+        assert response.json()["revoked"] == 2
+        for refresh_token in (laptop_refresh, phone_refresh):
+            assert (await refresh(client, refresh_token)).status_code == 401
+        assert (await client.get("/auth/sessions", headers=bearer(laptop))).status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_revocation_from_another_worker(
+        self, client: AsyncClient, db_session: AsyncSession, create_user, login
+    ):
+        user = await create_user()
+        _, refresh_token = await login(device="laptop")
+
+        # Another worker revokes in the database...
+        await db_session.execute(
+            update(UserSession)
+            .where(UserSession.user_id == user.id)
+            .values(revoked_at=datetime.utcnow())
+        )
+        await db_session.commit()
+        # ...this worker's hot index still says live until the notification arrives
+        assert (await refresh(client, refresh_token)).status_code == 200
+        session_registry.handle_invalidation({"kind": "sessions", "user_id": str(user.id)})
+
+        assert (await refresh(client, refresh_token)).status_code == 401
+
+
+class TestLogout:
+    @pytest.mark.asyncio
+    async def test_revokes_only_the_current_session(
+        self, client: AsyncClient, db_session: AsyncSession, create_user, login
+    ):
+        await create_user()
+        laptop, laptop_refresh = await login(device="laptop")
+        _, phone_refresh = await login(device="phone")
+
+        client.cookies.set("refresh_token", laptop_refresh)
+        response = await client.post("/auth/logout")
+        client.cookies.clear()
+
+        assert response.status_code == 200
+        # A copy of the cookie no longer refreshes; the other device is unaffected
+        assert (await refresh(client, laptop_refresh)).status_code == 401
+        assert (await client.get("/auth/sessions", headers=bearer(laptop))).status_code == 401
+        assert (await refresh(client, phone_refresh)).status_code == 200
+        sid = verify_refresh_token(laptop_refresh)["sid"]
+        revoked = await db_session.scalar(
+            select(UserSession.revoked_at).where(UserSession.id == sid)
+        )
+        assert revoked is not None
+
+    @pytest.mark.asyncio
+    async def test_without_cookie(self, client: AsyncClient):
+        response = await client.post("/auth/logout")
+
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_clears_cookie_while_circuit_open(
+        self, client: AsyncClient, monkeypatch, create_user, login
+    ):
+        await create_user()
+        _, refresh_token = await login(device="laptop")
+
+        def circuit_open():
+            raise CircuitOpenError(5.0)
+
+        monkeypatch.setattr(db_circuit, "acquire", circuit_open)
+        client.cookies.set("refresh_token", refresh_token)
+        response = await client.post("/auth/logout")
+        client.cookies.clear()
+
+        assert response.status_code == 200
+        assert 'refresh_token=""' in response.headers["set-cookie"]
+        # This worker refuses the cookie even though the write was skipped
+        assert (await refresh(client, refresh_token)).status_code == 401
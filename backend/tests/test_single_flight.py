@@ -0,0 +1,99 @@
+"""
+Tests for request coalescing of identical concurrent lookups.
+"""
+
+import asyncio
+
+import pytest
+
+from src.helpers.metrics import db_lookups_coalesced
+from src.helpers.query_stats import instrument_engine, track_queries
+from src.helpers.security import hash_password
+from src.helpers.single_flight import SingleFlight
+from src.helpers.user_cache import get_user_by_email
+from src.models.db_scheams.user import User
+from tests.conftest import test_engine, TestSessionLocal
+
+
+async def _ok():
+    return "ok"
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_run(self):
+        flight = SingleFlight("test")
+        release = asyncio.Event()
+        runs = []
+
+        async def load():
+            runs.append(1)
+            await release.wait()
+            return "result"
+
+        callers = [asyncio.create_task(flight.do("key", load)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(*callers) == ["result"] * 5
+        assert len(runs) == 1
+        assert len(flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_failure_is_shared_then_forgotten(self):
+        flight = SingleFlight("test")
+        release = asyncio.Event()
+
+        async def fail():
+            await release.wait()
+            raise ValueError("boom")
+
+        callers = [asyncio.create_task(flight.do("key", fail)) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert await flight.do("key", _ok) == "ok"
+
+    @pytest.mark.asyncio
+    async def test_waiter_retries_when_leader_is_cancelled(self):
+        flight = SingleFlight("test")
+
+        async def hang():
+            await asyncio.Event().wait()
+
+        leader = asyncio.create_task(flight.do("key", hang))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.do("key", _ok))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await waiter == "ok"
+
+
+class TestCoalescedUserLookups:
+    @pytest.mark.asyncio
+    async def test_identical_lookups_run_one_query(self, client, db_session):
+        instrument_engine(test_engine)
+        db_session.add(
+            User(
+                email="burst@example.com",
+                name="Burst",
+                hashed_password=hash_password("SecurePass123"),
+            )
+        )
+        await db_session.commit()
+        coalesced_before = db_lookups_coalesced.value("user_by_email")
+
+        sessions = [TestSessionLocal() for _ in range(5)]
+        with track_queries() as stats:
+            users = await asyncio.gather(
+                *(get_user_by_email(session, "burst@example.com") for session in sessions)
+            )
+        for session in sessions:
+            await session.close()
+
+        assert {user.email for user in users} == {"burst@example.com"}
+        assert stats.count == 1
+        assert db_lookups_coalesced.value("user_by_email") == coalesced_before + 4
@@ -0,0 +1,89 @@
+"""
+Tests for stateless (HMAC-derived) verification and reset codes.
+"""
+
+import re
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+
+from src.helpers.config import settings
+from src.helpers.mail_backends import get_mail_backend
+from src.helpers.security import generate_stateless_code, verify_stateless_code
+from tests.conftest import test_engine
+
+
+@pytest.fixture(autouse=True)
+def stateless_codes(monkeypatch):
+    monkeypatch.setattr("src.helpers.config.settings.STATELESS_CODES_ENABLED", True)
+
+
+@pytest.fixture
+def updates():
+    """Collect UPDATE statements."""
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE"):
+            statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", before_execute)
+    yield statements
+    event.remove(test_engine.sync_engine, "before_cursor_execute", before_execute)
+
+
+def _last_code() -> str:
+    return re.search(r"\b\d{6}\b", get_mail_backend().outbox[-1].body).group()
+
+
+class TestStatelessCode:
+    def test_valid_for_current_and_previous_window(self):
+        code = generate_stateless_code("user-1", "verify", "stamp", now=6000)
+
+        assert verify_stateless_code(code, "user-1", "verify", "stamp", now=6000)
+        assert verify_stateless_code(code, "user-1", "verify", "stamp", now=6600)
+        assert not verify_stateless_code(code, "user-1", "verify", "stamp", now=7200)
+
+    def test_bound_to_user_purpose_and_stamp(self):
+        code = generate_stateless_code("user-1", "verify", "stamp", now=6000)
+
+        assert not verify_stateless_code(code, "user-2", "verify", "stamp", now=6000)
+        assert not verify_stateless_code(code, "user-1", "reset", "stamp", now=6000)
+        assert not verify_stateless_code(code, "user-1", "verify", "new-stamp", now=6000)
+
+    def test_key_is_not_the_jwt_key(self, monkeypatch):
+        code = generate_stateless_code("user-1", "verify", "stamp", now=6000)
+
+        monkeypatch.setattr("src.helpers.config.settings.CODE_SECRET_KEY", settings.SECRET_KEY)
+        assert generate_stateless_code("user-1", "verify", "stamp", now=6000) != code
+
+
+class TestStatelessEndpoints:
+    @pytest.mark.asyncio
+    async def test_resend_writes_nothing(self, client: AsyncClient, updates: list, create_user):
+        await create_user("stateless@example.com", is_verified=False)
+
+        response = await client.post("/auth/resend-code", json={"email": "stateless@example.com"})
+
+        assert response.status_code == 200
+        assert updates == []
+
+        response = await client.post(
+            "/auth/verify-code", json={"email": "stateless@example.com", "code": _last_code()}
+        )
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_reset_code_works_once(self, client: AsyncClient, create_user):
+        await create_user("stateless@example.com", is_verified=True)
+        await client.post("/auth/forgot-password", json={"email": "stateless@example.com"})
+        body = {
+            "email": "stateless@example.com",
+            "code": _last_code(),
+            "new_password": "NewPassword123",
+        }
+
+        assert (await client.post("/auth/reset-password", json=body)).status_code == 200
+        # The new password hash changed the stamp
+        assert (await client.post("/auth/reset-password", json=body)).status_code == 400
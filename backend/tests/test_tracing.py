@@ -0,0 +1,75 @@
+"""
+Tests for request tracing: spans, the Server-Timing header and OTLP export.
+"""
+
+import json
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.helpers.security import hash_password
+from src.helpers.tracing import SpanExporter, current_trace, span, start_trace
+from src.main import app
+from src.middlewares.tracing import TracingMiddleware
+from src.models.db_scheams.user import User
+
+
+class TestSpans:
+    def test_span_is_noop_without_trace(self):
+        assert current_trace() is None
+        with span("anything") as recorded:
+            assert recorded is None
+
+    def test_nested_spans_and_traceparent(self):
+        parent = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+        with start_trace("GET /x", parent) as (trace, root):
+            with span("outer"):
+                with span("inner", rows=1):
+                    pass
+        root_span, outer, inner = trace.spans
+        assert trace.trace_id == "a" * 32
+        assert root_span.parent_id == "b" * 16
+        assert outer.parent_id == root_span.span_id
+        assert inner.parent_id == outer.span_id
+        assert "outer;dur=" in trace.server_timing()
+        assert current_trace() is None
+
+
+class TestTracingMiddleware:
+    @pytest.mark.asyncio
+    async def test_login_phases_in_server_timing_and_export(
+        self, client: AsyncClient, db_session: AsyncSession, monkeypatch, tmp_path
+    ):
+        db_session.add(
+            User(
+                email="traced@example.com",
+                name="Traced User",
+                hashed_password=hash_password("SecurePass123"),
+                is_verified=True,
+            )
+        )
+        await db_session.commit()
+        monkeypatch.setattr("src.middlewares.tracing.settings.SERVER_TIMING_ENABLED", True)
+        monkeypatch.setattr("src.middlewares.tracing.settings.TRACING_ENABLED", True)
+
+        exporter = SpanExporter(path=str(tmp_path / "spans.jsonl"))
+        # The client fixture has already pointed the app at the test database
+        transport = ASGITransport(app=TracingMiddleware(app, exporter=exporter))
+        async with AsyncClient(transport=transport, base_url="http://test") as traced:
+            response = await traced.post(
+                "/auth/login",
+                json={"email": "traced@example.com", "password": "SecurePass123"},
+            )
+        assert response.status_code == 200
+
+        timing = response.headers["server-timing"]
+        for phase in ("user_lookup", "bcrypt.verify_password", "jwt.encode", "response", "total"):
+            assert f"{phase};dur=" in timing
+
+        await exporter.flush()
+        exported = json.loads((tmp_path / "spans.jsonl").read_text().splitlines()[0])
+        spans = exported["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        names = {s["name"] for s in spans}
+        assert "POST /auth/login" in names
+        assert len({s["traceId"] for s in spans}) == 1
@@ -0,0 +1,182 @@
+"""
+Tests for the user lookup cache and its cross-worker invalidation.
+"""
+
+import asyncio
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.helpers.cache_invalidation import InvalidationListener
+from src.helpers.config import settings
+from src.helpers.user_cache import (
+    UserCache,
+    UserSnapshot,
+    get_user_by_email,
+    handle_invalidation,
+    user_cache,
+)
+from src.models.db_scheams.user import User
+from tests.conftest import test_engine
+
+
+@pytest.fixture
+def user_queries():
+    """Count SELECTs against the users table."""
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", before_execute)
+    yield statements
+    event.remove(test_engine.sync_engine, "before_cursor_execute", before_execute)
+
+
+class TestUserCache:
+    """Repeated lookups are served from memory; writes invalidate."""
+
+    @pytest.mark.asyncio
+    async def test_repeat_login_served_from_cache(
+        self, client: AsyncClient, user_queries: list, create_user
+    ):
+        await create_user("cached@example.com")
+
+        for _ in range(3):
+            response = await client.post(
+                "/auth/login",
+                json={"email": "cached@example.com", "password": "SecurePass123"},
+            )
+            assert response.status_code == 200
+        assert len(user_queries) == 1
+
+    @pytest.mark.asyncio
+    async def test_write_invalidates_cached_snapshot(
+        self, client: AsyncClient, db_session: AsyncSession
+    ):
+        await client.post(
+            "/auth/signup",
+            json={
+                "name": "Cache Writer",
+                "email": "writer@example.com",
+                "password": "SecurePass123",
+            },
+        )
+        assert user_cache.get_by_email("writer@example.com") is not None
+
+        response = await client.post(
+            "/auth/resend-code", json={"email": "writer@example.com"}
+        )
+        assert response.status_code == 200
+        assert user_cache.get_by_email("writer@example.com") is None
+
+        result = await db_session.execute(
+            select(User).where(User.email == "writer@example.com")
+        )
+        new_code = result.scalar_one().verification_token
+
+        # The fresh code from the database is accepted, not the cached old one
+        response = await client.post(
+            "/auth/verify-code", json={"email": "writer@example.com", "code": new_code}
+        )
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_snapshot_is_immutable(self, client: AsyncClient, create_user):
+        user = await create_user("cached@example.com")
+        snapshot = UserSnapshot.from_model(user)
+        with pytest.raises(AttributeError):
+            snapshot.is_verified = False
+
+    @pytest.mark.asyncio
+    async def test_handle_invalidation_drops_entry(self, client: AsyncClient, create_user):
+        user = await create_user("cached@example.com")
+        user_cache.put(UserSnapshot.from_model(user))
+
+        handle_invalidation({"kind": "user", "id": str(user.id), "email": user.email})
+        assert user_cache.get(user.id) is None
+        assert user_cache.get_by_email(user.email) is None
+
+    @pytest.mark.asyncio
+    async def test_invalidation_during_lookup_is_not_cached(
+        self, db_session: AsyncSession, client: AsyncClient, create_user
+    ):
+        user = await create_user("cached@example.com")
+
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            # Another worker's NOTIFY is handled while the SELECT runs
+            handle_invalidation({"kind": "user", "id": str(user.id), "email": user.email})
+
+        event.listen(test_engine.sync_engine, "before_cursor_execute", before_execute)
+        try:
+            snapshot = await get_user_by_email(db_session, user.email)
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", before_execute)
+
+        assert snapshot is not None
+        assert user_cache.get_by_email(user.email) is None
+
+        await get_user_by_email(db_session, user.email)
+        assert user_cache.get_by_email(user.email) is not None
+
+    def test_cache_is_bounded(self):
+        cache = UserCache(max_entries=10, ttl=60)
+        for i in range(50):
+            cache.put(
+                UserSnapshot(
+                    id=uuid.uuid4(),
+                    name="n",
+                    email=f"u{i}@example.com",
+                    hashed_password="x",
+                    is_active=True,
+                    is_verified=True,
+                    verification_token=None,
+                    created_at=datetime.utcnow(),
+                )
+            )
+        assert len(cache) == 10
+        assert cache.get_by_email("u49@example.com") is not None
+        assert cache.get_by_email("u0@example.com") is None
+
+
+class TestInvalidationListener:
+    """Notifications from other workers reach the local cache."""
+
+    @pytest.mark.asyncio
+    async def test_notify_from_other_worker_invalidates(
+        self, db_session: AsyncSession, client: AsyncClient, create_user
+    ):
+        user = await create_user("cached@example.com")
+        user_cache.put(UserSnapshot.from_model(user))
+
+        received = asyncio.Event()
+
+        def on_event(event: dict) -> None:
+            handle_invalidation(event)
+            received.set()
+
+        listener = InvalidationListener(
+            on_event, lambda: None, dsn=settings.get_test_database_url()
+        )
+        task = asyncio.create_task(listener.run())
+        try:
+            await asyncio.sleep(0.5)  # let LISTEN start
+            payload = json.dumps(
+                {"kind": "user", "id": str(user.id), "email": user.email, "origin": "other"}
+            )
+            await db_session.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": settings.CACHE_NOTIFY_CHANNEL, "payload": payload},
+            )
+            await db_session.commit()
+            await asyncio.wait_for(received.wait(), timeout=5)
+        finally:
+            task.cancel()
+
+        assert user_cache.get(user.id) is None
@@ -0,0 +1,80 @@
+"""
+Tests for the startup warm-up and the health check while it runs.
+"""
+
+import pytest
+from httpx import AsyncClient
+
+from src.helpers import warmup
+from src.helpers.query_stats import instrument_engine, track_queries
+from src.helpers.warmup import WarmupState, warm_up, warmup_state
+from tests.conftest import test_engine
+
+
+class TestWarmUp:
+    @pytest.mark.asyncio
+    async def test_statements_run_on_every_warm_connection(self, setup_database, monkeypatch):
+        instrument_engine(test_engine)
+        monkeypatch.setattr("src.helpers.db.get_engine", lambda: test_engine)
+
+        with track_queries() as stats:
+            await warmup._warm_statements(3)
+
+        # lookup by email, lookup by id and the rolled-back update, per connection
+        assert stats.count == 9
+
+    @pytest.mark.asyncio
+    async def test_failing_phase_still_ends_ready(self, monkeypatch, caplog):
+        async def broken(connections):
+            raise ConnectionRefusedError("database down")
+
+        monkeypatch.setattr(warmup, "_warm_statements", broken)
+        state = WarmupState()
+
+        await warm_up(state)
+
+        assert state.ready
+        assert state.status == "ready"
+        assert set(state.timings) == {"statements", "crypto", "schemas", "mail"}
+        failed = [r.getMessage() for r in caplog.records if "phase" in r.getMessage()]
+        assert len(failed) == 1 and "'statements'" in failed[0]
+
+    @pytest.mark.asyncio
+    async def test_statements_finish_before_returning(self, monkeypatch):
+        order = []
+
+        async def statements(connections):
+            order.append("statements")
+
+        async def crypto():
+            order.append("crypto")
+
+        monkeypatch.setattr(warmup, "_warm_statements", statements)
+        monkeypatch.setattr(warmup, "_warm_crypto", crypto)
+        state = WarmupState()
+
+        rest = await warm_up(state, wait=False)
+
+        assert order == ["statements"]
+        assert state.status == "warming_up"
+        await rest
+        assert order == ["statements", "crypto"]
+        assert state.ready
+
+
+class TestHealthDuringWarmUp:
+    @pytest.mark.asyncio
+    async def test_reports_503_until_ready(self, client: AsyncClient, monkeypatch):
+        monkeypatch.setattr(warmup_state, "status", "warming_up")
+
+        response = await client.get("/health")
+
+        assert response.status_code == 503
+        assert response.json()["status"] == "warming_up"
+
+    @pytest.mark.asyncio
+    async def test_reports_online_without_warm_up(self, client: AsyncClient):
+        response = await client.get("/health")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "online"